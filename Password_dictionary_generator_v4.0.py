@@ -6,6 +6,13 @@
 优化版本：智能缓存、内存映射、压缩写入、性能监控、高级功能增强、终极优化
 """
 
+import sys
+
+# 无界面模式：在导入tkinter之前直接转交给命令行引擎
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    from generator_cli import main as headless_main
+    sys.exit(headless_main([arg for arg in sys.argv[1:] if arg != "--headless"]))
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 import threading
@@ -26,7 +33,6 @@ import hashlib
 import tempfile
 import zipfile
 from pathlib import Path
-import sys
 import re
 import pickle
 import sqlite3
@@ -43,25 +49,19 @@ import gc
 import signal
 import atexit
 
-# 常量定义
-HASHCAT_CHARSETS = {
-    'l': 'abcdefghijklmnopqrstuvwxyz',
-    'u': 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',
-    'd': '0123456789',
-    's': ' !"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~',
-    'a': 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ',
-    'b': '01'
-}
+import generator_core
+import generator_verify
+from generator_core import HASHCAT_CHARSETS
 
 # 性能优化常量
-WRITE_BATCH_SIZE = 10000
+WRITE_BATCH_SIZE = generator_core.GENERATION_BATCH_SIZE  # 每批候选数
 PROGRESS_UPDATE_INTERVAL = 50000
 LOG_UPDATE_INTERVAL = 50000
 CHUNK_SIZE = 1024 * 1024  # 1MB
 DICT_CACHE_SIZE = 10
 DICT_CACHE_TIMEOUT = 300  # 5分钟
 MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)  # 动态线程数
-MEMORY_MAP_THRESHOLD = 100 * 1024 * 1024  # 100MB
+MEMORY_MAP_THRESHOLD = generator_core.MEMORY_MAP_THRESHOLD  # 定长输出超过此大小时使用内存映射写入
 COMPRESSION_THRESHOLD = 50 * 1024 * 1024  # 50MB
 
 # 新增性能监控常量
@@ -78,6 +78,9 @@ HISTORY_SIZE = 100  # 历史记录大小
 
 # 新增终极优化常量
 PROCESS_POOL_SIZE = min(8, multiprocessing.cpu_count())  # 进程池大小
+CHECKPOINT_INTERVAL = generator_core.CHECKPOINT_INTERVAL  # 检查点写入间隔（秒）
+WRITE_QUEUE_BUDGET_MB = generator_core.WRITE_QUEUE_BUDGET // (1024 * 1024)  # 写入队列内存预算（MB）
+MIN_FREE_SPACE_MB = generator_core.MIN_FREE_SPACE // (1024 * 1024)  # 写入时至少保留的可用空间（MB）
 MEMORY_POOL_SIZE = 1024 * 1024 * 100  # 100MB内存池
 GC_THRESHOLD = 100000  # 垃圾回收阈值
 SIGNAL_HANDLING = True  # 信号处理
@@ -177,6 +180,8 @@ class CombinationGeneratorApp:
         self.include_special_var = tk.BooleanVar()
         self.output_file_var = tk.StringVar()
         self.split_size_var = tk.StringVar(value="1000000")
+        self.split_bytes_var = tk.StringVar()  # 每个文件的最大大小，如 4G；留空不限
+        self.split_time_var = tk.StringVar()  # 每个文件最长的写入秒数；留空不限
         
         # 字典相关变量
         self.dict_file_var = tk.StringVar()
@@ -236,19 +241,32 @@ class CombinationGeneratorApp:
         
         # 新增性能优化变量
         self.auto_optimize = tk.BooleanVar(value=True)
-        self.use_memory_mapping = tk.BooleanVar(value=True)
+        self.use_memory_mapping = tk.BooleanVar(value=False)  # 内存映射输出不记录检查点，需手动开启
         self.use_compression = tk.BooleanVar(value=True)
+        self.compression_level_var = tk.StringVar(value=str(generator_core.GZIP_LEVEL))
+        self.recompress_parts = tk.BooleanVar(value=False)
+        self.publish_parts = tk.BooleanVar(value=False)
+        self.parallel_parts = tk.BooleanVar(value=False)
+        self.durability_var = tk.StringVar(value="none")
+        self.checksum_var = tk.StringVar(value=generator_core.MANIFEST_CHECKSUM)
         self.parallel_processing = tk.BooleanVar(value=True)
         self.max_workers_var = tk.StringVar(value=str(MAX_WORKERS))
+        self.write_queue_budget_var = tk.StringVar(value=str(WRITE_QUEUE_BUDGET_MB))
+        self.min_free_space_var = tk.StringVar(value=str(MIN_FREE_SPACE_MB))
+        self.spill_dir_var = tk.StringVar(value="")
+        self.stripe_dirs_var = tk.StringVar(value="")
+        self.stripe_mode_var = tk.StringVar(value=generator_core.STRIPE_MODES[0])
         
         # 缓存和线程变量
         self.dict_cache = {}
         self.dict_cache_size = DICT_CACHE_SIZE
         self.dict_cache_timeout = DICT_CACHE_TIMEOUT
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
-        self.write_queue = queue.Queue()
-        self.write_buffer = []
+        self.write_queue = self._new_write_queue()
         self.write_thread = None
+        self.write_error = None
+        self.output_manifest = None
+        self.progress_file = None
         self.stop_event = threading.Event()
         
         # 新增线程管理变量
@@ -1049,7 +1067,10 @@ class CombinationGeneratorApp:
         
         self.stop_button = ttk.Button(button_frame, text="停止生成", command=self.stop_generation, 
                                      state=tk.DISABLED)
-        self.stop_button.pack(side=tk.LEFT)
+        self.stop_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.verify_button = ttk.Button(button_frame, text="校验输出", command=self.start_verification)
+        self.verify_button.pack(side=tk.LEFT)
         
         # 进度显示区域
         progress_frame = ttk.Frame(main_control_frame)
@@ -1076,6 +1097,12 @@ class CombinationGeneratorApp:
         ttk.Checkbutton(row1_frame, text="内存映射", variable=self.use_memory_mapping).pack(side=tk.LEFT, padx=(0, 15))
         ttk.Checkbutton(row1_frame, text="压缩写入", variable=self.use_compression).pack(side=tk.LEFT, padx=(0, 15))
         ttk.Checkbutton(row1_frame, text="并行处理", variable=self.parallel_processing).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Checkbutton(row1_frame, text="分割后压缩", variable=self.recompress_parts).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Checkbutton(row1_frame, text="写完后发布", variable=self.publish_parts).pack(side=tk.LEFT, padx=(0, 15))
+
+        ttk.Label(row1_frame, text="压缩级别:", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Combobox(row1_frame, textvariable=self.compression_level_var, width=6, state="readonly",
+                     values=["auto"] + [str(level) for level in range(1, 10)]).pack(side=tk.LEFT, padx=(0, 15))
         
         # 第二行优化选项
         row2_frame = ttk.Frame(optimization_frame)
@@ -1089,6 +1116,12 @@ class CombinationGeneratorApp:
         
         ttk.Label(row2_frame, text="CPU阈值(%):", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Entry(row2_frame, textvariable=self.cpu_threshold, width=8, font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 15))
+
+        ttk.Label(row2_frame, text="写入队列(MB):", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(row2_frame, textvariable=self.write_queue_budget_var, width=8, font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 15))
+
+        ttk.Label(row2_frame, text="最小剩余空间(MB):", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(row2_frame, textvariable=self.min_free_space_var, width=8, font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 15))
         
         # 第三行控制选项
         row3_frame = ttk.Frame(optimization_frame)
@@ -1103,6 +1136,29 @@ class CombinationGeneratorApp:
                   style="Info.TButton").pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(row3_frame, text="清理缓存", command=self.clear_cache).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(row3_frame, text="系统信息", command=self.show_system_info).pack(side=tk.LEFT, padx=(0, 10))
+
+        ttk.Label(row3_frame, text="空间不足时备用目录:", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(5, 5))
+        ttk.Entry(row3_frame, textvariable=self.spill_dir_var, width=24, font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 15))
+
+        # 第四行：多目录条带输出
+        row4_frame = ttk.Frame(optimization_frame)
+        row4_frame.pack(fill=tk.X, pady=2)
+
+        ttk.Label(row4_frame, text="条带目录(;分隔):", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(row4_frame, textvariable=self.stripe_dirs_var, width=48, font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Label(row4_frame, text="分配方式:", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Combobox(row4_frame, textvariable=self.stripe_mode_var, width=12, state="readonly",
+                     values=list(generator_core.STRIPE_MODES)).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Label(row4_frame, text="清单校验:", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Combobox(row4_frame, textvariable=self.checksum_var, width=8, state="readonly",
+                     values=list(generator_core.CHECKSUM_ALGORITHMS)).pack(side=tk.LEFT, padx=(0, 15))
+        ttk.Label(row4_frame, text="落盘策略:", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(0, 5))
+        durability_box = ttk.Combobox(row4_frame, textvariable=self.durability_var, width=8, state="readonly",
+                                      values=list(generator_core.DURABILITY_MODES))
+        durability_box.pack(side=tk.LEFT, padx=(0, 15))
+        ToolTip(durability_box, f"none: 不 fsync，最快；interval: 每写入 "
+                                f"{generator_core.FSYNC_BYTES // 1048576}MB 或每 {generator_core.FSYNC_SECONDS} 秒 fsync；"
+                                f"close: 分割文件写完 fsync 后改名。续传只信任已 fsync 的数据")
         
         # 高级功能选项
         advanced_frame = ttk.LabelFrame(control_frame, text="高级功能", padding="10")
@@ -1184,6 +1240,18 @@ class CombinationGeneratorApp:
         output_row2.pack(fill=tk.X, pady=2)
         ttk.Label(output_row2, text="每个文件的最大组合数:", font=("微软雅黑", 9)).pack(side=tk.LEFT)
         ttk.Entry(output_row2, textvariable=self.split_size_var, width=15, font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(output_row2, text="最大大小:", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(15, 0))
+        split_bytes_entry = ttk.Entry(output_row2, textvariable=self.split_bytes_var, width=8, font=("微软雅黑", 9))
+        split_bytes_entry.pack(side=tk.LEFT, padx=(5, 0))
+        ToolTip(split_bytes_entry, "每个文件最多的未压缩字节数，如 4G、500M；与最大组合数先达到者为准，留空不限")
+        ttk.Label(output_row2, text="最长写入(秒):", font=("微软雅黑", 9)).pack(side=tk.LEFT, padx=(15, 0))
+        split_time_entry = ttk.Entry(output_row2, textvariable=self.split_time_var, width=8, font=("微软雅黑", 9))
+        split_time_entry.pack(side=tk.LEFT, padx=(5, 0))
+        ToolTip(split_time_entry, "每个文件最长的写入时间，到时换到下一个文件；留空不限")
+        parallel_parts_check = ttk.Checkbutton(output_row2, text="并行写分割文件", variable=self.parallel_parts)
+        parallel_parts_check.pack(side=tk.LEFT, padx=(15, 0))
+        ToolTip(parallel_parts_check, "可随机访问的模式预先划分各文件的序号区间，由多个进程同时各写一个文件；"
+                                      "候选长度不固定时按平均行长换算最大大小")
         
         # 输出说明
         output_help_frame = ttk.Frame(output_frame)
@@ -1399,8 +1467,7 @@ class CombinationGeneratorApp:
         except: pass
         # 彻底重建关键对象
         self.stop_event = threading.Event()
-        self.write_queue = queue.Queue()
-        self.write_buffer = []
+        self.write_queue = self._new_write_queue()
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
         self.process_pool = None
         self.write_thread = None
@@ -1426,7 +1493,6 @@ class CombinationGeneratorApp:
             return
         
         # 重置状态
-        self.write_buffer.clear()
         self.processed_count = 0
         self.last_log_update = 0
         self.performance_stats = {
@@ -1463,6 +1529,56 @@ class CombinationGeneratorApp:
         generation_thread.daemon = True
         generation_thread.start()
 
+    def start_verification(self):
+        """校验已生成的输出：读取输出文件旁的清单（没有时选择清单或分割文件），按当前生成参数
+        核对候选总数并随机抽查候选"""
+        valid, mask, charset, length_range, output_file, split_size, parsed_mask, dict_settings, advanced_settings = self._basic_validation()
+        if not valid:
+            return
+        output_file = output_file or os.path.join(os.getcwd(), "combinations.txt")
+        if not os.path.dirname(output_file):
+            output_file = os.path.join(os.getcwd(), output_file)
+        sources = [generator_core.manifest_file_name(output_file)]
+        if not os.path.exists(sources[0]):
+            sources = list(filedialog.askopenfilenames(
+                title="选择清单或分割文件",
+                filetypes=[("清单", "*.manifest.jsonl"), ("文本文件", "*.txt"), ("压缩文件", "*.gz"), ("所有文件", "*.*")]))
+            if not sources:
+                return
+        self.verify_button.config(state=tk.DISABLED)
+        thread = threading.Thread(target=self._run_verification,
+                                  args=(sources, mask, charset, length_range, parsed_mask,
+                                        dict_settings, advanced_settings))
+        thread.daemon = True
+        thread.start()
+
+    def _run_verification(self, sources, mask, charset, length_range, parsed_mask, dict_settings, advanced_settings):
+        """校验线程：多进程并行读取各文件，结果写入日志"""
+        try:
+            self.update_status("正在校验输出...")
+            dict_entries = self.get_dict_entries(dict_settings[0]) if dict_settings and dict_settings[0] else []
+            settings = self._get_generation_settings(mask, charset, length_range, parsed_mask,
+                                                     dict_settings, advanced_settings, dict_entries)
+            self.log(f"按当前生成参数核对，预计总组合数: "
+                     f"{self._calculate_total_combinations(mask, charset, length_range, parsed_mask, dict_settings, advanced_settings, dict_entries)}")
+            report = generator_verify.verify_output(sources, settings, workers=PROCESS_POOL_SIZE, log=self.log)
+            for problem in report['problems']:
+                self.log(problem, "error")
+            summary = (f"共 {report['parts']} 个文件，{report['lines']} 个候选，"
+                       f"{generator_core.format_size(report['bytes'])}，抽查 {report['sampled']} 个候选")
+            if report['problems']:
+                self.log(f"校验未通过：发现 {len(report['problems'])} 个问题（{summary}）", "error")
+                messagebox.showerror("校验未通过", f"发现 {len(report['problems'])} 个问题，详见日志")
+            else:
+                self.log(f"校验通过：{summary}")
+                messagebox.showinfo("校验通过", summary)
+        except Exception as e:
+            self.log(f"校验输出时出错: {e}", "error")
+            messagebox.showerror("错误", f"校验输出时出错: {e}")
+        finally:
+            self.update_status("就绪")
+            self.verify_button.config(state=tk.NORMAL)
+
     def stop_generation(self):
         """停止生成 - 终极优化版本"""
         self.stop_event.set()
@@ -1503,7 +1619,6 @@ class CombinationGeneratorApp:
                 pass
         
         # 重置状态
-        self.write_buffer.clear()
         self.processed_count = 0
         self.last_log_update = 0
         self.backup_counter = 0
@@ -1600,41 +1715,185 @@ class CombinationGeneratorApp:
             pass
         return True
 
-    async def _async_write_to_file(self, file_path, data):
-        """异步写入文件"""
+    def _new_write_queue(self):
+        """按界面设置的内存预算创建写入队列"""
         try:
-            # 检查文件扩展名决定是否压缩
-            if file_path.endswith('.gz'):
-                with gzip.open(file_path, 'wt', encoding='utf-8') as f:
-                    f.write(data)
-            else:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(data)
-        except Exception as e:
-            self.log(f"写入文件时出错: {e}", "error")
+            budget_mb = int(self.write_queue_budget_var.get())
+        except (AttributeError, ValueError):
+            budget_mb = WRITE_QUEUE_BUDGET_MB
+        return generator_core.ByteBudgetQueue(max(budget_mb, 1) * 1024 * 1024)
 
-    def _write_worker(self):
-        """写入工作线程"""
+    def _queue_write(self, item):
+        """放入写入队列；队列已满时等待写入线程，写入线程意外退出则报错而不是一直等待"""
         while True:
             try:
-                item = self.write_queue.get(timeout=1)
+                self.write_queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not (self.write_thread and self.write_thread.is_alive()):
+                    raise RuntimeError("写入线程已退出，无法继续写入")
+
+    def _write_queue_status(self):
+        """写入队列占用与生成端等待时间的简要描述"""
+        stats = self.write_queue.stats()
+        return (f"写入队列 {stats['queued_bytes'] / 1048576:.0f}/{stats['budget'] // 1048576} MB，"
+                f"等待磁盘 {stats['stall_time']:.1f} 秒")
+
+    def _writer_options(self):
+        """压缩相关的写入选项：勾选“压缩写入”时 .gz 输出按最大线程数并行压缩"""
+        level = self.compression_level_var.get()
+        try:
+            workers = int(self.max_workers_var.get()) if self.use_compression.get() else 1
+        except ValueError:
+            workers = MAX_WORKERS
+        return {
+            'compress_level': level if level == 'auto' else int(level),
+            'compress_workers': workers,
+            'recompress': self.recompress_parts.get(),
+            'publish': self.publish_parts.get(),
+            **generator_core.durability_options(self._durability_policy()),
+        }
+
+    def _durability_policy(self):
+        """界面选择的落盘策略，interval 使用默认的字节数和时间间隔"""
+        return generator_core.durability_policy(self.durability_var.get())
+
+    def _space_guard(self):
+        """按界面设置创建写入时的可用空间监控，最小剩余空间为0时不监控"""
+        try:
+            min_free = int(self.min_free_space_var.get()) * 1024 * 1024
+        except ValueError:
+            min_free = generator_core.MIN_FREE_SPACE
+        if min_free <= 0:
+            return None
+        spill_dir = self.spill_dir_var.get().strip()
+        return generator_core.SpaceGuard(min_free, spill_dirs=[spill_dir] if spill_dir else [],
+                                         stop_event=self.stop_event, log=self.log)
+
+    def _stripe_directories(self):
+        """界面中以分号分隔的条带目录"""
+        return [directory.strip() for directory in self.stripe_dirs_var.get().split(';') if directory.strip()]
+
+    def _split_limits(self):
+        """界面设置的按大小、按时间分割：返回 (每个文件的最大字节数, 最长写入秒数)，留空为 None"""
+        split_bytes = self.split_bytes_var.get().strip()
+        split_time = self.split_time_var.get().strip()
+        split_seconds = None
+        if split_time:
+            try:
+                split_seconds = float(split_time)
+            except ValueError:
+                split_seconds = 0
+            if split_seconds <= 0:
+                raise ValueError("每个文件的最长写入时间必须为正数（秒）")
+        return (generator_core.parse_size(split_bytes) if split_bytes else None), split_seconds
+
+    def _new_part_writer(self, output_file, checkpoint, append_index, writer_options):
+        """按界面设置创建分割文件写入器：设置了条带目录时分配到多个目录同时写入
+
+        每个写完的分割文件登记到输出文件旁的清单，校验值按“清单校验”的算法随写出计算。
+        """
+        options = dict(writer_options or {})
+        options.update(layout=checkpoint.get('layout'), space_guard=self._space_guard(),
+                       first_candidate=checkpoint['cursor'],
+                       append_count=checkpoint['in_file'] if append_index else 0,
+                       append_bytes=checkpoint.get('in_file_bytes', 0) if append_index else 0)
+        directories = self._stripe_directories()
+        manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file),
+                                               append=checkpoint['written'] > 0, checksum=self.checksum_var.get(),
+                                               durable=options.get('durability', 'none') != 'none')
+        if not directories:
+            return generator_core.PartWriter(output_file, append_index=append_index, log=self.log,
+                                             manifest=manifest, **options)
+        self.log(f"条带输出到 {len(directories)} 个目录（{self.stripe_mode_var.get()}）")
+        return generator_core.StripedPartWriter(
+            output_file, directories, self.stripe_mode_var.get(), append_index=append_index,
+            manifest=manifest, queue_budget=self.write_queue.maxsize, log=self.log, **options)
+
+    def _write_worker(self, output_file, checkpoint, append_index=0, writer_options=None):
+        """写入工作线程：每个分割文件只打开一次，按文件序号持续追加数据块
+
+        队列中的 (文件序号, 候选数, 数据块) 交给 PartWriter 写入；(None, 检查点) 表示之前的
+        数据已全部写入，此时按写入器给出的可信位置（见落盘策略）记录检查点，停止时先
+        fsync 再记录；(None, None) 表示
+        任务完成，压缩最后一个分割文件（分割后压缩时）并整理分割文件清单。
+
+        写完后发布时，换到下一个分割文件前先（按落盘策略 fsync 后）记录检查点：上一个文件此后会被改名，续传
+        只需从新文件的开头继续。
+
+        写入出错时记录到 write_error 并停止生成，之后的数据块和检查点都不再处理。
+        可用空间不足由空间监控在写入前拒绝，之前的数据完整，按本线程已写入的候选数
+        记录准确的检查点；其它错误时进度文件停留在最后一次确认落盘的位置。
+        """
+        self.write_error = None
+        writer = None
+        try:
+            writer = self._new_part_writer(output_file, checkpoint, append_index, writer_options)
+            # 上次中断前已写完、但尚未改名或压缩的分割文件
+            writer.recover_parts(checkpoint['file_index'])
+        except Exception as e:
+            # 仍然取走队列中的数据，生成端才能结束等待
+            self.write_error = e
+            self.stop_event.set()
+            self.log(f"创建输出文件写入器时出错: {e}", "error")
+        progress = dict(checkpoint)
+        written, file_index = progress['written'], progress['file_index']
+        try:
+            while True:
+                try:
+                    item = self.write_queue.get(timeout=1)
+                except queue.Empty:
+                    continue
                 if item is None:
                     break
-                
-                file_path, data = item
-                asyncio.run(self._async_write_to_file(file_path, data))
-                self.write_queue.task_done()
-            except queue.Empty:
-                continue
-
-    def _flush_buffer(self, file_path):
-        """刷新缓冲区到文件"""
-        if not self.write_buffer:
-            return
-        
-        data = '\n'.join(self.write_buffer) + '\n'
-        self.write_queue.put((file_path, data))
-        self.write_buffer.clear()
+                try:
+                    if self.write_error is not None:
+                        continue
+                    if item[0] is not None:
+                        if item[0] != file_index:
+                            file_index = item[0]
+                            if writer.publish:
+                                writer.make_durable()
+                                generator_core.update_checkpoint(progress, written, file_index, 0, 0,
+                                                                 writer.writing_path(file_index), writer.layout)
+                                self.save_progress(progress)
+                        writer.write(file_index, item[2], item[1])
+                        written += item[1]
+                    elif item[1] is None:
+                        writer.finish()
+                        job = writer.manifest.finalize(output_file=os.path.abspath(output_file),
+                                                       first=progress['start'], fingerprint=progress['fingerprint'])
+                        self.output_manifest = (writer.manifest.path, job)
+                    else:
+                        progress = item[1]
+                        if writer.current_file is not None:
+                            if self.stop_event.is_set():
+                                writer.make_durable()
+                            generator_core.checkpoint_writer(progress, writer)
+                        self.save_progress(progress)
+                except generator_core.OutputSpaceError as e:
+                    self.write_error = e
+                    self.stop_event.set()
+                    self.log(f"{e}", "error")
+                    try:
+                        writer.make_durable()
+                        generator_core.checkpoint_writer(progress, writer)
+                        self.save_progress(progress)
+                        self.log(f"检查点已保存，已写入 {progress['written']} 个候选，释放空间后可继续", "warning")
+                    except OSError as sync_error:
+                        self.log(f"记录检查点时出错: {sync_error}", "error")
+                except Exception as e:
+                    self.write_error = e
+                    self.stop_event.set()
+                    self.log(f"写入文件时出错，已停止生成: {e}", "error")
+                finally:
+                    self.write_queue.task_done()
+        finally:
+            try:
+                if writer is not None:
+                    writer.close()
+            except Exception as e:
+                self.log(f"关闭输出文件时出错: {e}", "error")
 
     def run_generation_logic(self, mask, charset, length_range, output_file, split_size, parsed_mask, dict_settings, advanced_settings):
         start_time = time.time()
@@ -1649,6 +1908,8 @@ class CombinationGeneratorApp:
             output_file = os.path.join(os.getcwd(), output_file)
         
         current_file = output_file
+        completed = False
+        self.output_manifest = None
 
         try:
             self.log("开始生成组合...")
@@ -1659,11 +1920,6 @@ class CombinationGeneratorApp:
             if output_dir:
                 os.makedirs(output_dir, exist_ok=True)
 
-            # 启动写入线程
-            self.write_thread = threading.Thread(target=self._write_worker)
-            self.write_thread.daemon = True
-            self.write_thread.start()
-
             # 加载字典文件
             dict_entries = []
             if dict_settings and dict_settings[0]:
@@ -1696,62 +1952,141 @@ class CombinationGeneratorApp:
                 messagebox.showerror("错误", f"计算总组合数时出错: {e}")
                 return
 
-            # 处理组合
-            combinations_in_current_file = 0
-            buffer_size = 0
-
-            # 获取组合生成器
-            combination_generator = self._get_combination_generator(
+            # 检查点：同一任务存在未完成的进度时询问是否续传
+            settings = self._get_generation_settings(
                 mask, charset, length_range, parsed_mask,
                 dict_settings, advanced_settings, dict_entries
             )
 
-            for combination in combination_generator:
-                if self.stop_event.is_set():
-                    break
+            # 按精确的输出大小检查目标文件系统，写不下时拒绝生成或改为压缩输出
+            checked_file = self._validate_file_system(output_file, settings)
+            if not checked_file:
+                return
+            output_file = current_file = checked_file
+
+            # 分割策略：定长候选时把最大大小精确换算为候选数
+            split_bytes, split_seconds = self._split_limits()
+            policy = generator_core.split_policy(split_bytes, split_seconds, self.parallel_parts.get())
+            part_size, part_bytes = generator_core.effective_split(settings, split_size, split_bytes)
+
+            # 并行写分割文件：各文件的序号区间预先算出，由各进程直接写出完整的文件，不经过写入线程
+            if self.parallel_parts.get() and not split_seconds and generator_core.is_indexable(settings):
+                file_suffix_counter, total_combinations_written, completed = self._write_range_parts(
+                    settings, output_file, split_size, split_bytes, policy, total_combinations)
+                current_file = generator_core.part_file_name(output_file, file_suffix_counter)
+                return
+            if self.parallel_parts.get():
+                self.log("按时间分割或当前生成模式不能预先划分分割文件的区间，改为顺序写入", "warning")
+
+            # 定长候选且输出较大时预分配文件，由各进程直接写入映射后的偏移，不经过写入线程；
+            # 条带输出、写完后发布和按落盘策略 fsync 需要经过写入线程
+            line_length = generator_core.fixed_line_length(settings)
+            durability = self._durability_policy()
+            if (self.use_memory_mapping.get() and line_length and not output_file.endswith('.gz')
+                    and total_combinations * line_length >= MEMORY_MAP_THRESHOLD
+                    and not self._stripe_directories() and not self.publish_parts.get() and not split_seconds
+                    and durability['mode'] == 'none'):
+                workers = PROCESS_POOL_SIZE if self.parallel_processing.get() else 1
+                self.log(f"使用内存映射输出（{workers} 个进程）")
+                manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file),
+                                                       checksum=self.checksum_var.get())
+                total_combinations_written = generator_core.write_mmap_parts(
+                    settings, output_file, part_size, workers, stop_event=self.stop_event, log=self.log,
+                    progress=lambda written: self.update_progress(written / max(total_combinations, 1) * 100),
+                    pool=self.process_pool if workers > 1 else None, manifest=manifest
+                )
+                file_suffix_counter = max((total_combinations - 1) // part_size + 1, 1)
+                current_file = generator_core.part_file_name(output_file, file_suffix_counter)
+                completed = not self.stop_event.is_set()
+                if completed:
+                    job = manifest.finalize(output_file=os.path.abspath(output_file), first=0,
+                                            fingerprint=generator_core.job_fingerprint(settings, split_size,
+                                                                                       split_policy=policy))
+                    self.output_manifest = (manifest.path, job)
+                else:
+                    self.log("生成已停止，内存映射输出不完整，已填写完的分割文件已登记到清单", "warning")
+                return
 
-                # 确保组合不为空
-                if not combination:
-                    continue
+            checkpoint = generator_core.new_checkpoint(settings, output_file, split_size,
+                                                       total=total_combinations, split_policy=policy,
+                                                       durability=durability)
+            saved = self.load_progress(output_file)
+            append_index = 0
+            if (saved and saved.get('fingerprint') == checkpoint['fingerprint']
+                    and saved.get('output_file') == checkpoint['output_file'] and saved['written'] > 0
+                    and messagebox.askyesno("继续上次任务",
+                                            f"发现未完成的任务（已生成 {saved['written']}/{saved['total']}），"
+                                            f"是否从中断处继续？")):
+                generator_core.prepare_resume(saved)
+                checkpoint = saved
+                saved_mode = (saved.get('durability') or {'mode': 'none'})['mode']
+                checkpoint['durability'] = durability
+                if saved['in_file']:
+                    append_index = saved['file_index']
+                self.log(f"从检查点续传: 已完成 {saved['written']} 个候选，当前第 {saved['file_index']} 个文件"
+                         f"（落盘策略 {saved_mode}）")
+
+            total_combinations_written = checkpoint['written']
+            file_suffix_counter = checkpoint['file_index']
+            in_file = checkpoint['in_file']
+            current_file = generator_core.part_file_name(output_file, file_suffix_counter)
 
-                # 添加到写入缓冲区
-                self.write_buffer.append(combination)
-                buffer_size += len(combination) + 1
-                total_combinations_written += 1
-                combinations_in_current_file += 1
-
-                # 当缓冲区达到写入批次大小时，刷新到文件
-                if len(self.write_buffer) >= WRITE_BATCH_SIZE:
-                    self._flush_buffer(current_file)
-                    buffer_size = 0
-
-                # 定期保存进度
-                if total_combinations_written % PROGRESS_UPDATE_INTERVAL == 0:
-                    self.save_progress(total_combinations_written, total_combinations, 
-                                     file_suffix_counter, current_file)
-                    progress = min(total_combinations_written / total_combinations * 100, 100)
-                    self.update_progress(progress)
-                    self.update_status(f"已生成: {total_combinations_written}/{total_combinations} ({progress:.1f}%)")
+            # 启动写入线程
+            self.write_thread = threading.Thread(target=self._write_worker,
+                                                 args=(output_file, dict(checkpoint), append_index,
+                                                       self._writer_options()))
+            self.write_thread.daemon = True
+            self.write_thread.start()
 
+            # 获取批次生成器，停止检查、进度和文件分割都按批次进行
+            batches = self._get_combination_generator(
+                mask, charset, length_range, parsed_mask,
+                dict_settings, advanced_settings, dict_entries, checkpoint['cursor']
+            )
+            last_progress_update = total_combinations_written
+            last_checkpoint = time.time()
+
+            for block, count, file_index in generator_core.split_batches(
+                    batches, part_size, self.stop_event, file_suffix_counter, in_file,
+                    part_bytes, split_seconds, checkpoint.get('in_file_bytes', 0)):
                 # 检查是否需要分割文件
-                if combinations_in_current_file >= split_size:
-                    # 刷新当前缓冲区
-                    self._flush_buffer(current_file)
-                    buffer_size = 0
-                    
-                    # 创建新文件
-                    file_suffix_counter += 1
-                    file_name, file_ext = os.path.splitext(output_file)
-                    current_file = f"{file_name}_{file_suffix_counter}{file_ext}"
-                    combinations_in_current_file = 0
+                if file_index != file_suffix_counter:
+                    file_suffix_counter = file_index
+                    in_file = 0
+                    current_file = generator_core.part_file_name(output_file, file_index)
                     self.log(f"继续输出到新文件: {current_file}")
 
-            # 刷新剩余的缓冲区内容
-            if self.write_buffer:
-                self._flush_buffer(current_file)
+                self._queue_write((file_index, count, block))
+                total_combinations_written += count
+                in_file += count
+
+                # 定期更新进度
+                if total_combinations_written - last_progress_update >= PROGRESS_UPDATE_INTERVAL:
+                    last_progress_update = total_combinations_written
+                    progress = min(total_combinations_written / max(total_combinations, 1) * 100, 100)
+                    self.update_progress(progress)
+                    self.update_status(f"已生成: {total_combinations_written}/{total_combinations} "
+                                       f"({progress:.1f}%)，{self._write_queue_status()}")
+
+                # 定期保存检查点：交给写入线程在之前的数据落盘后按已写入的候选数记录
+                if time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    last_checkpoint = time.time()
+                    self.write_queue.put((None, dict(checkpoint)))
 
-            # 等待所有写入完成
+            # 等待所有写入完成，停止时记录最终位置以便续传
+            if self.stop_event.is_set():
+                self.write_queue.put((None, dict(checkpoint)))
+            completed = not self.stop_event.is_set()
+            if completed:
+                self.write_queue.put((None, None))
             self.write_queue.join()
+            if self.write_error is not None:
+                completed = False
+                raise self.write_error
+
+            stats = self.write_queue.stats()
+            self.log(f"写入队列峰值 {stats['peak_bytes'] / 1048576:.1f} MB（预算 {stats['budget'] // 1048576} MB），"
+                     f"生成端等待磁盘 {stats['stall_count']} 次，共 {stats['stall_time']:.1f} 秒")
 
         except Exception as e:
             self.log(f"生成过程中出错: {e}", "error")
@@ -1792,11 +2127,11 @@ class CombinationGeneratorApp:
                 except:
                     pass
             
-            # 清理进度文件
-            self.cleanup_progress()
+            # 只有正常完成才清理进度文件，出错或停止时保留以便续传
+            if completed:
+                self.cleanup_progress()
             
             # 重置状态
-            self.write_buffer.clear()
             self.processed_count = 0
             self.last_log_update = 0
             self.backup_counter = 0
@@ -1815,307 +2150,113 @@ class CombinationGeneratorApp:
             self.generate_button.config(state=tk.NORMAL)
             self.stop_button.config(state=tk.DISABLED)
 
-    def save_progress(self, current_count, total_count, file_counter, current_file):
-        """保存当前进度"""
-        progress = {
-            'current_count': current_count,
-            'total_count': total_count,
-            'file_counter': file_counter,
-            'current_file': current_file,
-            'timestamp': time.time()
-        }
+    def _write_range_parts(self, settings, output_file, split_size, split_bytes, policy, total_combinations):
+        """并行写分割文件，返回 (分割文件数, 已写入的候选数, 是否完成)
+
+        进度文件只用于续传前确认任务参数一致，已写完的文件以清单中的登记为准。
+        """
+        checkpoint = generator_core.new_checkpoint(settings, output_file, split_size,
+                                                   total=total_combinations, split_policy=policy,
+                                                   durability=self._durability_policy())
+        saved = self.load_progress(output_file)
+        resume = bool(saved and saved.get('fingerprint') == checkpoint['fingerprint']
+                      and saved.get('output_file') == checkpoint['output_file'] and saved['written'] > 0
+                      and messagebox.askyesno("继续上次任务",
+                                              f"发现未完成的任务（已生成 {saved['written']}/{saved['total']}），"
+                                              f"是否跳过已写完的分割文件继续？"))
+        if resume:
+            checkpoint = saved
+        self.save_progress(checkpoint)
+        workers = PROCESS_POOL_SIZE if self.parallel_processing.get() else 1
+        written = generator_core.write_range_parts(
+            settings, output_file, split_size, workers, split_bytes=split_bytes, stop_event=self.stop_event,
+            log=self.log, writer_options=self._writer_options(), checksum=self.checksum_var.get(), resume=resume,
+            progress=lambda done: self.update_progress(done / max(total_combinations, 1) * 100))
+        completed = not self.stop_event.is_set()
+        manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file), append=True,
+                                               checksum=self.checksum_var.get(),
+                                               durable=self.durability_var.get() != 'none')
+        if completed:
+            job = manifest.finalize(output_file=os.path.abspath(output_file), first=0,
+                                    fingerprint=checkpoint['fingerprint'])
+            self.output_manifest = (manifest.path, job)
+            return job['parts'], written, True
+        checkpoint.update(written=written, timestamp=time.time())
+        self.save_progress(checkpoint)
+        self.log("生成已停止，已写完的分割文件已登记到清单，可继续上次任务", "warning")
+        return max(manifest.load(), default=1), written, False
+
+    def save_progress(self, checkpoint):
+        """原子写入检查点（由写入线程在数据落盘后调用）"""
         try:
-            with open('progress.json', 'w', encoding='utf-8') as f:
-                json.dump(progress, f)
+            generator_core.save_checkpoint(self.progress_file, checkpoint)
         except Exception as e:
             self.log(f"保存进度时出错: {e}", "warning")
 
-    def load_progress(self):
-        """加载上次的进度"""
+    def load_progress(self, output_file):
+        """加载输出文件对应的检查点"""
+        self.progress_file = generator_core.checkpoint_file_name(output_file)
         try:
-            if os.path.exists('progress.json'):
-                with open('progress.json', 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            return generator_core.load_checkpoint(self.progress_file)
         except Exception as e:
             self.log(f"加载进度时出错: {e}", "warning")
         return None
 
     def cleanup_progress(self):
-        """清理进度文件"""
+        """任务完成后清理进度文件"""
         try:
-            if os.path.exists('progress.json'):
-                os.remove('progress.json')
+            if self.progress_file and os.path.exists(self.progress_file):
+                os.remove(self.progress_file)
         except Exception as e:
             self.log(f"清理进度文件时出错: {e}", "warning")
 
+    def _get_dict_b_entries(self, combo_mode):
+        """加载字典A/B组合模式所需的已处理字典B条目"""
+        if combo_mode not in ("dict_ab", "dict_ba"):
+            return None
+        dict_b_file = self.dict_b_file_var.get()
+        if not dict_b_file:
+            raise ValueError("字典B文件未选择")
+        return self.get_dict_entries(dict_b_file)
+
     def _calculate_total_combinations(self, mask, charset, length_range, parsed_mask, dict_settings, advanced_settings, dict_entries):
         """Calculate total possible combinations."""
-        if advanced_settings and "custom_dict" in advanced_settings:
-            chars, mode, length = advanced_settings["custom_dict"]
-            chars = [c.strip() for c in chars.split(",")]
-            
-            if mode == "combination":
-                # 组合模式的总组合数
-                return len(chars) ** length
-            elif mode == "permutation":
-                # 全排列模式的总组合数
-                if length > len(chars):
-                    return 0
-                return math.factorial(len(chars)) // math.factorial(len(chars) - length)
-            else:  # permutation2 mode
-                # 全排列模式2的总组合数
-                if length > len(chars):
-                    return 0
-                return math.factorial(len(chars)) // math.factorial(len(chars) - length)
-
-        if not dict_entries:
-            dict_entries = []
-            
-        # Check if it's pure dictionary mode
-        is_pure_dict = (dict_settings and dict_settings[2] == "none" and 
-                       not mask and not charset and not advanced_settings)
-        
-        if is_pure_dict:
-            # Calculate potential combinations based on processing options
-            total = 0
-            for entry in dict_entries:
-                # 使用生成器并计算处理后的条目数
-                processed_count = sum(1 for _ in self.process_dictionary_entry(entry))
-                total += processed_count
-                self.log(f"条目 '{entry}' 处理后生成 {processed_count} 个组合")
-            return total if total > 0 else len(dict_entries)  # Fallback to original count if no processing
-
-        # 检查高级选项
-        if advanced_settings and "repeat_char" in advanced_settings:
-            repeat_len, pattern_len, charset, pattern_type = advanced_settings["repeat_char"]
-            if pattern_type == "sequential":
-                # 连续模式的总组合数
-                return max(0, len(charset) - pattern_len + 1)
-            elif pattern_type == "sequential_repeat":
-                # 连续重复模式的总组合数
-                return max(0, len(charset) - pattern_len + 1)
-            else:  # repeat mode
-                # 重复模式的总组合数
-                return len(charset) ** pattern_len
-
-        # 计算基础组合数
-        if parsed_mask:
-            # 掩码模式
-            base_combinations = 1
-            for charset in parsed_mask:
-                base_combinations *= len(charset)
-        else:
-            # 字符集模式
-            min_len, max_len = length_range
-            base_combinations = 0
-            for length in range(min_len, max_len + 1):
-                base_combinations += len(charset) ** length
-
-        # 计算字典组合
-        if dict_entries and dict_settings:
-            dict_combo_mode = dict_settings[2]
-            if dict_combo_mode in ["dict_ab", "dict_ba"]:
-                # 字典A和字典B的组合
-                dict_b_file = self.dict_b_file_var.get()
-                if dict_b_file:
-                    try:
-                        dict_b_entries = self.get_dict_entries(dict_b_file)
-                        return len(dict_entries) * len(dict_b_entries)
-                    except:
-                        return len(dict_entries) * 1000  # 估算
-            elif dict_combo_mode in ["dict_first", "mask_first"]:
-                # 字典和掩码的组合
-                return len(dict_entries) * base_combinations
-
-        return base_combinations
-
-    def _get_combination_generator(self, mask, charset, length_range, parsed_mask, dict_settings, advanced_settings, dict_entries):
-        """Get generator for combinations based on current settings."""
-        if advanced_settings:
-            return self._get_advanced_generator(advanced_settings)
-
-        dict_file, dict_pos, dict_combo_mode = dict_settings if dict_settings else (None, None, None)
-        
-        # Get base generator
-        if mask and parsed_mask:
-            base_generator = self._get_mask_generator(parsed_mask)
-        else:
-            base_generator = self._get_charset_generator(charset, length_range)
-
-        # Wrap with dictionary combination if needed
-        if dict_combo_mode != "none":
-            return self._get_dict_combo_generator(base_generator, dict_entries, dict_combo_mode)
-        elif dict_pos in ["append_before", "append_after"]:
-            return self._get_dict_append_generator(base_generator, dict_entries, dict_pos)
-        return base_generator
-
-    def _get_advanced_generator(self, advanced_settings):
-        """Generator for advanced generation options."""
-        if "custom_dict" in advanced_settings:
-            chars, mode, length = advanced_settings["custom_dict"]
-            chars = [c.strip() for c in chars.split(",")]
-            
-            if mode == "combination":
-                # 组合模式
-                for combo in itertools.product(chars, repeat=length):
-                    if self.stop_event.is_set():
-                        break
-                    yield ''.join(combo)
-            elif mode == "permutation":
-                # 全排列模式
-                for combo in itertools.permutations(chars, length):
-                    if self.stop_event.is_set():
-                        break
-                    yield ''.join(combo)
-            else:  # permutation2 mode
-                # 全排列模式2（带连接符）
-                connector = self.connector_var.get()  # 直接使用用户输入的连接符，不做任何处理
-                for combo in itertools.permutations(chars, length):
-                    if self.stop_event.is_set():
-                        break
-                    yield connector.join(combo)
-        elif "repeat_char" in advanced_settings:
-            repeat_len, pattern_len, charset, pattern_type = advanced_settings["repeat_char"]
-            
-            if pattern_type == "sequential":
-                # 生成连续模式 (如 ABCABC)
-                for i in range(len(charset) - pattern_len + 1):
-                    if self.stop_event.is_set():
-                        break
-                    pattern = charset[i:i+pattern_len]
-                    result = pattern * repeat_len
-                    if len(result) > 0:
-                        yield result
-            elif pattern_type == "sequential_repeat":
-                # 生成连续重复模式 (如 AABBCC)
-                for i in range(len(charset) - pattern_len + 1):
-                    if self.stop_event.is_set():
-                        break
-                    result = ''
-                    for j in range(pattern_len):
-                        result += charset[i+j] * repeat_len
-                    if len(result) > 0:
-                        yield result
-            else:  # repeat mode
-                # 生成重复模式 (如 AABB)
-                for chars in itertools.product(charset, repeat=pattern_len):
-                    if self.stop_event.is_set():
-                        break
-                    result = ''
-                    for char in chars:
-                        result += char * repeat_len
-                    if len(result) > 0:
-                        yield result
-
-    def _get_mask_generator(self, parsed_mask):
-        """Generator for mask-based combinations."""
-        for combo_tuple in itertools.product(*parsed_mask):
-            if self.stop_event.is_set():
-                break
-            yield ''.join(combo_tuple)
+        combo_mode = dict_settings[2] if dict_settings else "none"
+        return generator_core.calculate_total_combinations(
+            parsed_mask if mask else None, charset, length_range, dict_entries,
+            combo_mode, self.dict_pos_var.get(), self._get_dict_b_entries(combo_mode),
+            advanced_settings
+        )
 
-    def _get_charset_generator(self, charset, length_range):
-        """Generator for charset-based combinations."""
-        min_len, max_len = length_range
-        for length in range(min_len, max_len + 1):
-            if self.stop_event.is_set():
-                break
-            for combo_tuple in itertools.product(charset, repeat=length):
-                if self.stop_event.is_set():
-                    break
-                yield ''.join(combo_tuple)
+    def _get_generation_settings(self, mask, charset, length_range, parsed_mask, dict_settings, advanced_settings, dict_entries):
+        """整理为 generator_core 使用的生成设置"""
+        combo_mode = dict_settings[2] if dict_settings else "none"
+        return {
+            'parsed_mask': parsed_mask if mask else None,
+            'charset': charset,
+            'length_range': length_range,
+            'dict_entries': dict_entries,
+            'combo_mode': combo_mode,
+            'dict_pos': self.dict_pos_var.get(),
+            'dict_b_entries': self._get_dict_b_entries(combo_mode),
+            'advanced_settings': advanced_settings,
+            'connector': self.connector_var.get(),
+        }
 
-    def _get_dict_combo_generator(self, base_generator, dict_entries, combo_mode):
-        """优化的字典组合生成器"""
-        if combo_mode in ["dict_ab", "dict_ba"]:
-            # 加载字典B
-            dict_b_file = self.dict_b_file_var.get()
-            if not dict_b_file:
-                raise ValueError("字典B文件未选择")
-            
-            try:
-                # 处理字典A
-                processed_entries_a = set()
-                for entry in dict_entries:
-                    for processed in self.process_dictionary_entry(entry):
-                        processed_entries_a.add(processed)
-                self.log(f"处理后的字典A条目数: {len(processed_entries_a)}")
-
-                # 处理字典B
-                dict_b_entries = self.get_dict_entries(dict_b_file)
-                processed_entries_b = set()
-                for entry in dict_b_entries:
-                    for processed in self.process_dictionary_entry(entry):
-                        processed_entries_b.add(processed)
-                self.log(f"处理后的字典B条目数: {len(processed_entries_b)}")
-                
-                # 使用生成器组合处理后的字典
-                for entry_a in processed_entries_a:
-                    if self.stop_event.is_set():
-                        break
-                    for entry_b in processed_entries_b:
-                        if self.stop_event.is_set():
-                            break
-                        if combo_mode == "dict_ab":
-                            yield entry_a + entry_b
-                        else:  # dict_ba
-                            yield entry_b + entry_a
-                            
-            except Exception as e:
-                raise ValueError(f"处理字典时出错: {e}")
-        else:
-            # 处理字典条目
-            processed_entries = set()
-            for entry in dict_entries:
-                for processed in self.process_dictionary_entry(entry):
-                    processed_entries.add(processed)
-            self.log(f"处理后的字典条目数: {len(processed_entries)}")
-
-            # 如果是纯字典模式，直接返回处理后的条目
-            if not base_generator:
-                for entry in processed_entries:
-                    if self.stop_event.is_set():
-                        break
-                    yield entry
-            else:
-                # 组合处理后的字典条目和掩码
-                # 首先收集所有掩码组合
-                mask_combinations = []
-                for mask_combo in base_generator:
-                    if self.stop_event.is_set():
-                        break
-                    mask_combinations.append(mask_combo)
-                
-                self.log(f"掩码组合数: {len(mask_combinations)}")
-                
-                # 然后生成所有可能的组合
-                for dict_entry in processed_entries:
-                    if self.stop_event.is_set():
-                        break
-                    for mask_combo in mask_combinations:
-                        if self.stop_event.is_set():
-                            break
-                        if combo_mode == "dict_first":
-                            yield dict_entry + mask_combo
-                        else:  # mask_first
-                            yield mask_combo + dict_entry
-
-    def _get_dict_append_generator(self, base_generator, dict_entries, dict_pos):
-        """Generator for dictionary append mode."""
-        if dict_pos == "append_before":
-            for entry in dict_entries:
-                if self.stop_event.is_set():
-                    break
-                yield entry
-        for combination in base_generator:
-            if self.stop_event.is_set():
-                break
-            yield combination
-        if dict_pos == "append_after":
-            for entry in dict_entries:
-                if self.stop_event.is_set():
-                    break
-                yield entry
+    def _get_combination_generator(self, mask, charset, length_range, parsed_mask, dict_settings, advanced_settings, dict_entries, start=0):
+        """Get batch generator, yielding (newline-joined bytes, count) per batch, from index start."""
+        settings = self._get_generation_settings(
+            mask, charset, length_range, parsed_mask, dict_settings, advanced_settings, dict_entries
+        )
+        # 并行处理：可随机访问的模式按序号区间分给进程池，结果按顺序重组
+        if self.parallel_processing.get() and PROCESS_POOL_SIZE > 1 and generator_core.is_indexable(settings):
+            return generator_core.parallel_batches(
+                settings, PROCESS_POOL_SIZE, start, batch_size=WRITE_BATCH_SIZE,
+                stop_event=self.stop_event, log=self.log, pool=self.process_pool
+            )
+        return generator_core.combination_batches(
+            batch_size=WRITE_BATCH_SIZE, stop_event=self.stop_event, log=self.log, start=start, **settings
+        )
 
     def _show_generation_summary(self, total_written, total_combinations, elapsed_time, file_suffix_counter, output_file, current_file):
         """Show generation summary and update UI."""
@@ -2127,6 +2268,12 @@ class CombinationGeneratorApp:
             self.log(f"输出已保存到多个文件，以 {output_file} 为基础名")
         elif total_written > 0:
             self.log(f"输出已保存到: {current_file}")
+        if self.output_manifest is not None:
+            path, job = self.output_manifest
+            self.log(f"分割文件清单: {path}（{job['parts']} 个文件，{job['count']} 个候选，"
+                     f"{generator_core.format_size(job['bytes'])}）")
+            if job['count'] != total_written:
+                self.log(f"清单登记的候选数 {job['count']} 与已生成的 {total_written} 个不一致", "warning")
             
         self.log(f"用时: {elapsed_time:.2f} 秒")
 
@@ -2141,188 +2288,34 @@ class CombinationGeneratorApp:
         self.generate_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
 
-    def process_dictionary_entry(self, entry):
+    def _get_processing_options(self):
+        """收集界面中的字典处理选项"""
+        return generator_core.normalize_processing_options({
+            'uppercase': self.uppercase_var.get(),
+            'lowercase': self.lowercase_var.get(),
+            'capitalize': self.capitalize_var.get(),
+            'reverse': self.reverse_var.get(),
+            'remove_start': self.remove_start_var.get(),
+            'remove_end': self.remove_end_var.get(),
+            'add_start': self.add_start_var.get(),
+            'add_end': self.add_end_var.get(),
+            'repeat_count': self.repeat_count_var.get(),
+            'repeat_space_count': self.repeat_space_count_var.get(),
+            'process_mode': self.process_mode_var.get(),
+            'remove_start_independent': self.remove_start_independent_var.get(),
+            'remove_end_independent': self.remove_end_independent_var.get(),
+            'remove_combined': self.remove_combined_var.get(),
+            'add_start_independent': self.add_start_independent_var.get(),
+            'add_end_independent': self.add_end_independent_var.get(),
+            'add_combined': self.add_combined_var.get(),
+            'repeat_processed': self.repeat_processed_var.get(),
+            'repeat_processed_count': self.repeat_processed_count_var.get(),
+            'repeat_processed_space_count': self.repeat_processed_space_count_var.get(),
+        })
+
+    def process_dictionary_entry(self, entry, options=None):
         """使用生成器处理字典条目"""
-        if not entry.strip():
-            return
-            
-        original = entry.strip()
-        
-        # 检查是否有任何处理选项被启用
-        has_processing_options = (
-            self.uppercase_var.get() or
-            self.lowercase_var.get() or
-            self.capitalize_var.get() or
-            self.reverse_var.get() or
-            self.remove_start_var.get() != "0" or
-            self.remove_end_var.get() != "0" or
-            self.add_start_var.get() or
-            self.add_end_var.get() or
-            self.repeat_count_var.get() != "1" or
-            self.repeat_space_count_var.get() != "1"
-        )
-        
-        # 只有在没有处理选项时才输出原始条目
-        if not has_processing_options:
-            yield original
-            return
-        
-        # 使用集合存储处理后的条目以避免重复
-        processed_entries = set()
-        
-        if self.process_mode_var.get() == "independent":
-            # 独立处理模式
-            if self.uppercase_var.get():
-                processed_entries.add(original.upper())
-            if self.lowercase_var.get():
-                processed_entries.add(original.lower())
-            if self.capitalize_var.get():
-                processed_entries.add(original.capitalize())
-            if self.reverse_var.get():
-                processed_entries.add(original[::-1])
-            
-            # 字符移除处理
-            try:
-                remove_start = max(0, int(self.remove_start_var.get() or "0"))
-                remove_end = max(0, int(self.remove_end_var.get() or "0"))
-                
-                # 独立处理开头字符
-                if self.remove_start_independent_var.get() and remove_start > 0:
-                    if len(original) > remove_start:
-                        processed_entries.add(original[remove_start:])
-                
-                # 独立处理结尾字符
-                if self.remove_end_independent_var.get() and remove_end > 0:
-                    if len(original) > remove_end:
-                        processed_entries.add(original[:-remove_end])
-                
-                # 同时处理开头和结尾
-                if self.remove_combined_var.get():
-                    if len(original) > (remove_start + remove_end):
-                        processed_entries.add(original[remove_start:-remove_end])
-            except ValueError:
-                pass
-            
-            # 字符添加处理
-            add_start = self.add_start_var.get()
-            add_end = self.add_end_var.get()
-            
-            # 独立处理开头添加
-            if self.add_start_independent_var.get() and add_start:
-                processed_entries.add(add_start + original)
-            
-            # 独立处理结尾添加
-            if self.add_end_independent_var.get() and add_end:
-                processed_entries.add(original + add_end)
-            
-            # 同时处理开头和结尾添加
-            if self.add_combined_var.get():
-                processed_entries.add(add_start + original + add_end)
-            
-            # 重复处理
-            try:
-                repeat_count = max(1, int(self.repeat_count_var.get() or "1"))
-                repeat_space_count = max(1, int(self.repeat_space_count_var.get() or "1"))
-                
-                if repeat_count > 1:
-                    processed_entries.add(original * repeat_count)
-                if repeat_space_count > 1:
-                    processed_entries.add(" ".join([original] * repeat_space_count))
-            except ValueError:
-                pass
-        else:
-            # 组合处理模式
-            current_entries = set()
-            
-            # 大小写处理
-            if self.uppercase_var.get() or self.lowercase_var.get() or self.capitalize_var.get():
-                if self.uppercase_var.get():
-                    current_entries.add(original.upper())
-                if self.lowercase_var.get():
-                    current_entries.add(original.lower())
-                if self.capitalize_var.get():
-                    current_entries.add(original.capitalize())
-            
-            # 字符串反转
-            if self.reverse_var.get():
-                current_entries.add(original[::-1])
-            
-            # 字符移除处理
-            try:
-                remove_start = max(0, int(self.remove_start_var.get() or "0"))
-                remove_end = max(0, int(self.remove_end_var.get() or "0"))
-                
-                # 独立处理开头字符
-                if self.remove_start_independent_var.get() and remove_start > 0:
-                    if len(original) > remove_start:
-                        current_entries.add(original[remove_start:])
-                
-                # 独立处理结尾字符
-                if self.remove_end_independent_var.get() and remove_end > 0:
-                    if len(original) > remove_end:
-                        current_entries.add(original[:-remove_end])
-                
-                # 同时处理开头和结尾
-                if self.remove_combined_var.get():
-                    if len(original) > (remove_start + remove_end):
-                        current_entries.add(original[remove_start:-remove_end])
-            except ValueError:
-                pass
-            
-            # 字符添加处理
-            add_start = self.add_start_var.get()
-            add_end = self.add_end_var.get()
-            
-            # 独立处理开头添加
-            if self.add_start_independent_var.get() and add_start:
-                current_entries.add(add_start + original)
-            
-            # 独立处理结尾添加
-            if self.add_end_independent_var.get() and add_end:
-                current_entries.add(original + add_end)
-            
-            # 同时处理开头和结尾添加
-            if self.add_combined_var.get():
-                current_entries.add(add_start + original + add_end)
-            
-            # 重复处理
-            try:
-                repeat_count = max(1, int(self.repeat_count_var.get() or "1"))
-                repeat_space_count = max(1, int(self.repeat_space_count_var.get() or "1"))
-                
-                if repeat_count > 1:
-                    current_entries.add(original * repeat_count)
-                if repeat_space_count > 1:
-                    current_entries.add(" ".join([original] * repeat_space_count))
-            except ValueError:
-                pass
-            
-            processed_entries.update(current_entries)
-        
-        # 对处理后的数据进行重复处理
-        if self.repeat_processed_var.get():
-            try:
-                repeat_processed_count = max(1, int(self.repeat_processed_count_var.get() or "2"))
-                repeat_processed_space_count = max(1, int(self.repeat_processed_space_count_var.get() or "2"))
-                
-                # 创建临时集合存储重复处理后的结果
-                repeated_entries = set()
-                
-                # 对每个处理后的条目进行重复处理
-                for entry in processed_entries:
-                    if repeat_processed_count > 1:
-                        repeated_entries.add(entry * repeat_processed_count)
-                    if repeat_processed_space_count > 1:
-                        repeated_entries.add(" ".join([entry] * repeat_processed_space_count))
-                
-                # 更新处理后的条目集合
-                processed_entries.update(repeated_entries)
-            except ValueError:
-                pass
-        
-        # 返回所有处理后的条目
-        for entry in processed_entries:
-            yield entry
+        return generator_core.process_dictionary_entry(entry, options or self._get_processing_options())
 
     def get_dict_entries(self, dict_file, use_cache=True):
         """获取字典条目，支持缓存和文件夹处理"""
@@ -2334,6 +2327,7 @@ class CombinationGeneratorApp:
 
         try:
             entries = set()  # 使用集合来存储唯一条目
+            processing_options = self._get_processing_options()
             self.processed_count = 0
             self.last_log_update = 0
             
@@ -2385,7 +2379,7 @@ class CombinationGeneratorApp:
                             if self.stop_event.is_set():
                                 break
                             # 处理每个条目并生成所有组合
-                            for processed in self.process_dictionary_entry(entry):
+                            for processed in self.process_dictionary_entry(entry, processing_options):
                                 processed_entries.add(processed)
                                 self.processed_count += 1
                                 
@@ -2403,7 +2397,7 @@ class CombinationGeneratorApp:
                         # 保存处理后的条目到新文件
                         self.log(f"正在保存处理后的条目到: {new_file_name}")
                         with open(new_file_path, 'w', encoding='utf-8') as f:
-                            for entry in processed_entries:
+                            for entry in sorted(processed_entries):
                                 f.write(f"{entry}\n")
                         
                         # 移动原文件到done文件夹
@@ -2436,7 +2430,7 @@ class CombinationGeneratorApp:
                 for entry in file_entries:
                     if self.stop_event.is_set():
                         break
-                    for processed in self.process_dictionary_entry(entry):
+                    for processed in self.process_dictionary_entry(entry, processing_options):
                         entries.add(processed)
                         self.processed_count += 1
                         
@@ -2446,10 +2440,13 @@ class CombinationGeneratorApp:
                                 self.log(f"已处理 {self.processed_count} 条记录")
                             self.last_log_update = self.processed_count
             
+            # 排序保证条目顺序稳定（序号定位、分片和断点续传依赖这一点）
+            entries = sorted(entries)
+
             # 更新缓存
             if use_cache:
                 self.dict_cache[dict_file] = {
-                    'entries': list(entries),  # 转换回列表
+                    'entries': entries,
                     'timestamp': time.time()
                 }
                 # 如果缓存超过大小限制，删除最旧的缓存
@@ -2458,7 +2455,7 @@ class CombinationGeneratorApp:
                                    key=lambda k: self.dict_cache[k]['timestamp'])
                     del self.dict_cache[oldest_key]
             
-            return list(entries)  # 返回列表
+            return entries
         except Exception as e:
             self.log(f"读取字典文件时出错: {e}", "error")
             raise
@@ -2604,6 +2601,12 @@ class CombinationGeneratorApp:
             self.log("错误: 每个文件的最大组合数必须为整数", "error")
             messagebox.showerror("错误", "每个文件的最大组合数必须为整数")
             return False, None, None, None, None, None, None, None, None
+        try:
+            self._split_limits()
+        except ValueError as e:
+            self.log(f"错误: {e}", "error")
+            messagebox.showerror("错误", str(e))
+            return False, None, None, None, None, None, None, None, None
 
         # 检查自定义字典组合选项
         if self.custom_dict_var.get():
@@ -2641,8 +2644,10 @@ class CombinationGeneratorApp:
         dict_b_file = self.dict_b_file_var.get()
         dict_combo_mode = self.dict_combo_var.get()
 
-        # 检查是否为纯字典模式
-        is_pure_dict = (dict_file or dict_folder) and dict_combo_mode == "none"
+        # 检查是否为纯字典模式：追加到掩码或字符集候选前后时仍需检查基础生成参数
+        has_base = bool(self.mask_var.get() or self.charset_var.get() or self.include_special_var.get())
+        is_pure_dict = ((dict_file or dict_folder) and dict_combo_mode == "none"
+                        and (self.dict_pos_var.get() == "none" or not has_base))
         
         # 如果使用字典模式
         if is_pure_dict or dict_combo_mode != "none":
@@ -2775,6 +2780,25 @@ class CombinationGeneratorApp:
             messagebox.showerror("错误", "最大线程数必须为整数")
             return False
 
+        try:
+            write_queue_budget = int(self.write_queue_budget_var.get())
+            if write_queue_budget <= 0:
+                self.log("错误: 写入队列内存必须大于0", "error")
+                messagebox.showerror("错误", "写入队列内存必须大于0")
+                return False
+        except ValueError:
+            self.log("错误: 写入队列内存必须为整数", "error")
+            messagebox.showerror("错误", "写入队列内存必须为整数")
+            return False
+
+        try:
+            if int(self.min_free_space_var.get()) < 0:
+                raise ValueError
+        except ValueError:
+            self.log("错误: 最小剩余空间必须为非负整数", "error")
+            messagebox.showerror("错误", "最小剩余空间必须为非负整数")
+            return False
+
         try:
             memory_threshold = float(self.memory_threshold.get())
             if memory_threshold <= 0 or memory_threshold > 100:
@@ -2799,8 +2823,12 @@ class CombinationGeneratorApp:
 
         return True
 
-    def _validate_file_system(self, output_file):
-        """验证文件系统"""
+    def _validate_file_system(self, output_file, settings=None):
+        """验证文件系统，返回实际使用的输出文件名，验证失败时返回 None
+
+        settings 为生成设置时按精确的输出大小检查可用空间：写不下时拒绝生成，
+        压缩后写得下时询问是否改为 .gz 输出。
+        """
         try:
             output_dir = os.path.dirname(output_file)
             if output_dir and not os.path.exists(output_dir):
@@ -2808,20 +2836,35 @@ class CombinationGeneratorApp:
                 os.makedirs(output_dir, exist_ok=True)
                 self.log(f"已创建输出目录: {output_dir}")
 
-            # 检查磁盘空间
-            disk_usage = psutil.disk_usage(output_dir or '.')
-            free_space_gb = disk_usage.free / (1024**3)
-            
-            if free_space_gb < 1:  # 小于1GB
-                self.log(f"警告: 磁盘空间不足，可用空间: {free_space_gb:.1f} GB", "warning")
-                if not messagebox.askyesno("警告", f"磁盘空间不足，可用空间: {free_space_gb:.1f} GB\n是否继续？"):
-                    return False
+            if settings is None:
+                return output_file
+
+            directories = self._stripe_directories()
+            for directory in directories:
+                os.makedirs(directory, exist_ok=True)
+            estimate = generator_core.estimate_job(settings, output_file, directories=directories or None)
+            self.log(generator_core.describe_estimate(estimate))
+            plan = generator_core.plan_output_space(estimate)
+            if plan == "ok":
+                return output_file
+
+            needed = generator_core.format_size(estimate['bytes'])
+            free = generator_core.format_size(estimate['free'])
+            self.log(f"磁盘空间不足: 预计输出 {needed}，可用空间 {free}", "warning")
+            if plan == "compress":
+                compressed = generator_core.format_size(estimate['compressed_bytes'])
+                if messagebox.askyesno("磁盘空间不足",
+                                       f"预计输出 {needed}，可用空间仅 {free}。\n"
+                                       f"改为 gzip 压缩输出后约 {compressed}，是否改为压缩输出？"):
+                    self.log(f"已改为压缩输出: {output_file}.gz")
+                    return output_file + '.gz'
+                return None
+            messagebox.showerror("磁盘空间不足", f"预计输出 {needed}，可用空间仅 {free}，压缩后也无法写下。")
+            return None
 
         except Exception as e:
             self.log(f"文件系统验证出错: {e}", "error")
-            return False
-
-        return True
+            return None
 
     def _validate_system_resources(self):
         """验证系统资源"""
@@ -2861,11 +2904,11 @@ class CombinationGeneratorApp:
             # 根据内存调整批处理大小
             if memory.total < 4 * 1024**3:  # 小于4GB
                 global WRITE_BATCH_SIZE
-                WRITE_BATCH_SIZE = 5000
-                self.log("内存较小，已调整批处理大小为5000")
+                WRITE_BATCH_SIZE = 16384
+                self.log("内存较小，已调整批处理大小为16384")
             elif memory.total > 16 * 1024**3:  # 大于16GB
-                WRITE_BATCH_SIZE = 20000
-                self.log("内存充足，已调整批处理大小为20000")
+                WRITE_BATCH_SIZE = 131072
+                self.log("内存充足，已调整批处理大小为131072")
 
             # 根据CPU核心数调整线程数
             optimal_workers = min(cpu_count * 2, 32)
@@ -2916,6 +2959,7 @@ class CombinationGeneratorApp:
 
     def _performance_monitor(self):
         """性能监控线程"""
+        last_stall_time = 0.0
         while self.monitoring_active and not self.stop_event.is_set():
             try:
                 # 获取系统性能数据
@@ -2938,6 +2982,13 @@ class CombinationGeneratorApp:
                 
                 if cpu_percent > float(self.cpu_threshold.get()):
                     self.log(f"CPU使用率过高: {cpu_percent:.1f}%", "warning")
+
+                # 生成端因写入队列已满而等待，说明磁盘跟不上生成速度
+                queue_stats = self.write_queue.stats()
+                self.performance_stats['write_queue'] = queue_stats
+                if queue_stats['stall_time'] - last_stall_time >= 1:
+                    self.log(f"磁盘写入跟不上生成速度，{self._write_queue_status()}", "warning")
+                last_stall_time = queue_stats['stall_time']
                 
                 time.sleep(PERFORMANCE_CHECK_INTERVAL)
                 
@@ -3038,26 +3089,7 @@ Python版本: {sys.version}
 
     def parse_hashcat_mask(self, mask):
         """解析Hashcat掩码"""
-        charsets = []
-        i = 0
-        while i < len(mask):
-            if mask[i] == "?":
-                if i + 1 < len(mask):
-                    char_type = mask[i+1]
-                    if char_type == "?":
-                        charsets.append("?")
-                        i += 2
-                    elif char_type in self.hashcat_charsets:
-                        charsets.append(self.hashcat_charsets[char_type])
-                        i += 2
-                    else:
-                        raise ValueError(f"无效的Hashcat掩码类型: ?{char_type}")
-                else:
-                    raise ValueError("掩码以无效的'?'结尾")
-            else:
-                charsets.append(mask[i])
-                i += 1
-        return charsets
+        return generator_core.parse_hashcat_mask(mask, self.hashcat_charsets)
 
     def toggle_log_display(self):
         """切换日志显示状态"""
@@ -3636,7 +3668,18 @@ VALUES ('{entry['timestamp']}', {entry['combinations_count']},
             'history_size': HISTORY_SIZE,
             'max_workers': self.max_workers_var.get(),
             'memory_threshold': self.memory_threshold.get(),
-            'cpu_threshold': self.cpu_threshold.get()
+            'cpu_threshold': self.cpu_threshold.get(),
+            'write_queue_budget': self.write_queue_budget_var.get(),
+            'min_free_space': self.min_free_space_var.get(),
+            'spill_dir': self.spill_dir_var.get(),
+            'stripe_dirs': self.stripe_dirs_var.get(),
+            'stripe_mode': self.stripe_mode_var.get(),
+            'compression_level': self.compression_level_var.get(),
+            'recompress_parts': self.recompress_parts.get(),
+            'publish_parts': self.publish_parts.get(),
+            'parallel_parts': self.parallel_parts.get(),
+            'durability': self.durability_var.get(),
+            'checksum': self.checksum_var.get()
         }
 
     def save_settings(self):
@@ -3659,6 +3702,17 @@ VALUES ('{entry['timestamp']}', {entry['combinations_count']},
                 self.max_workers_var.set(settings.get('max_workers', str(MAX_WORKERS)))
                 self.memory_threshold.set(settings.get('memory_threshold', '80'))
                 self.cpu_threshold.set(settings.get('cpu_threshold', '90'))
+                self.write_queue_budget_var.set(settings.get('write_queue_budget', str(WRITE_QUEUE_BUDGET_MB)))
+                self.min_free_space_var.set(settings.get('min_free_space', str(MIN_FREE_SPACE_MB)))
+                self.spill_dir_var.set(settings.get('spill_dir', ''))
+                self.stripe_dirs_var.set(settings.get('stripe_dirs', ''))
+                self.stripe_mode_var.set(settings.get('stripe_mode', generator_core.STRIPE_MODES[0]))
+                self.compression_level_var.set(settings.get('compression_level', str(generator_core.GZIP_LEVEL)))
+                self.recompress_parts.set(settings.get('recompress_parts', False))
+                self.publish_parts.set(settings.get('publish_parts', False))
+                self.parallel_parts.set(settings.get('parallel_parts', False))
+                self.durability_var.set(settings.get('durability', 'none'))
+                self.checksum_var.set(settings.get('checksum', generator_core.MANIFEST_CHECKSUM))
                 
                 self.log("设置已加载")
         except Exception as e:
@@ -3949,7 +4003,7 @@ VALUES ('{entry['timestamp']}', {entry['combinations_count']},
             if self.system_info.get('memory_total', 0) > 16 * 1024**3:
                 # 大内存优化
                 global WRITE_BATCH_SIZE
-                WRITE_BATCH_SIZE = 50000
+                WRITE_BATCH_SIZE = 131072
                 self.log("大内存系统，已调整批处理大小")
             
             # 其他自动调优...
@@ -4189,11 +4243,7 @@ VALUES ('{entry['timestamp']}', {entry['combinations_count']},
                 except:
                     pass
             
-            # 清理进度文件
-            self.cleanup_progress()
-            
             # 重置关键状态
-            self.write_buffer.clear()
             self.processed_count = 0
             self.last_log_update = 0
             self.backup_counter = 0
@@ -0,0 +1,897 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字符组合生成器 - 无界面命令行
+不导入tkinter，直接驱动 generator_core 中的生成器，适合批量脚本运行
+
+示例:
+    python Password_dictionary_generator_v4.0.py --headless --mask "?l?l?d?d" -o out.txt
+    python generator_cli.py --charset abc123 --min-len 1 --max-len 4 -o out.txt
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+import generator_core
+import generator_queue
+import generator_server
+import generator_verify
+from generator_core import CHECKPOINT_INTERVAL, GENERATION_BATCH_SIZE, PROGRESS_UPDATE_INTERVAL
+
+
+def compression_level(text):
+    """--compress-level 参数：1-9 或 auto"""
+    if text == 'auto':
+        return text
+    try:
+        level = int(text)
+    except ValueError:
+        level = 0
+    if not 1 <= level <= 9:
+        raise argparse.ArgumentTypeError("压缩级别必须为 1-9 或 auto")
+    return level
+
+
+def size_argument(text):
+    """--split-bytes 参数：字节数，可带 K/M/G/T 单位"""
+    try:
+        return generator_core.parse_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def build_parser():
+    """构建命令行参数"""
+    parser = argparse.ArgumentParser(
+        description="字符组合生成器 v4.0 - 无界面模式",
+    )
+
+    # 输出设置
+    parser.add_argument("-o", "--output", default="combinations.txt",
+                        help="输出文件；- 表示标准输出，命名管道同样流式写入且不分割")
+    parser.add_argument("--split-size", type=int, default=1000000, help="每个文件的最大组合数")
+    parser.add_argument("--split-bytes", type=size_argument,
+                        help="每个文件的最大（未压缩）字节数，如 4G；按整行切分，与 --split-size 先达到者为准")
+    parser.add_argument("--split-time", type=float,
+                        help="每个文件最长的写入时间（秒），到时换到下一个文件")
+    parser.add_argument("--parallel-parts", action="store_true",
+                        help="可随机访问的模式预先划分各分割文件的序号区间，由 --workers 个进程同时各写一个文件；"
+                             "候选长度不固定时按平均行长换算 --split-bytes")
+    parser.add_argument("--batch-size", type=int, default=GENERATION_BATCH_SIZE, help="每批生成的候选数")
+    parser.add_argument("-s", "--skip", type=int, default=0,
+                        help="跳过前N个候选（可随机访问的模式直接定位，与 hashcat 含义相同）")
+    parser.add_argument("-l", "--limit", type=int, help="从 --skip 起最多生成的候选数（与 hashcat 含义相同）")
+    parser.add_argument("--shard", help="只生成第 i/N 个分片，如 2/8；各节点无需协调，输出合起来与单节点一致")
+    parser.add_argument("--keyspace", action="store_true", help="只输出总组合数后退出")
+    parser.add_argument("--estimate", action="store_true", help="只输出精确的输出大小、预计耗时和可用空间后退出")
+    parser.add_argument("--auto-compress", action="store_true",
+                        help="输出写不下但压缩后写得下时自动改为 .gz 输出（默认拒绝生成）")
+    parser.add_argument("--no-space-check", action="store_true", help="不检查目标文件系统的可用空间")
+    parser.add_argument("--min-free", type=int, default=generator_core.MIN_FREE_SPACE // (1024 * 1024),
+                        help="写入时输出文件系统至少保留的可用空间（MB），低于时暂停、切换策略或停止；0 表示不监控")
+    parser.add_argument("--space-wait", type=float, default=generator_core.SPACE_WAIT,
+                        help="可用空间不足时暂停等待的秒数，之后切换策略或停止")
+    parser.add_argument("--spill-dir", action="append", default=[],
+                        help="可用空间不足时之后的分割文件改写入此目录（可多次指定，按顺序使用）")
+    parser.add_argument("--no-space-compress", action="store_true",
+                        help="可用空间不足时不把之后的分割文件改为压缩输出")
+    parser.add_argument("--stripe-dir", action="append", default=[],
+                        help="把分割文件分配到多个目录（通常各在一块磁盘上）同时写入，可多次指定；"
+                             "位置记录在 输出文件.manifest.jsonl")
+    parser.add_argument("--stripe-mode", default="round-robin", choices=generator_core.STRIPE_MODES,
+                        help="条带输出的分配方式：轮流分配或分配给可用空间最大的目录")
+    parser.add_argument("--checkpoint", help="检查点文件（默认为 输出文件.progress.json）")
+    parser.add_argument("--resume", action="store_true", help="从检查点继续上次中断的任务")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="并行生成的进程数（掩码、字符集、自定义字典组合和字典组合模式）")
+    parser.add_argument("--shard-files", action="store_true",
+                        help="并行时每个进程写入独立的分片文件，不再按 --split-size 分割")
+    parser.add_argument("--mmap", action="store_true",
+                        help="定长候选（纯掩码、最小长度等于最大长度的字符集）预分配文件并内存映射，"
+                             "各进程直接写入计算出的偏移")
+
+    # 压缩
+    compression = parser.add_argument_group("压缩输出")
+    compression.add_argument("--compress-level", type=compression_level, default=generator_core.GZIP_LEVEL,
+                             help="gzip 压缩级别 1-9，auto 按实测的CPU与磁盘速度选择")
+    compression.add_argument("--compress-workers", type=int, default=os.cpu_count() or 1,
+                             help="并行压缩线程数（输出文件以 .gz 结尾或使用 --recompress-parts 时）")
+    compression.add_argument("--recompress-parts", action="store_true",
+                             help="以未压缩方式写入，每个分割文件写完后在后台压缩为 .gz")
+    parser.add_argument("--publish-parts", action="store_true",
+                        help="分割文件以 .tmp 临时名写入，写完后原子改名，下游工具看到正式文件名或清单中的"
+                             "记录即可边生成边处理")
+    parser.add_argument("--durability", choices=generator_core.DURABILITY_MODES, default="none",
+                        help="落盘策略：none 不 fsync（最快，断电后检查点之前的数据也可能丢失）；interval 每写入 "
+                             "--fsync-bytes 或每隔 --fsync-seconds fsync 一次；close 每个分割文件以临时文件写入，"
+                             "写完 fsync 后改名。检查点只记录已 fsync 的位置")
+    parser.add_argument("--fsync-bytes", type=size_argument, default=generator_core.FSYNC_BYTES,
+                        help="interval 策略每写入多少字节 fsync 一次，如 256M")
+    parser.add_argument("--fsync-seconds", type=float, default=generator_core.FSYNC_SECONDS,
+                        help="interval 策略距上次 fsync 超过多少秒时再 fsync")
+    parser.add_argument("--checksum", choices=generator_core.CHECKSUM_ALGORITHMS,
+                        help=f"清单（输出文件.manifest.jsonl）中分割文件的校验算法（默认 "
+                             f"{generator_core.MANIFEST_CHECKSUM}），写出时逐块计算；xxh64 需要 xxhash 模块，"
+                             "none 只记录序号区间、候选数和字节数。流式输出没有清单，不能指定")
+    compression.add_argument("--seekable-index", action="store_true",
+                             help="为每个 .gz 文件写出可定位索引（文件名.idx），可直接读取第N个候选")
+    compression.add_argument("--read", metavar="FILE",
+                             help="从带索引的 .gz 文件读取候选写到标准输出；-s/-l 指定序号区间，"
+                                  "--shard i/N 按成员边界均分给N个读取进程")
+
+    # 输出校验
+    verify = parser.add_argument_group("输出校验")
+    verify.add_argument("--verify", nargs='+', metavar="FILE",
+                        help="校验已生成的输出：一个清单文件（输出文件.manifest.jsonl）或一组分割文件；"
+                             "同时给出生成参数时核对候选总数并随机抽查候选")
+    verify.add_argument("--verify-workers", type=int, default=os.cpu_count() or 1,
+                        help="校验时并行读取文件的进程数")
+    verify.add_argument("--verify-samples", type=int, default=generator_verify.VERIFY_SAMPLES,
+                        help="随机抽查的候选数（需要可随机访问的生成模式），0 不抽查")
+
+    # 掩码与字符集
+    parser.add_argument("--mask", help="Hashcat掩码，如 ?l?l?l?l?d?d?d?d")
+    parser.add_argument("--charset", help="基础字符集（未使用掩码时）")
+    parser.add_argument("--include-special", action="store_true", help="字符集包含特殊字符")
+    parser.add_argument("--min-len", type=int, default=1, help="最小长度")
+    parser.add_argument("--max-len", type=int, default=8, help="最大长度")
+
+    # 字典
+    parser.add_argument("--dict-a", dest="dict_file", help="字典文件A")
+    parser.add_argument("--dict-b", dest="dict_b_file", help="字典文件B")
+    parser.add_argument("--combo-mode", dest="dict_combo", default="none",
+                        choices=["none", "dict_first", "mask_first", "dict_ab", "dict_ba"],
+                        help="字典组合模式")
+    parser.add_argument("--dict-pos", default="none",
+                        choices=["none", "append_before", "append_after"], help="字典位置")
+
+    # 字典处理选项
+    processing = parser.add_argument_group("字典处理选项")
+    processing.add_argument("--process-mode", default="independent",
+                            choices=["independent", "combined"], help="处理模式")
+    processing.add_argument("--uppercase", action="store_true", help="大写")
+    processing.add_argument("--lowercase", action="store_true", help="小写")
+    processing.add_argument("--capitalize", action="store_true", help="首字母大写")
+    processing.add_argument("--reverse", action="store_true", help="字符串反转")
+    processing.add_argument("--remove-start", default="0", help="移除开头字符数")
+    processing.add_argument("--remove-end", default="0", help="移除结尾字符数")
+    processing.add_argument("--remove-start-independent", action="store_true", help="独立处理开头移除")
+    processing.add_argument("--remove-end-independent", action="store_true", help="独立处理结尾移除")
+    processing.add_argument("--remove-combined", action="store_true", help="同时移除开头和结尾")
+    processing.add_argument("--add-start", default="", help="开头添加")
+    processing.add_argument("--add-end", default="", help="结尾添加")
+    processing.add_argument("--add-start-independent", action="store_true", help="独立处理开头添加")
+    processing.add_argument("--add-end-independent", action="store_true", help="独立处理结尾添加")
+    processing.add_argument("--add-combined", action="store_true", help="同时添加开头和结尾")
+    processing.add_argument("--repeat-count", default="1", help="重复次数")
+    processing.add_argument("--repeat-space-count", default="1", help="空格重复次数")
+    processing.add_argument("--repeat-processed", action="store_true", help="重复处理已处理的数据")
+    processing.add_argument("--repeat-processed-count", default="2", help="重复处理次数")
+    processing.add_argument("--repeat-processed-space-count", default="2", help="空格重复处理次数")
+
+    # 高级生成
+    advanced = parser.add_argument_group("高级生成")
+    advanced.add_argument("--custom-chars", help="自定义字典组合字符（用逗号分隔），指定后启用自定义字典组合")
+    advanced.add_argument("--custom-length", type=int, default=3, help="自定义字典组合生成长度")
+    advanced.add_argument("--custom-mode", default="combination",
+                          choices=["combination", "permutation", "permutation2"], help="自定义字典组合模式")
+    advanced.add_argument("--connector", default="-", help="全排列模式2的连接符号")
+    advanced.add_argument("--repeat-char", action="store_true", help="启用重复字符模式")
+    advanced.add_argument("--repeat-len", type=int, default=2, help="重复次数")
+    advanced.add_argument("--pattern-len", type=int, default=3, help="模式长度")
+    advanced.add_argument("--pattern-type", default="repeat",
+                          choices=["repeat", "sequential", "sequential_repeat"], help="模式类型")
+    advanced.add_argument("--custom-charset", help="重复字符模式的自定义字符集")
+
+    # 共享目录任务队列
+    queue = parser.add_argument_group("共享目录任务队列")
+    queue.add_argument("--queue-dir", help="任务队列目录（本地或NFS共享）；未指定其它队列操作时作为节点领取并处理")
+    queue.add_argument("--queue-init", action="store_true", help="按当前生成参数创建任务队列，输出文件名取自 -o")
+    queue.add_argument("--queue-status", action="store_true", help="显示任务队列进度")
+    queue.add_argument("--chunk-size", type=int, default=generator_queue.QUEUE_CHUNK_SIZE, help="队列中每块的候选数")
+    queue.add_argument("--lease-timeout", type=int, default=generator_queue.LEASE_TIMEOUT,
+                       help="租约超时秒数，超时的块由其它节点（或候选服务的其它消费者）重新领取")
+
+    # 本地候选服务
+    server = parser.add_argument_group("本地候选服务")
+    server.add_argument("--serve", metavar="ADDRESS",
+                        help="把当前任务的数据块分发给连接的消费者，地址为 unix:/路径 或 [主机:]端口")
+    server.add_argument("--connect", metavar="ADDRESS",
+                        help="作为消费者连接候选服务，领取的候选写入 -o（- 为标准输出）")
+
+    parser.add_argument("-q", "--quiet", action="store_true", help="只输出警告和错误")
+    return parser
+
+
+def build_spec(args):
+    """把命令行参数转换为生成参数（键名与界面变量一致）"""
+    processing = {key: getattr(args, key) for key in generator_core.DEFAULT_PROCESSING_OPTIONS}
+    return {
+        'mask': args.mask,
+        'charset': args.charset,
+        'include_special': args.include_special,
+        'min_len': args.min_len,
+        'max_len': args.max_len,
+        'dict_file': args.dict_file,
+        'dict_b_file': args.dict_b_file,
+        'dict_combo': args.dict_combo,
+        'dict_pos': args.dict_pos,
+        'processing': processing,
+        'custom_dict': bool(args.custom_chars),
+        'custom_chars': args.custom_chars,
+        'custom_dict_length': args.custom_length,
+        'custom_dict_mode': args.custom_mode,
+        'connector': args.connector,
+        'repeat_char': args.repeat_char,
+        'repeat_len': args.repeat_len,
+        'pattern_len': args.pattern_len,
+        'pattern_type': args.pattern_type,
+        'custom_charset': args.custom_charset,
+    }
+
+
+def run_headless(settings, output_file, split_size, *, batch_size=GENERATION_BATCH_SIZE,
+                 stop_event=None, log=generator_core.default_log, skip=0, limit=None,
+                 workers=1, shard_files=False, shard=None, checkpoint_file=None, resume=False,
+                 writer_options=None, mmap_output=False, space_check=True, auto_compress=False,
+                 split_bytes=None, split_seconds=None, parallel_parts=False):
+    """按设置生成组合并写入（自动分割）输出文件，返回已写入的组合数
+
+    split_size 之后的参数只能按关键字传入。skip/limit 只生成序号 [skip, skip+limit) 的候选，shard=(i, N) 再取其中第 i 份；
+    workers 大于1时多进程并行，shard_files 为真时每个进程写入独立的分片文件。
+    checkpoint_file 定期记录已落盘的位置，resume 为真时从中断处继续。
+    mmap_output 为真且候选定长时预分配分割文件并由各进程直接写入映射后的偏移处。
+    space_check 为真时先按精确的输出大小检查可用空间，写不下时拒绝生成，
+    auto_compress 为真且压缩后写得下时改为 .gz 输出。
+    split_bytes/split_seconds 另按字节数、写入时间分割文件，任一条件达到即换文件；
+    parallel_parts 为真时预先划分各文件的序号区间，由 workers 个进程同时各写一个文件。
+
+    writer_options 为写入相关的选项，除传给 PartWriter 的压缩、发布和落盘策略
+    （durability/fsync_bytes/fsync_seconds，见 generator_core.durability_options，检查点只记录
+    已 fsync 的位置）外，还可包含：
+    - checksum: 分割文件清单（输出文件.manifest.jsonl）的校验算法，任务完成后清单整理为
+      任务汇总加按序号排列的记录；分片文件和内存映射输出同样登记。流式输出没有分割文件，
+      不写清单，此时指定校验算法（none 以外）抛出 ValueError；
+    - space: SpaceGuard 的参数，写入时监控可用空间，空间耗尽前停止并保存检查点；
+    - stripe: {'directories': [...], 'mode': ...}，分割文件分配到多个目录同时写入。
+    """
+    writer_options = dict(writer_options or {})
+    checksum = writer_options.pop('checksum', None)
+    space_options = writer_options.pop('space', None)
+    stripe = writer_options.pop('stripe', None)
+    durability = generator_core.durability_policy(writer_options.get('durability', 'none'),
+                                                  writer_options.get('fsync_bytes', generator_core.FSYNC_BYTES),
+                                                  writer_options.get('fsync_seconds', generator_core.FSYNC_SECONDS))
+    writer_options.update(generator_core.durability_options(durability))
+    policy = generator_core.split_policy(split_bytes, split_seconds, parallel_parts)
+    start_time = time.time()
+    total_combinations = generator_core.settings_total(settings)
+    skip, stop = generator_core.resolve_range(total_combinations, skip, limit, shard)
+    if (skip, stop) != (0, total_combinations):
+        if shard:
+            log(f"分片 {shard[0]}/{shard[1]}")
+        log(f"生成范围: 第 {skip} 至 {stop} 个候选（共 {total_combinations} 个）")
+        total_combinations = stop - skip
+    else:
+        stop = None
+    log(f"预计总组合数: {total_combinations}")
+
+    parallel = workers > 1 and generator_core.is_indexable(settings)
+    if workers > 1 and not parallel:
+        log("当前生成模式不支持并行生成，使用单进程", "warning")
+
+    if generator_core.is_stream_target(output_file):
+        if checksum not in (None, 'none'):
+            raise ValueError("流式输出不写分割文件，没有清单，不能指定 --checksum")
+        log("流式输出不写分割文件清单，候选数和校验值需由读取端统计", "warning")
+        return run_stream(settings, output_file, batch_size=batch_size, stop_event=stop_event, log=log,
+                          skip=skip, stop=stop, workers=workers if parallel else 1, resume=resume,
+                          start_time=start_time)
+
+    checksum = checksum or generator_core.MANIFEST_CHECKSUM
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if space_check and not resume:
+        output_file = check_output_space(settings, output_file, skip, stop, auto_compress, log,
+                                         stripe['directories'] if stripe else None)
+
+    if stripe and (mmap_output or (parallel and shard_files)):
+        log("条带输出只用于按 --split-size 分割的普通写入，本次忽略 --stripe-dir", "warning")
+
+    if mmap_output and writer_options.get('publish'):
+        log("内存映射输出直接写入正式文件名，不能写完后发布，改为普通写入", "warning")
+        mmap_output = False
+    if mmap_output and durability['mode'] != 'none':
+        log(f"内存映射输出不按落盘策略 {durability['mode']} 同步，改为普通写入", "warning")
+        mmap_output = False
+
+    # 定长候选时字节上限精确换算为候选数
+    part_size, part_bytes = generator_core.effective_split(settings, split_size, split_bytes)
+    if part_size != split_size and part_bytes is None:
+        log(f"按每个文件 {generator_core.format_size(split_bytes)} 分割：每个文件最多 {part_size} 个候选")
+
+    if parallel_parts and not (shard_files or split_seconds) and generator_core.is_indexable(settings):
+        if stripe or mmap_output:
+            log("并行写分割文件时忽略 --stripe-dir 和 --mmap", "warning")
+        return run_range_parts(settings, output_file, split_size=split_size, split_bytes=split_bytes,
+                               policy=policy, workers=workers, skip=skip, stop=stop, batch_size=batch_size,
+                               stop_event=stop_event, log=log, checkpoint_file=checkpoint_file, resume=resume,
+                               writer_options=writer_options, checksum=checksum,
+                               total_combinations=total_combinations, start_time=start_time,
+                               durability=durability)
+    if parallel_parts:
+        log("按时间分割、分片文件模式或当前生成模式不能预先划分分割文件的区间，改为顺序写入", "warning")
+
+    if parallel and shard_files:
+        if checkpoint_file:
+            log("分片文件模式不记录检查点", "warning")
+        manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file), checksum=checksum)
+        shards = generator_core.write_shard_files(
+            settings, output_file, workers, skip, stop, batch_size, stop_event, log, manifest=manifest
+        )
+        total_combinations_written = sum(shard[3] for shard in shards)
+        stopped = stop_event is not None and stop_event.is_set()
+        log("生成已停止" if stopped else "生成完成")
+        log(f"已生成组合数: {total_combinations_written}")
+        log(f"输出已保存到 {len(shards)} 个分片文件")
+        if not stopped:
+            finalize_manifest(manifest, settings, output_file, split_size, skip, stop, policy,
+                              total_combinations, log)
+        log(f"用时: {time.time() - start_time:.2f} 秒")
+        return total_combinations_written
+
+    if mmap_output:
+        if output_file.endswith('.gz'):
+            log("压缩输出不能使用内存映射，改为普通写入", "warning")
+        elif generator_core.fixed_line_length(settings) is None:
+            log("当前生成模式的候选长度不固定，不能使用内存映射，改为普通写入", "warning")
+        else:
+            if resume:
+                log("内存映射输出不支持续传，将重新生成", "warning")
+            if split_seconds:
+                log("内存映射输出不按时间分割，忽略 --split-time", "warning")
+            manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file),
+                                                   checksum=checksum)
+            total_combinations_written = generator_core.write_mmap_parts(
+                settings, output_file, part_size, workers, skip, stop, batch_size, stop_event, log,
+                manifest=manifest
+            )
+            stopped = stop_event is not None and stop_event.is_set()
+            log("生成已停止，输出不完整" if stopped else "生成完成")
+            log(f"已生成组合数: {total_combinations_written}")
+            if not stopped:
+                finalize_manifest(manifest, settings, output_file, split_size, skip, stop, policy,
+                                  total_combinations, log)
+            log(f"用时: {time.time() - start_time:.2f} 秒")
+            return total_combinations_written
+
+    # 检查点：续传时校验任务参数并截断当前文件到记录的偏移
+    checkpoint = None
+    if checkpoint_file:
+        checkpoint = generator_core.new_checkpoint(settings, output_file, split_size, skip, stop,
+                                                   total_combinations, policy, durability)
+        if resume:
+            saved = generator_core.load_checkpoint(checkpoint_file)
+            if saved is None:
+                log(f"未找到检查点 {checkpoint_file}，从头开始生成", "warning")
+            elif saved['fingerprint'] != checkpoint['fingerprint'] or saved['output_file'] != checkpoint['output_file']:
+                raise ValueError("检查点与当前任务参数不一致，无法续传")
+            else:
+                generator_core.prepare_resume(saved)
+                checkpoint = saved
+                saved_mode = (saved.get('durability') or {'mode': 'none'})['mode']
+                checkpoint['durability'] = durability
+                log(f"从检查点续传: 已完成 {saved['written']} 个候选，"
+                    f"当前第 {saved['file_index']} 个文件偏移 {saved['offset']} 字节（落盘策略 {saved_mode}）")
+
+    cursor = checkpoint['cursor'] if checkpoint else skip
+    if parallel:
+        batches = generator_core.parallel_batches(
+            settings, workers, cursor, stop, batch_size=batch_size, stop_event=stop_event, log=log
+        )
+    else:
+        batches = generator_core.combination_batches(
+            batch_size=batch_size, stop_event=stop_event, log=log, start=cursor, stop=stop, **settings
+        )
+
+    total_combinations_written = checkpoint['written'] if checkpoint else 0
+    file_suffix_counter = checkpoint['file_index'] if checkpoint else 1
+    in_file = checkpoint['in_file'] if checkpoint else 0
+    in_file_bytes = checkpoint.get('in_file_bytes', 0) if checkpoint else 0
+    space_guard = None
+    if space_options and space_options.get('min_free'):
+        space_guard = generator_core.SpaceGuard(stop_event=stop_event, log=log, **space_options)
+    # 续传时检查点所在的文件以追加方式打开，其余文件新建
+    append_index = file_suffix_counter if in_file else 0
+    layout = checkpoint.get('layout') if checkpoint else None
+    manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file),
+                                           append=resume and total_combinations_written > 0, checksum=checksum,
+                                           durable=durability['mode'] != 'none')
+    if stripe:
+        for directory in stripe['directories']:
+            os.makedirs(directory, exist_ok=True)
+        writer = generator_core.StripedPartWriter(output_file, stripe['directories'], stripe['mode'],
+                                                  append_index=append_index, layout=layout,
+                                                  space_guard=space_guard, manifest=manifest, log=log,
+                                                  first_candidate=cursor, append_count=in_file,
+                                                  append_bytes=in_file_bytes, **writer_options)
+        log(f"条带输出到 {len(stripe['directories'])} 个目录（{stripe['mode']}）")
+    else:
+        writer = generator_core.PartWriter(output_file, append_index=append_index,
+                                           log=log, first_candidate=cursor,
+                                           layout=layout, space_guard=space_guard, manifest=manifest,
+                                           append_count=in_file, append_bytes=in_file_bytes, **writer_options)
+    # 上次中断前已写完、但尚未改名或压缩的分割文件
+    writer.recover_parts(file_suffix_counter)
+    last_progress_update = total_combinations_written
+    last_checkpoint = time.time()
+    completed = False
+    close_error = None
+    try:
+        # 停止检查、进度和文件分割都按批次进行
+        for block, count, file_index in generator_core.split_batches(
+                batches, part_size, stop_event, file_suffix_counter, in_file,
+                part_bytes, split_seconds, in_file_bytes):
+            if file_index != file_suffix_counter:
+                if checkpoint and writer.publish:
+                    # 上一个文件改名发布之前先记录它已写完（按落盘策略先 fsync），续传时不会回头截断已发布的文件
+                    writer.make_durable()
+                    generator_core.update_checkpoint(checkpoint, total_combinations_written, file_index, 0, 0,
+                                                     writer.writing_path(file_index), writer.layout)
+                    generator_core.save_checkpoint(checkpoint_file, checkpoint)
+                file_suffix_counter = file_index
+                log(f"继续输出到新文件: {writer.part_path(file_index)}")
+
+            writer.write(file_index, block, count)
+            total_combinations_written += count
+
+            if total_combinations_written - last_progress_update >= PROGRESS_UPDATE_INTERVAL and total_combinations:
+                last_progress_update = total_combinations_written
+                progress = min(total_combinations_written / total_combinations * 100, 100)
+                log(f"已生成: {total_combinations_written}/{total_combinations} ({progress:.1f}%)")
+
+            if checkpoint and time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                # 只记录按落盘策略可信的位置
+                last_checkpoint = time.time()
+                generator_core.checkpoint_writer(checkpoint, writer)
+                generator_core.save_checkpoint(checkpoint_file, checkpoint)
+        completed = not (stop_event is not None and stop_event.is_set())
+    finally:
+        saved = True
+        try:
+            try:
+                if writer.current_file and checkpoint:
+                    writer.make_durable()
+                    generator_core.checkpoint_writer(checkpoint, writer)
+                if completed:
+                    writer.finish()
+            finally:
+                writer.close()
+        except OSError as e:
+            # 无法确认落盘位置时保留上一次的检查点，输出不完整，不能按完成处理
+            log(f"关闭输出文件时出错: {e}", "error")
+            saved = completed = False
+            close_error = e
+        if checkpoint:
+            if completed:
+                if os.path.exists(checkpoint_file):
+                    os.remove(checkpoint_file)
+            elif saved:
+                # 中断或出错：记录已落盘的位置，之后可用 --resume 继续
+                generator_core.save_checkpoint(checkpoint_file, checkpoint)
+                log(f"检查点已保存: {checkpoint_file}，可使用 --resume 继续")
+    if close_error is not None:
+        raise close_error
+
+    stopped = stop_event is not None and stop_event.is_set()
+    log("生成已停止" if stopped else "生成完成")
+    log(f"已生成组合数: {total_combinations_written}")
+    if space_guard is not None and space_guard.pauses:
+        log(f"因可用空间不足暂停 {space_guard.pauses} 次，共 {space_guard.pause_time:.1f} 秒", "warning")
+    for entry in writer.layout:
+        if stripe and entry['directory']:
+            continue
+        log(f"第 {entry['from']} 个起的分割文件" + (f"写入 {entry['directory']}" if entry['directory'] else "改为 gzip 压缩"))
+    if file_suffix_counter > 1:
+        log(f"输出已保存到 {file_suffix_counter} 个文件，以 {output_file} 为基础名")
+    elif total_combinations_written > 0:
+        log(f"输出已保存到: {output_file}")
+    if completed:
+        finalize_manifest(manifest, settings, output_file, split_size, skip, stop, policy, total_combinations, log)
+    log(f"用时: {time.time() - start_time:.2f} 秒")
+    return total_combinations_written
+
+
+def finalize_manifest(manifest, settings, output_file, split_size, skip, stop, policy, total_combinations, log):
+    """任务完成：把分割文件清单整理为任务汇总加按序号排列的记录，返回汇总"""
+    job = manifest.finalize(output_file=os.path.abspath(output_file), first=skip,
+                            fingerprint=generator_core.job_fingerprint(settings, split_size, skip, stop, policy))
+    log(f"分割文件清单: {manifest.path}（{job['parts']} 个文件，{job['count']} 个候选，"
+        f"{generator_core.format_size(job['bytes'])}）")
+    if job['count'] != total_combinations:
+        log(f"清单登记的候选数 {job['count']} 与任务的 {total_combinations} 个不一致", "warning")
+    return job
+
+
+def run_range_parts(settings, output_file, *, split_size, split_bytes, policy, workers, skip, stop, batch_size,
+                    stop_event, log, checkpoint_file, resume, writer_options, checksum, total_combinations,
+                    start_time, durability):
+    """按预先划分的区间由 workers 个进程同时各写一个分割文件，返回已写入的组合数
+
+    由 run_headless 调用，参数与其中同名的局部变量一一对应，只能按关键字传入。
+
+    检查点只用于续传前确认任务参数一致，已写完的文件以清单中的登记为准。
+    """
+    checkpoint = None
+    if checkpoint_file:
+        checkpoint = generator_core.new_checkpoint(settings, output_file, split_size, skip, stop,
+                                                   total_combinations, policy, durability)
+        if resume:
+            saved = generator_core.load_checkpoint(checkpoint_file)
+            if saved is None:
+                log(f"未找到检查点 {checkpoint_file}，从头开始生成", "warning")
+                resume = False
+            elif saved['fingerprint'] != checkpoint['fingerprint'] or saved['output_file'] != checkpoint['output_file']:
+                raise ValueError("检查点与当前任务参数不一致，无法续传")
+            else:
+                checkpoint = saved
+        generator_core.save_checkpoint(checkpoint_file, checkpoint)
+
+    total_combinations_written = generator_core.write_range_parts(
+        settings, output_file, split_size, workers, skip, stop, split_bytes, batch_size, stop_event, log,
+        writer_options, checksum, resume=resume and checkpoint is not None)
+    completed = not (stop_event is not None and stop_event.is_set())
+    if checkpoint:
+        if completed:
+            if os.path.exists(checkpoint_file):
+                os.remove(checkpoint_file)
+        else:
+            checkpoint.update(written=total_combinations_written, timestamp=time.time())
+            generator_core.save_checkpoint(checkpoint_file, checkpoint)
+            log(f"检查点已保存: {checkpoint_file}，可使用 --resume 继续")
+
+    log("生成已停止" if not completed else "生成完成")
+    log(f"已生成组合数: {total_combinations_written}")
+    if completed:
+        manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file), append=True,
+                                               checksum=checksum, durable=durability['mode'] != 'none')
+        finalize_manifest(manifest, settings, output_file, split_size, skip, stop, policy, total_combinations, log)
+    log(f"用时: {time.time() - start_time:.2f} 秒")
+    return total_combinations_written
+
+
+def check_output_space(settings, output_file, start, stop, auto_compress=False, log=generator_core.default_log,
+                       directories=None):
+    """按精确的输出大小检查目标文件系统，返回实际使用的输出文件名；写不下时抛出 ValueError
+
+    directories 为条带输出的目录时按这些目录的可用空间之和检查。
+    """
+    if directories:
+        for directory in directories:
+            os.makedirs(directory, exist_ok=True)
+    estimate = generator_core.estimate_job(settings, output_file, start, stop, directories=directories)
+    log(generator_core.describe_estimate(estimate))
+    plan = generator_core.plan_output_space(estimate)
+    if plan == "ok":
+        return output_file
+    if plan == "compress" and auto_compress:
+        log(f"未压缩输出写不下，改为压缩输出（预计约 {generator_core.format_size(estimate['compressed_bytes'])}）",
+            "warning")
+        return output_file + '.gz'
+    message = f"目标文件系统空间不足: 需要 {generator_core.format_size(estimate['bytes'])}，" \
+              f"可用 {generator_core.format_size(estimate['free'])}"
+    if plan == "compress":
+        message += "；压缩后可写下，可使用 --auto-compress"
+    raise ValueError(message)
+
+
+def run_stream(settings, output_file, *, batch_size, stop_event, log, skip, stop, workers, resume, start_time):
+    """把候选流式写到标准输出（"-"）或命名管道，不分割文件、不记录检查点"""
+    if resume:
+        log("流式输出不支持续传，请用 --skip 指定起点", "warning")
+    if workers > 1:
+        batches = generator_core.parallel_batches(
+            settings, workers, skip, stop, batch_size=batch_size, stop_event=stop_event, log=log
+        )
+    else:
+        batches = generator_core.combination_batches(
+            batch_size=batch_size, stop_event=stop_event, log=log, start=skip, stop=stop, **settings
+        )
+
+    if output_file == '-':
+        total_combinations_written, closed = generator_core.stream_batches(batches, sys.stdout.buffer, stop_event)
+        if closed:
+            # 读取端已退出：把标准输出指向 /dev/null，避免解释器退出时刷新缓冲区再次报错
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    else:
+        log(f"等待读取端打开命名管道: {output_file}")
+        with open(output_file, 'wb', buffering=generator_core.WRITE_BUFFER_SIZE) as out:
+            total_combinations_written, closed = generator_core.stream_batches(batches, out, stop_event)
+            if closed:
+                # 缓冲区中剩余的数据已无人读取，关闭时不再刷新
+                out.raw.close()
+    if closed:
+        log("读取端已关闭，停止生成")
+    else:
+        log("生成已停止" if stop_event is not None and stop_event.is_set() else "生成完成")
+    log(f"已输出组合数: {total_combinations_written}")
+    log(f"用时: {time.time() - start_time:.2f} 秒")
+    return total_combinations_written
+
+
+def run_read(args, log):
+    """从可定位压缩文件读取序号区间内的候选，写到标准输出"""
+    try:
+        index = generator_core.BlockIndex.load(args.read)
+        start = max(args.skip, index.first_candidate)
+        stop = start + args.limit if args.limit is not None else None
+        if args.shard:
+            shard_index, shards = generator_core.parse_shard(args.shard)
+            shard_start, shard_stop = index.split(shards)[shard_index - 1]
+            start = max(start, shard_start)
+            stop = shard_stop if stop is None else min(stop, shard_stop)
+        out = sys.stdout.buffer
+        for block in generator_core.read_candidates(args.read, start, stop, index):
+            out.write(block)
+        out.flush()
+    except BrokenPipeError:
+        return 0
+    except (ValueError, IndexError) as e:
+        log(f"错误: {e}", "error")
+        return 2
+    except OSError as e:
+        log(f"读取文件时出错: {e}", "error")
+        return 1
+    return 0
+
+
+def run_verify(args, log):
+    """校验已生成的输出，全部通过时返回0"""
+    settings = None
+    start, stop = args.skip, None
+    try:
+        if args.mask or args.charset or args.dict_file or args.custom_chars or args.repeat_char:
+            shard = generator_core.parse_shard(args.shard) if args.shard else None
+            settings = generator_core.prepare_generation(build_spec(args), log=log)
+            start, stop = generator_core.resolve_range(generator_core.settings_total(settings),
+                                                       args.skip, args.limit, shard)
+        report = generator_verify.verify_output(args.verify, settings, start, stop, args.verify_workers,
+                                                args.verify_samples, log=log)
+    except ValueError as e:
+        log(f"错误: {e}", "error")
+        return 2
+    except OSError as e:
+        log(f"校验时出错: {e}", "error")
+        return 1
+    for problem in report['problems']:
+        log(problem, "error")
+    log(f"共 {report['parts']} 个文件，{report['lines']} 个候选，{generator_core.format_size(report['bytes'])}"
+        + (f"，抽查 {report['sampled']} 个候选" if report['sampled'] else ""))
+    if report['problems']:
+        log(f"校验未通过：发现 {len(report['problems'])} 个问题", "error")
+        return 1
+    log("校验通过")
+    return 0
+
+
+def run_serve(args, settings, shard, log):
+    """运行本地候选服务，直到全部数据块被确认或收到中断信号"""
+    total = generator_core.settings_total(settings)
+    start, stop = generator_core.resolve_range(total, args.skip, args.limit, shard)
+    log(f"分发范围: 第 {start} 至 {stop} 个候选（共 {stop - start} 个）")
+    if args.workers > 1 and generator_core.is_indexable(settings):
+        batches = generator_core.parallel_batches(
+            settings, args.workers, start, stop, batch_size=args.batch_size, log=log
+        )
+    else:
+        batches = generator_core.combination_batches(
+            batch_size=args.batch_size, log=log, start=start, stop=stop, **settings
+        )
+    stop_event = threading.Event()
+    try:
+        generator_server.serve(args.serve, batches, start, args.lease_timeout, stop_event, log)
+    except KeyboardInterrupt:
+        stop_event.set()
+        return 130
+    except (ValueError, OSError) as e:
+        log(f"候选服务出错: {e}", "error")
+        return 1
+    return 0
+
+
+def run_connect(args, log):
+    """作为消费者从候选服务领取数据块，写入输出文件或标准输出"""
+    try:
+        if args.output == '-':
+            out = sys.stdout.buffer
+            try:
+                generator_server.consume(args.connect, out.write, log=log)
+                out.flush()
+            except BrokenPipeError:
+                # 读取端已退出，未确认的块由服务端重新分发
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        else:
+            with open(args.output, 'wb', buffering=generator_core.WRITE_BUFFER_SIZE) as out:
+                generator_server.consume(args.connect, out.write, log=log)
+    except KeyboardInterrupt:
+        return 130
+    except (ValueError, OSError) as e:
+        log(f"连接候选服务出错: {e}", "error")
+        return 1
+    return 0
+
+
+def run_queue(args, log):
+    """作为节点处理任务队列，或显示队列进度"""
+    try:
+        if args.queue_status:
+            job = generator_queue.load_job(args.queue_dir)
+            status = generator_queue.queue_status(args.queue_dir)
+            print(f"总块数: {job['chunks']}  待领取: {status['pending']}  "
+                  f"处理中: {status['claimed']}  已完成: {status['done']}")
+            return 0
+        generator_queue.run_worker(args.queue_dir, lease_timeout=args.lease_timeout,
+                                   batch_size=args.batch_size, log=log)
+    except KeyboardInterrupt:
+        log("收到中断信号，已放回当前块", "warning")
+        return 130
+    except ValueError as e:
+        log(f"错误: {e}", "error")
+        return 2
+    except OSError as e:
+        log(f"处理任务队列时出错: {e}", "error")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    """命令行入口，返回进程退出码"""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        stream=sys.stderr,
+    )
+    log = generator_core.default_log
+
+    if args.split_size <= 0:
+        log("每个文件的最大组合数必须为正整数", "error")
+        return 2
+    if args.split_time is not None and args.split_time <= 0:
+        log("--split-time 必须为正数", "error")
+        return 2
+    if args.fsync_seconds < 0:
+        log("--fsync-seconds 不能为负数", "error")
+        return 2
+    if args.batch_size <= 0:
+        log("每批生成的候选数必须为正整数", "error")
+        return 2
+    if args.workers <= 0:
+        log("进程数必须为正整数", "error")
+        return 2
+    if args.compress_workers <= 0:
+        log("压缩线程数必须为正整数", "error")
+        return 2
+    if args.min_free < 0 or args.space_wait < 0:
+        log("--min-free 和 --space-wait 不能为负数", "error")
+        return 2
+    if args.skip < 0 or (args.limit is not None and args.limit < 0):
+        log("--skip 和 --limit 不能为负数", "error")
+        return 2
+
+    if args.verify_workers <= 0 or args.verify_samples < 0:
+        log("--verify-workers 必须为正整数，--verify-samples 不能为负数", "error")
+        return 2
+
+    if args.read:
+        return run_read(args, log)
+    if args.verify:
+        return run_verify(args, log)
+    if args.connect:
+        return run_connect(args, log)
+    if args.queue_dir and not args.queue_init:
+        return run_queue(args, log)
+
+    try:
+        shard = generator_core.parse_shard(args.shard) if args.shard else None
+        settings = generator_core.prepare_generation(build_spec(args), log=log)
+    except (ValueError, OSError) as e:
+        log(f"错误: {e}", "error")
+        return 2
+
+    if args.keyspace:
+        print(generator_core.settings_total(settings))
+        return 0
+
+    if args.estimate:
+        total = generator_core.settings_total(settings)
+        start, stop = generator_core.resolve_range(total, args.skip, args.limit, shard)
+        output_dir = os.path.dirname(os.path.abspath(args.output))
+        if not os.path.isdir(output_dir):
+            output_dir = os.getcwd()
+        estimate = generator_core.estimate_job(settings, os.path.join(output_dir, os.path.basename(args.output)),
+                                               start, stop)
+        print(f"候选数: {estimate['candidates']}")
+        print(f"输出大小: {estimate['bytes']} 字节（{'精确' if estimate['exact'] else '估算'}，"
+              f"{generator_core.format_size(estimate['bytes'])}）")
+        if estimate['compressed_bytes'] is not None:
+            print(f"gzip 压缩后约: {generator_core.format_size(estimate['compressed_bytes'])}")
+        if estimate['seconds'] is not None:
+            print(f"预计生成耗时: {generator_core.format_duration(estimate['seconds'])}"
+                  f"（实测 {generator_core.format_size(estimate['generate_rate'])}/秒）")
+        print(f"可用空间: {generator_core.format_size(estimate['free'])}（{output_dir}）")
+        return 0
+
+    if args.serve:
+        return run_serve(args, settings, shard, log)
+
+    if args.queue_init:
+        if args.chunk_size <= 0:
+            log("每块的候选数必须为正整数", "error")
+            return 2
+        try:
+            generator_queue.init_queue(args.queue_dir, build_spec(args), args.chunk_size, args.output, log)
+        except OSError as e:
+            log(f"创建任务队列时出错: {e}", "error")
+            return 1
+        return 0
+
+    # 第一次 Ctrl+C 只请求停止：当前数据块写完后保存检查点再退出，计数与已写出的数据保持一致；
+    # 再按一次立即中断
+    stop_event = threading.Event()
+
+    def request_stop(_signum, _frame):
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    try:
+        run_headless(settings, args.output, args.split_size, batch_size=args.batch_size,
+                     stop_event=stop_event, log=log, skip=args.skip, limit=args.limit, workers=args.workers,
+                     shard_files=args.shard_files, shard=shard,
+                     checkpoint_file=args.checkpoint or generator_core.checkpoint_file_name(args.output),
+                     resume=args.resume,
+                     writer_options={'publish': args.publish_parts,
+                                     'compress_level': args.compress_level,
+                                     'compress_workers': args.compress_workers,
+                                     'recompress': args.recompress_parts,
+                                     'seekable': args.seekable_index,
+                                     'durability': args.durability,
+                                     'fsync_bytes': args.fsync_bytes,
+                                     'fsync_seconds': args.fsync_seconds,
+                                     'checksum': args.checksum,
+                                     'space': {'min_free': args.min_free * 1024 * 1024,
+                                               'wait': args.space_wait,
+                                               'spill_dirs': args.spill_dir,
+                                               'compress': not args.no_space_compress},
+                                     'stripe': ({'directories': args.stripe_dir, 'mode': args.stripe_mode}
+                                                if args.stripe_dir else None)},
+                     mmap_output=args.mmap, space_check=not args.no_space_check,
+                     auto_compress=args.auto_compress, split_bytes=args.split_bytes,
+                     split_seconds=args.split_time, parallel_parts=args.parallel_parts)
+    except KeyboardInterrupt:
+        log("收到中断信号，生成已停止", "warning")
+        return 130
+    except ValueError as e:
+        log(f"错误: {e}", "error")
+        return 2
+    except OSError as e:
+        log(f"生成过程中出错: {e}", "error")
+        return 1
+    finally:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    if stop_event.is_set():
+        log("收到中断信号，生成已停止", "warning")
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字符组合生成器 - 生成引擎
+不依赖tkinter的组合生成逻辑：掩码解析、字典处理、各模式生成器、组合数计算
+图形界面与无界面命令行共用本模块
+"""
+
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import math
+import mmap
+import multiprocessing
+import os
+import queue
+import shutil
+import stat
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+
+# 常量定义
+HASHCAT_CHARSETS = {
+    'l': 'abcdefghijklmnopqrstuvwxyz',
+    'u': 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',
+    'd': '0123456789',
+    's': ' !"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~',
+    'a': 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ',
+    'b': '01'
+}
+
+GENERATION_BATCH_SIZE = 65536  # 每批候选数
+NUMPY_ACCELERATION = True  # NumPy可用时使用向量化掩码枚举
+NUMPY_MAX_KEYSPACE = 2**62  # 超过int64安全范围时退回模板引擎
+PROGRESS_UPDATE_INTERVAL = 50000
+PARALLEL_CHUNK_SIZE = 1000000  # 并行模式下每个进程任务的候选数
+CHECKPOINT_INTERVAL = 10  # 检查点写入间隔（秒）
+WRITE_BUFFER_SIZE = 1024 * 1024  # 输出文件缓冲区大小
+WRITE_QUEUE_BUDGET = 256 * 1024 * 1024  # 写入队列内存预算（字节）
+MEMORY_MAP_THRESHOLD = 100 * 1024 * 1024  # 定长输出超过此大小时使用内存映射写入
+COMPRESSION_BLOCK_SIZE = 4 * 1024 * 1024  # 并行压缩时每个 gzip 成员的原始字节数
+GZIP_LEVEL = 6  # 默认压缩级别
+AUTO_COMPRESSION_LEVELS = (1, 3, 6, 9)  # 自动选择压缩级别时测量的候选级别
+PART_TEMP_SUFFIX = '.tmp'  # 发布分割文件时写入中的临时后缀，写完后改名
+DURABILITY_MODES = ('none', 'interval', 'close')  # 落盘策略：不 fsync、按数据量或时间间隔、分割文件写完时
+FSYNC_BYTES = 256 * 1024 * 1024  # interval 策略默认每写入这么多字节 fsync 一次
+FSYNC_SECONDS = 30  # interval 策略默认距上次 fsync 超过这么多秒时再 fsync
+RESUME_CHECK_BYTES = 1024 * 1024  # 没有 fsync 的检查点续传前检查偏移之前的字节数
+MANIFEST_CHECKSUM = 'sha256'  # 清单中分割文件的默认校验算法
+CHECKSUM_ALGORITHMS = ('sha256', 'blake2b', 'xxh64', 'none')  # xxh64 需要 xxhash 模块，none 只记录数量和大小
+MIN_FREE_SPACE = 512 * 1024 * 1024  # 写入时输出文件系统至少保留的可用空间（字节）
+SPACE_WAIT = 60  # 可用空间不足时暂停等待的时间（秒），之后切换策略或停止
+SPACE_CHECK_INTERVAL = 2  # 写入时检查可用空间的最长间隔（秒）
+SPACE_CHECK_BYTES = 16 * 1024 * 1024  # 写入时检查可用空间的最长间隔（字节）
+SPACE_POLL_INTERVAL = 5  # 暂停期间重新检查可用空间的间隔（秒）
+
+# 字典处理选项默认值（与界面中的变量一一对应）
+DEFAULT_PROCESSING_OPTIONS = {
+    'uppercase': False,
+    'lowercase': False,
+    'capitalize': False,
+    'reverse': False,
+    'remove_start': "0",
+    'remove_end': "0",
+    'add_start': "",
+    'add_end': "",
+    'repeat_count': "1",
+    'repeat_space_count': "1",
+    'process_mode': "independent",
+    'remove_start_independent': False,
+    'remove_end_independent': False,
+    'remove_combined': False,
+    'add_start_independent': False,
+    'add_end_independent': False,
+    'add_combined': False,
+    'repeat_processed': False,
+    'repeat_processed_count': "2",
+    'repeat_processed_space_count': "2",
+}
+
+logger = logging.getLogger(__name__)
+
+_numpy = None
+
+
+def default_log(message, level="info"):
+    """默认日志输出，与界面的 log(message, level) 签名一致"""
+    getattr(logger, level if level in ("debug", "info", "warning", "error") else "info")(message)
+
+
+def _quiet_log(message, level="info"):
+    """工作进程内不重复输出日志"""
+
+
+def _is_stopped(stop_event):
+    return stop_event is not None and stop_event.is_set()
+
+
+def parse_hashcat_mask(mask, charsets=None):
+    """解析Hashcat掩码"""
+    charsets_map = charsets or HASHCAT_CHARSETS
+    charsets = []
+    i = 0
+    while i < len(mask):
+        if mask[i] == "?":
+            if i + 1 < len(mask):
+                char_type = mask[i+1]
+                if char_type == "?":
+                    charsets.append("?")
+                    i += 2
+                elif char_type in charsets_map:
+                    charsets.append(charsets_map[char_type])
+                    i += 2
+                else:
+                    raise ValueError(f"无效的Hashcat掩码类型: ?{char_type}")
+            else:
+                raise ValueError("掩码以无效的'?'结尾")
+        else:
+            charsets.append(mask[i])
+            i += 1
+    return charsets
+
+
+def normalize_processing_options(options=None):
+    """补全字典处理选项，数值项统一为字符串（与界面输入框一致）"""
+    normalized = dict(DEFAULT_PROCESSING_OPTIONS)
+    if options:
+        normalized.update(options)
+    for key in ('remove_start', 'remove_end', 'repeat_count', 'repeat_space_count',
+                'repeat_processed_count', 'repeat_processed_space_count'):
+        normalized[key] = str(normalized[key])
+    for key in ('add_start', 'add_end'):
+        normalized[key] = normalized[key] or ""
+    return normalized
+
+
+def has_processing_options(options):
+    """检查是否有任何处理选项被启用"""
+    return bool(
+        options['uppercase'] or
+        options['lowercase'] or
+        options['capitalize'] or
+        options['reverse'] or
+        options['remove_start'] != "0" or
+        options['remove_end'] != "0" or
+        options['add_start'] or
+        options['add_end'] or
+        options['repeat_count'] != "1" or
+        options['repeat_space_count'] != "1"
+    )
+
+
+def process_dictionary_entry(entry, options):
+    """使用生成器处理字典条目"""
+    if not entry.strip():
+        return
+
+    original = entry.strip()
+
+    # 只有在没有处理选项时才输出原始条目
+    if not has_processing_options(options):
+        yield original
+        return
+
+    # 使用集合存储处理后的条目以避免重复
+    processed_entries = set()
+
+    # 独立处理与组合处理两种模式生成的候选相同，只是组合模式先收集再合并
+    current_entries = processed_entries if options['process_mode'] == "independent" else set()
+
+    # 大小写处理
+    if options['uppercase']:
+        current_entries.add(original.upper())
+    if options['lowercase']:
+        current_entries.add(original.lower())
+    if options['capitalize']:
+        current_entries.add(original.capitalize())
+
+    # 字符串反转
+    if options['reverse']:
+        current_entries.add(original[::-1])
+
+    # 字符移除处理
+    try:
+        remove_start = max(0, int(options['remove_start'] or "0"))
+        remove_end = max(0, int(options['remove_end'] or "0"))
+
+        # 独立处理开头字符
+        if options['remove_start_independent'] and remove_start > 0:
+            if len(original) > remove_start:
+                current_entries.add(original[remove_start:])
+
+        # 独立处理结尾字符
+        if options['remove_end_independent'] and remove_end > 0:
+            if len(original) > remove_end:
+                current_entries.add(original[:-remove_end])
+
+        # 同时处理开头和结尾
+        if options['remove_combined']:
+            if len(original) > (remove_start + remove_end):
+                current_entries.add(original[remove_start:-remove_end])
+    except ValueError:
+        pass
+
+    # 字符添加处理
+    add_start = options['add_start']
+    add_end = options['add_end']
+
+    # 独立处理开头添加
+    if options['add_start_independent'] and add_start:
+        current_entries.add(add_start + original)
+
+    # 独立处理结尾添加
+    if options['add_end_independent'] and add_end:
+        current_entries.add(original + add_end)
+
+    # 同时处理开头和结尾添加
+    if options['add_combined']:
+        current_entries.add(add_start + original + add_end)
+
+    # 重复处理
+    try:
+        repeat_count = max(1, int(options['repeat_count'] or "1"))
+        repeat_space_count = max(1, int(options['repeat_space_count'] or "1"))
+
+        if repeat_count > 1:
+            current_entries.add(original * repeat_count)
+        if repeat_space_count > 1:
+            current_entries.add(" ".join([original] * repeat_space_count))
+    except ValueError:
+        pass
+
+    if current_entries is not processed_entries:
+        processed_entries.update(current_entries)
+
+    # 对处理后的数据进行重复处理
+    if options['repeat_processed']:
+        try:
+            repeat_processed_count = max(1, int(options['repeat_processed_count'] or "2"))
+            repeat_processed_space_count = max(1, int(options['repeat_processed_space_count'] or "2"))
+
+            # 创建临时集合存储重复处理后的结果
+            repeated_entries = set()
+
+            # 对每个处理后的条目进行重复处理
+            for entry in processed_entries:
+                if repeat_processed_count > 1:
+                    repeated_entries.add(entry * repeat_processed_count)
+                if repeat_processed_space_count > 1:
+                    repeated_entries.add(" ".join([entry] * repeat_processed_space_count))
+
+            # 更新处理后的条目集合
+            processed_entries.update(repeated_entries)
+        except ValueError:
+            pass
+
+    # 返回所有处理后的条目
+    for entry in processed_entries:
+        yield entry
+
+
+def read_dict_file(dict_file, stop_event=None):
+    """读取字典文件，返回去重后的原始条目"""
+    entries = set()
+    with open(dict_file, 'rb') as f:
+        for line in f:
+            if _is_stopped(stop_event):
+                break
+            entry = line.decode('utf-8', errors='ignore').strip()
+            if entry:
+                entries.add(entry)
+    return entries
+
+
+def process_entries(entries, options, stop_event=None):
+    """对原始条目逐一应用处理选项，返回去重并排序后的条目列表
+
+    排序保证不同进程、不同机器上的条目顺序一致，序号定位与分片依赖这一点。
+    """
+    processed_entries = set()
+    for entry in entries:
+        if _is_stopped(stop_event):
+            break
+        for processed in process_dictionary_entry(entry, options):
+            processed_entries.add(processed)
+    return sorted(processed_entries)
+
+
+def load_dict_entries(dict_file, options=None, stop_event=None):
+    """读取字典文件并应用处理选项"""
+    return process_entries(read_dict_file(dict_file, stop_event),
+                           normalize_processing_options(options), stop_event)
+
+
+def custom_dict_tokens(chars):
+    """拆分自定义字典组合字符（逗号分隔）；与原界面一致，空项保留为空字符串元素"""
+    return [c.strip() for c in chars.split(",")]
+
+
+def calculate_total_combinations(parsed_mask, charset, length_range, dict_entries=None,
+                                 combo_mode="none", dict_pos="none", dict_b_entries=None,
+                                 advanced_settings=None):
+    """计算总组合数"""
+    if advanced_settings and "custom_dict" in advanced_settings:
+        chars, mode, length = advanced_settings["custom_dict"]
+        chars = custom_dict_tokens(chars)
+
+        if mode == "combination":
+            # 组合模式的总组合数
+            return len(chars) ** length
+        # 全排列模式（含带连接符的全排列模式2）的总组合数
+        if length > len(chars):
+            return 0
+        return math.factorial(len(chars)) // math.factorial(len(chars) - length)
+
+    if advanced_settings and "repeat_char" in advanced_settings:
+        repeat_len, pattern_len, charset, pattern_type = advanced_settings["repeat_char"]
+        if pattern_type in ("sequential", "sequential_repeat"):
+            # 连续模式、连续重复模式的总组合数
+            return max(0, len(charset) - pattern_len + 1)
+        # 重复模式的总组合数
+        return len(charset) ** pattern_len
+
+    dict_entries = dict_entries or []
+    combo_mode = combo_mode or "none"
+
+    # 字典A和字典B的组合
+    if combo_mode in ("dict_ab", "dict_ba"):
+        return len(dict_entries) * len(dict_b_entries or [])
+
+    # 纯字典模式
+    if not parsed_mask and not charset:
+        return len(dict_entries)
+
+    # 计算基础组合数
+    if parsed_mask:
+        # 掩码模式
+        base_combinations = 1
+        for position in parsed_mask:
+            base_combinations *= len(position)
+    else:
+        # 字符集模式
+        min_len, max_len = length_range
+        base_combinations = 0
+        for length in range(min_len, max_len + 1):
+            base_combinations += len(charset) ** length
+
+    # 字典和掩码的组合
+    if combo_mode in ("dict_first", "mask_first"):
+        return len(dict_entries) * base_combinations
+    if dict_pos in ("append_before", "append_after"):
+        return base_combinations + len(dict_entries)
+    return base_combinations
+
+
+def settings_total(settings):
+    """按 prepare_generation 的设置计算总组合数"""
+    return calculate_total_combinations(
+        settings['parsed_mask'], settings['charset'], settings['length_range'],
+        settings['dict_entries'], settings['combo_mode'], settings['dict_pos'],
+        settings['dict_b_entries'], settings['advanced_settings']
+    )
+
+
+# ===== 输出大小与耗时估算 =====
+# 候选集合用 (候选数, 候选字节数之和) 表示：两个集合逐一拼接时
+# (cA, sA) × (cB, sB) = (cA·cB, cA·sB + cB·sA)，掩码、字符集和字典组合都可闭式求出
+# 精确的输出字节数（候选字节数之和 + 每行一个换行）。
+
+SPACE_SAFETY_MARGIN = 0.02  # 可用空间至少比预计大小多出的比例
+CALIBRATION_SECONDS = 0.5  # 标定生成速度的采样时间（秒）
+CALIBRATION_CANDIDATES = 10000000  # 标定时最多生成的候选数
+
+
+def _length_stats(items):
+    """字符串集合的 (个数, UTF-8 字节数之和)"""
+    return len(items), sum(len(item.encode('utf-8')) for item in items)
+
+
+def _concat_stats(left, right):
+    """两个集合逐一拼接后的 (候选数, 字节数之和)"""
+    return left[0] * right[0], left[0] * right[1] + right[0] * left[1]
+
+
+def _power_stats(stats, repeat):
+    """同一集合重复 repeat 次拼接"""
+    count, size = stats
+    if repeat == 0:
+        return 1, 0
+    return count ** repeat, repeat * count ** (repeat - 1) * size
+
+
+def _base_stats(settings):
+    if settings['parsed_mask']:
+        stats = (1, 0)
+        for position in settings['parsed_mask']:
+            stats = _concat_stats(stats, _length_stats(position))
+        return stats
+    min_len, max_len = settings['length_range']
+    charset = _length_stats(settings['charset'])
+    count = size = 0
+    for length in range(min_len, max_len + 1):
+        length_count, length_size = _power_stats(charset, length)
+        count += length_count
+        size += length_size
+    return count, size
+
+
+def _advanced_stats(advanced_settings, connector):
+    if "custom_dict" in advanced_settings:
+        chars, mode, length = advanced_settings["custom_dict"]
+        tokens = _length_stats(custom_dict_tokens(chars))
+        if mode == "combination":
+            return _power_stats(tokens, length)
+        count = _permutation_count(tokens[0], length)
+        if not count:
+            return 0, 0
+        # 每个字符在每个位置出现 P(n-1, k-1) 次
+        size = length * _permutation_count(tokens[0] - 1, length - 1) * tokens[1]
+        if mode != "permutation":
+            size += count * (length - 1) * len(connector.encode('utf-8'))
+        return count, size
+    repeat_len, pattern_len, charset, pattern_type = advanced_settings["repeat_char"]
+    starts = range(len(charset) - pattern_len + 1)
+    if pattern_type in ("sequential", "sequential_repeat"):
+        return len(starts), sum(len(charset[i:i + pattern_len].encode('utf-8')) * repeat_len
+                                for i in starts)
+    return _power_stats(_length_stats([char * repeat_len for char in charset]), pattern_len)
+
+
+def candidate_stats(settings):
+    """按 prepare_generation 的设置精确计算 (候选数, 候选字节数之和)，不含换行"""
+    advanced_settings = settings.get('advanced_settings')
+    if advanced_settings:
+        return _advanced_stats(advanced_settings, settings.get('connector', "-"))
+    dict_entries = settings.get('dict_entries') or []
+    combo_mode = settings.get('combo_mode') or "none"
+    if combo_mode in ("dict_ab", "dict_ba"):
+        return _concat_stats(_length_stats(dict_entries), _length_stats(settings['dict_b_entries'] or []))
+    if not settings['parsed_mask'] and not settings['charset']:
+        # 纯字典模式跳过空条目
+        return _length_stats([entry for entry in dict_entries if entry])
+    base = _base_stats(settings)
+    if combo_mode in ("dict_first", "mask_first"):
+        return _concat_stats(_length_stats(dict_entries), base)
+    if settings.get('dict_pos', "none") in ("append_before", "append_after"):
+        entries = _length_stats(dict_entries)
+        return base[0] + entries[0], base[1] + entries[1]
+    return base
+
+
+def estimate_output_size(settings, start=0, stop=None):
+    """序号 [start, stop) 的输出字节数，返回 (字节数, 是否精确)
+
+    全部范围或定长候选时精确；其余子区间按平均行长折算。
+    """
+    count, size = candidate_stats(settings)
+    total_bytes = count + size
+    stop = count if stop is None else min(stop, count)
+    selected = max(stop - start, 0)
+    if selected == count:
+        return total_bytes, True
+    line_length = fixed_line_length(settings)
+    if line_length is not None:
+        return selected * line_length, True
+    return (total_bytes * selected + count - 1) // max(count, 1), False
+
+
+def calibrate_throughput(settings, seconds=CALIBRATION_SECONDS, batch_size=GENERATION_BATCH_SIZE,
+                         start=0, stop=None):
+    """实际生成 seconds 秒，返回 (候选/秒, 字节/秒) 及首批数据（用于估算压缩率）
+
+    只生成序号 [start, stop) 中最多 CALIBRATION_CANDIDATES 个候选，走按区间定位的
+    生成器，不会为标定展开整个组合空间。
+    """
+    limit = start + CALIBRATION_CANDIDATES
+    stop = limit if stop is None else min(stop, limit)
+    started = time.perf_counter()
+    candidates = size = 0
+    sample = b''
+    for block, count in combination_batches(batch_size=batch_size, log=_quiet_log, start=start, stop=stop,
+                                            **settings):
+        if not sample:
+            sample = block
+        candidates += count
+        size += len(block)
+        if time.perf_counter() - started >= seconds:
+            break
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    return candidates / elapsed, size / elapsed, sample
+
+
+def estimate_job(settings, output_file, start=0, stop=None, calibrate=True, directories=None):
+    """估算任务的输出大小、耗时和目标文件系统的可用空间
+
+    返回字典: candidates、bytes、exact、free、generate_rate（字节/秒）、seconds、
+    compressed_bytes（按首批数据的 gzip 压缩率折算，输出本身已压缩时为 None）。
+    directories 为条带输出的目录时，free 为这些目录所在文件系统的可用空间之和。
+    """
+    total = settings_total(settings)
+    stop = total if stop is None else min(stop, total)
+    size, exact = estimate_output_size(settings, start, stop)
+    directory = os.path.dirname(os.path.abspath(output_file))
+    estimate = {
+        'candidates': max(stop - start, 0),
+        'bytes': size,
+        'exact': exact,
+        'free': total_disk_free(directories) if directories else shutil.disk_usage(directory).free,
+        'generate_rate': None,
+        'seconds': None,
+        'compressed_bytes': None,
+    }
+    if calibrate and estimate['candidates']:
+        # 不支持随机访问的模式从头标定，避免顺序跳过 start 之前的候选
+        offset = start if is_indexable(settings) else 0
+        _candidate_rate, byte_rate, sample = calibrate_throughput(settings, start=offset,
+                                                                  stop=stop if offset else None)
+        estimate['generate_rate'] = byte_rate
+        estimate['seconds'] = size / max(byte_rate, 1)
+        if sample and not output_file.endswith('.gz'):
+            ratio = len(gzip_member(sample[:COMPRESSION_BLOCK_SIZE])) / len(sample[:COMPRESSION_BLOCK_SIZE])
+            estimate['compressed_bytes'] = int(size * ratio)
+    return estimate
+
+
+def space_required(size):
+    """写入 size 字节所需的可用空间（含安全余量）"""
+    return int(size * (1 + SPACE_SAFETY_MARGIN))
+
+
+def plan_output_space(estimate):
+    """判断输出能否写下：返回 "ok"、"compress"（改为 gzip 压缩后可写下）或 "insufficient"（写不下）"""
+    if space_required(estimate['bytes']) <= estimate['free']:
+        return "ok"
+    if estimate['compressed_bytes'] is not None and space_required(estimate['compressed_bytes']) <= estimate['free']:
+        return "compress"
+    return "insufficient"
+
+
+def describe_estimate(estimate):
+    """估算结果的一行说明"""
+    text = (f"预计输出 {'' if estimate['exact'] else '约 '}{format_size(estimate['bytes'])}，"
+            f"可用空间 {format_size(estimate['free'])}")
+    if estimate['seconds'] is not None:
+        text += f"，预计生成耗时 {format_duration(estimate['seconds'])}"
+    return text
+
+
+def format_size(size):
+    """字节数的可读形式"""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+
+def parse_size(text):
+    """解析 "4G"、"500M"、"4096" 形式的字节数（K/M/G/T 按1024进位），返回整数"""
+    value = str(text).strip().upper().removesuffix('B').removesuffix('I')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    scale = units.get(value[-1:], 1)
+    if value[-1:] in units:
+        value = value[:-1]
+    try:
+        size = int(float(value) * scale)
+    except ValueError:
+        raise ValueError(f"大小格式应为数字加可选的 K/M/G/T: {text}") from None
+    if size <= 0:
+        raise ValueError(f"大小必须为正数: {text}")
+    return size
+
+
+def format_duration(seconds):
+    """秒数的可读形式"""
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}小时{minutes}分"
+    if minutes:
+        return f"{minutes}分{seconds}秒"
+    return f"{seconds}秒"
+
+
+def _encode_all(strings):
+    """把字符串列表编码为 bytes 列表"""
+    return [string.encode('utf-8') for string in strings]
+
+
+def _join_batches(candidates, batch_size, stop_event=None):
+    """把逐个产生的 bytes 候选拼接为以换行结尾的批次，产出 (数据块, 候选数)"""
+    candidates = filter(None, candidates)
+    while not _is_stopped(stop_event):
+        batch = list(islice(candidates, batch_size))
+        if not batch:
+            return
+        count = len(batch)
+        batch.append(b'')
+        yield b'\n'.join(batch), count
+
+
+def _merge_batches(batches, batch_size, stop_event=None):
+    """把过小的数据块合并到至少 batch_size 个候选再产出"""
+    parts = []
+    pending = 0
+    for block, count in batches:
+        if _is_stopped(stop_event):
+            return
+        parts.append(block)
+        pending += count
+        if pending >= batch_size:
+            yield b''.join(parts), pending
+            parts = []
+            pending = 0
+    if parts:
+        yield b''.join(parts), pending
+
+
+def _affix_batches(affixes, items, affix_first, batch_size, stop_event=None):
+    """每个 affix 与全部 items 拼接：affix_first 时为 affix+item，否则为 item+affix
+
+    利用 b'\n'.join 的模板拼接，每 batch_size 个候选只需一次C层调用。
+    """
+    for affix in affixes:
+        if _is_stopped(stop_event):
+            return
+        if affix_first:
+            separator = b'\n' + affix
+        else:
+            separator = affix + b'\n'
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            if affix_first:
+                yield affix + separator.join(chunk) + b'\n', len(chunk)
+            else:
+                yield separator.join(chunk) + affix + b'\n', len(chunk)
+
+
+def advanced_batches(advanced_settings, connector="-", batch_size=GENERATION_BATCH_SIZE,
+                     stop_event=None, start=0, stop=None):
+    """高级生成选项的批次生成器；自定义字典组合只产出序号 [start, stop) 的候选"""
+    if "custom_dict" in advanced_settings:
+        chars, mode, length = advanced_settings["custom_dict"]
+        tokens = custom_dict_tokens(chars)
+        chars = _encode_all(tokens)
+
+        if mode == "combination":
+            # 组合模式（等同于每个位置字符集相同的掩码）
+            return mask_batches([tokens] * length, batch_size, stop_event, start, stop)
+        if start or stop is not None:
+            # 全排列模式按序号逐个定位
+            total = _permutation_count(len(tokens), length)
+            stop = total if stop is None else min(stop, total)
+            candidates = (custom_dict_candidate(advanced_settings["custom_dict"], index,
+                                                connector).encode('utf-8')
+                          for index in range(start, stop))
+            return _join_batches(candidates, batch_size, stop_event)
+        if mode == "permutation":
+            # 全排列模式
+            candidates = map(b''.join, itertools.permutations(chars, length))
+        else:  # permutation2 mode
+            # 全排列模式2（带连接符），直接使用用户输入的连接符，不做任何处理
+            candidates = map(connector.encode('utf-8').join, itertools.permutations(chars, length))
+    else:
+        repeat_len, pattern_len, charset, pattern_type = advanced_settings["repeat_char"]
+        starts = range(len(charset) - pattern_len + 1)
+
+        if pattern_type == "sequential":
+            # 生成连续模式 (如 ABCABC)
+            candidates = _encode_all(charset[i:i+pattern_len] * repeat_len for i in starts)
+        elif pattern_type == "sequential_repeat":
+            # 生成连续重复模式 (如 AABBCC)
+            candidates = _encode_all(''.join(charset[i+j] * repeat_len for j in range(pattern_len))
+                                     for i in starts)
+        else:  # repeat mode
+            # 生成重复模式 (如 AABB)
+            repeated = _encode_all(char * repeat_len for char in charset)
+            candidates = map(b''.join, itertools.product(repeated, repeat=pattern_len))
+    return _join_batches(candidates, batch_size, stop_event)
+
+
+def _load_numpy():
+    """按需导入NumPy，不可用或已禁用时返回None"""
+    global _numpy
+    if not NUMPY_ACCELERATION:
+        return None
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def _numpy_tables(parsed_mask):
+    """每个位置的字符集转为 uint8 查找表；含多字节字符时返回None"""
+    np = _load_numpy()
+    if np is None:
+        return None
+    tables = []
+    for position in parsed_mask:
+        if not isinstance(position, str):
+            return None
+        encoded = position.encode('utf-8')
+        if len(encoded) != len(position) or not encoded:
+            return None
+        tables.append(np.frombuffer(encoded, dtype=np.uint8))
+    return tables
+
+
+def mask_engine(parsed_mask):
+    """返回掩码枚举将使用的引擎名称"""
+    if math.prod(len(position) for position in parsed_mask) < NUMPY_MAX_KEYSPACE \
+            and _numpy_tables(parsed_mask) is not None:
+        return "numpy"
+    return "template"
+
+
+def _template_split(encoded_positions, batch_size):
+    """从末尾选取后缀位置数 k，使后缀块的候选数不超过 batch_size（至少1个位置）"""
+    split = len(encoded_positions) - 1
+    suffix_count = len(encoded_positions[-1])
+    while split > 0 and suffix_count * len(encoded_positions[split - 1]) <= batch_size:
+        split -= 1
+        suffix_count *= len(encoded_positions[split])
+    return split
+
+
+def _template_mask_batches(parsed_mask, batch_size, stop_event=None, start=0, stop=None):
+    """后缀块模板引擎（纯标准库），产出序号 [start, stop) 的候选
+
+    末尾 k 个位置的全部组合只生成一次，之后每个前缀通过
+    prefix + (b'\n' + prefix).join(suffixes) 一次性拼出整块，
+    逐候选的 Python 层开销变为逐前缀。
+    """
+    encoded_positions = [_encode_all(position) for position in parsed_mask]
+    if not encoded_positions or not all(encoded_positions):
+        return iter(())
+    total = math.prod(len(position) for position in encoded_positions)
+    stop = total if stop is None else min(stop, total)
+    if start >= stop:
+        return iter(())
+    split = _template_split(encoded_positions, batch_size)
+    suffixes = list(map(b''.join, itertools.product(*encoded_positions[split:])))
+    head = encoded_positions[:split]
+    return _merge_batches(_template_range(head, suffixes, start, stop, stop_event),
+                          batch_size, stop_event)
+
+
+def _template_range(head, suffixes, start, stop, stop_event=None):
+    """逐前缀拼接后缀块，首尾前缀只取落在 [start, stop) 内的后缀"""
+    suffix_count = len(suffixes)
+    first = start // suffix_count
+    last = (stop - 1) // suffix_count
+    for prefix_index in range(first, last + 1):
+        if _is_stopped(stop_event):
+            return
+        prefix = b''.join(_index_to_tokens(head, prefix_index))
+        offset = prefix_index * suffix_count
+        chunk = suffixes[max(start - offset, 0):min(stop - offset, suffix_count)]
+        yield prefix + (b'\n' + prefix).join(chunk) + b'\n', len(chunk)
+
+
+def _numpy_rows(tables, start, stop):
+    """按混合进制把序号 [start, stop) 换算为 (候选数, 位置数+1) 的 uint8 数组，末列为换行
+
+    第一个位置为最高位，与 itertools.product 顺序一致。
+    """
+    np = _load_numpy()
+    width = len(tables)
+    remaining = np.arange(start, stop, dtype=np.int64)
+    rows = np.empty((stop - start, width + 1), dtype=np.uint8)
+    rows[:, width] = 10
+    for column in range(width - 1, -1, -1):
+        table = tables[column]
+        remaining, digits = np.divmod(remaining, len(table))
+        rows[:, column] = table[digits]
+    return rows
+
+
+def _numpy_mask_batches(tables, start, stop, batch_size, stop_event=None):
+    """NumPy向量化枚举，产出序号 [start, stop) 的候选
+
+    与模板引擎相同，末尾 k 个位置的后缀块只计算一次；对齐到完整前缀的批次
+    以 (前缀数, 后缀数, 位置数+1) 数组广播填充，只对前缀做进制换算，
+    首尾不对齐的部分逐行换算。
+    """
+    np = _load_numpy()
+    width = len(tables)
+    split = _template_split(tables, batch_size)
+    suffix_rows = _numpy_rows(tables[split:], 0, math.prod(len(table) for table in tables[split:]))
+    suffix_count = len(suffix_rows)
+    prefixes_per_batch = max(1, batch_size // suffix_count)
+    position = start
+    while position < stop:
+        if _is_stopped(stop_event):
+            return
+        if position % suffix_count or stop - position < suffix_count:
+            end = min(stop, (position // suffix_count + 1) * suffix_count)
+            yield _numpy_rows(tables, position, end).tobytes(), end - position
+            position = end
+            continue
+        first = position // suffix_count
+        last = min(first + prefixes_per_batch, stop // suffix_count)
+        rows = np.empty((last - first, suffix_count, width + 1), dtype=np.uint8)
+        rows[:, :, split:] = suffix_rows
+        if split:
+            rows[:, :, :split] = _numpy_rows(tables[:split], first, last)[:, None, :split]
+        yield rows.tobytes(), (last - first) * suffix_count
+        position = last * suffix_count
+
+
+def mask_batches(parsed_mask, batch_size=GENERATION_BATCH_SIZE, stop_event=None, start=0, stop=None):
+    """掩码模式的批次生成器，只产出序号 [start, stop) 的候选（stop 为 None 时到末尾）
+
+    NumPy可用时使用向量化引擎，否则使用后缀块模板引擎，两者都无需枚举 start 之前的候选。
+    """
+    total = math.prod(len(position) for position in parsed_mask)
+    stop = total if stop is None else min(stop, total)
+    if mask_engine(parsed_mask) == "numpy":
+        return _numpy_mask_batches(_numpy_tables(parsed_mask), start, stop, batch_size, stop_event)
+    return _template_mask_batches(parsed_mask, batch_size, stop_event, start, stop)
+
+
+def _charset_ranges(charset, length_range, start=0, stop=None):
+    """把字符集模式的全局序号区间拆分为各长度内的 (长度, 起始, 结束)"""
+    min_len, max_len = length_range
+    offset = 0
+    for length in range(min_len, max_len + 1):
+        size = len(charset) ** length
+        if stop is not None and offset >= stop:
+            return
+        local_start = max(start - offset, 0)
+        local_stop = size if stop is None else min(stop - offset, size)
+        if local_start < local_stop:
+            yield length, local_start, local_stop
+        offset += size
+
+
+def charset_batches(charset, length_range, batch_size=GENERATION_BATCH_SIZE, stop_event=None,
+                    start=0, stop=None):
+    """字符集模式的批次生成器，每个长度按等长掩码枚举，只产出序号 [start, stop) 的候选"""
+    return itertools.chain.from_iterable(
+        mask_batches([charset] * length, batch_size, stop_event, local_start, local_stop)
+        for length, local_start, local_stop in _charset_ranges(charset, length_range, start, stop)
+    )
+
+
+# ===== 随机访问索引 =====
+# 序号与候选之间的双向映射，顺序与生成器输出完全一致；
+# 序号越界时抛出 IndexError，候选不在空间内时抛出 ValueError。
+
+def _index_to_tokens(positions, index):
+    """按混合进制（第一个位置为最高位）取出各位置的元素"""
+    tokens = []
+    for position in reversed(positions):
+        index, digit = divmod(index, len(position))
+        tokens.append(position[digit])
+    tokens.reverse()
+    return tokens
+
+
+def _check_index(index, total):
+    if not 0 <= index < total:
+        raise IndexError(f"序号 {index} 超出范围 [0, {total})")
+
+
+def mask_candidate(parsed_mask, index):
+    """返回掩码空间中第 index 个候选"""
+    _check_index(index, math.prod(len(position) for position in parsed_mask))
+    return ''.join(_index_to_tokens(parsed_mask, index))
+
+
+def mask_index(parsed_mask, candidate):
+    """返回候选在掩码空间中的序号"""
+    if len(candidate) != len(parsed_mask):
+        raise ValueError(f"候选长度 {len(candidate)} 与掩码长度 {len(parsed_mask)} 不一致")
+    index = 0
+    for position, char in zip(parsed_mask, candidate):
+        digit = position.find(char)
+        if digit < 0:
+            raise ValueError(f"字符 {char!r} 不在掩码位置的字符集中")
+        index = index * len(position) + digit
+    return index
+
+
+def charset_candidate(charset, length_range, index):
+    """返回字符集+长度范围空间中第 index 个候选（按长度从短到长）"""
+    for length, local_index, _stop in _charset_ranges(charset, length_range, index, index + 1):
+        return mask_candidate([charset] * length, local_index)
+    min_len, max_len = length_range
+    _check_index(index, sum(len(charset) ** length for length in range(min_len, max_len + 1)))
+
+
+def charset_index(charset, length_range, candidate):
+    """返回候选在字符集+长度范围空间中的序号"""
+    min_len, max_len = length_range
+    if not min_len <= len(candidate) <= max_len:
+        raise ValueError(f"候选长度 {len(candidate)} 不在 {min_len}-{max_len} 范围内")
+    offset = sum(len(charset) ** length for length in range(min_len, len(candidate)))
+    return offset + mask_index([charset] * len(candidate), candidate)
+
+
+def _permutation_count(n, k):
+    if k > n:
+        return 0
+    return math.factorial(n) // math.factorial(n - k)
+
+
+def custom_dict_candidate(custom_dict, index, connector="-"):
+    """返回自定义字典组合（chars, mode, length）空间中第 index 个候选"""
+    chars, mode, length = custom_dict
+    tokens = custom_dict_tokens(chars)
+    if mode == "combination":
+        return mask_candidate([tokens] * length, index)
+    _check_index(index, _permutation_count(len(tokens), length))
+    pool = list(tokens)
+    chosen = []
+    for position in range(length):
+        block = _permutation_count(len(pool) - 1, length - position - 1)
+        digit, index = divmod(index, block)
+        chosen.append(pool.pop(digit))
+    if mode == "permutation2":
+        return connector.join(chosen)
+    return ''.join(chosen)
+
+
+def custom_dict_index(custom_dict, candidate, connector="-"):
+    """返回候选在自定义字典组合空间中的序号
+
+    多字符元素可能使同一字符串有多种拆分方式，此时返回最小的序号。
+    """
+    chars, mode, length = custom_dict
+    tokens = custom_dict_tokens(chars)
+    distinct = mode != "combination"
+    separator = connector if mode == "permutation2" else ""
+
+    def search(position, chosen):
+        if len(chosen) == length:
+            return chosen if position == len(candidate) else None
+        if chosen and separator:
+            if not candidate.startswith(separator, position):
+                return None
+            position += len(separator)
+        for token_index, token in enumerate(tokens):
+            if distinct and token_index in chosen:
+                continue
+            if candidate.startswith(token, position):
+                found = search(position + len(token), chosen + [token_index])
+                if found:
+                    return found
+        return None
+
+    chosen = search(0, [])
+    if chosen is None:
+        raise ValueError(f"候选 {candidate!r} 不在自定义字典组合空间中")
+    if not distinct:
+        index = 0
+        for token_index in chosen:
+            index = index * len(tokens) + token_index
+        return index
+    index = 0
+    for position, token_index in enumerate(chosen):
+        rank = token_index - sum(1 for used in chosen[:position] if used < token_index)
+        index += rank * _permutation_count(len(tokens) - position - 1, length - position - 1)
+    return index
+
+
+def _base_count(parsed_mask, charset, length_range):
+    """掩码或字符集模式的候选数"""
+    if parsed_mask:
+        return math.prod(len(position) for position in parsed_mask)
+    min_len, max_len = length_range
+    return sum(len(charset) ** length for length in range(min_len, max_len + 1))
+
+
+def _base_candidate(settings, index):
+    if settings.get('parsed_mask'):
+        return mask_candidate(settings['parsed_mask'], index)
+    return charset_candidate(settings['charset'], settings['length_range'], index)
+
+
+def _base_index(settings, candidate):
+    if settings.get('parsed_mask'):
+        return mask_index(settings['parsed_mask'], candidate)
+    return charset_index(settings['charset'], settings['length_range'], candidate)
+
+
+def _combo_parts(settings):
+    """字典组合的 (外层条目, 内层候选数, 外层条目是否在前)
+
+    序号 = 外层条目序号 * 内层候选数 + 内层序号，内层为字典B或掩码/字符集。
+    """
+    combo_mode = settings.get('combo_mode')
+    if combo_mode in ("dict_ab", "dict_ba"):
+        return settings['dict_entries'], len(settings.get('dict_b_entries') or []), combo_mode == "dict_ab"
+    inner_count = _base_count(settings.get('parsed_mask'), settings.get('charset'),
+                              settings.get('length_range'))
+    return settings['dict_entries'], inner_count, combo_mode == "dict_first"
+
+
+def is_indexable(settings):
+    """生成设置是否支持随机访问（掩码、字符集、自定义字典组合、字典组合）"""
+    advanced_settings = settings.get('advanced_settings')
+    if advanced_settings:
+        return "custom_dict" in advanced_settings
+    combo_mode = settings.get('combo_mode', "none")
+    if combo_mode in ("dict_ab", "dict_ba"):
+        return True
+    if not (settings.get('parsed_mask') or settings.get('charset')):
+        return False
+    return combo_mode != "none" or settings.get('dict_pos', "none") == "none"
+
+
+def keyspace_candidate(settings, index):
+    """按 prepare_generation 的设置返回第 index 个候选"""
+    if not is_indexable(settings):
+        raise ValueError("当前生成模式不支持随机访问")
+    advanced_settings = settings.get('advanced_settings')
+    if advanced_settings:
+        return custom_dict_candidate(advanced_settings["custom_dict"], index,
+                                     settings.get('connector', "-"))
+    if settings.get('combo_mode', "none") == "none":
+        return _base_candidate(settings, index)
+    entries, inner_count, outer_first = _combo_parts(settings)
+    _check_index(index, len(entries) * inner_count)
+    outer, inner_index = divmod(index, inner_count)
+    if settings['combo_mode'] in ("dict_ab", "dict_ba"):
+        inner = settings['dict_b_entries'][inner_index]
+    else:
+        inner = _base_candidate(settings, inner_index)
+    return entries[outer] + inner if outer_first else inner + entries[outer]
+
+
+def keyspace_index(settings, candidate):
+    """按 prepare_generation 的设置返回候选的序号
+
+    同一字符串有多种拆分方式时返回最小的序号。
+    """
+    if not is_indexable(settings):
+        raise ValueError("当前生成模式不支持随机访问")
+    advanced_settings = settings.get('advanced_settings')
+    if advanced_settings:
+        return custom_dict_index(advanced_settings["custom_dict"], candidate,
+                                 settings.get('connector', "-"))
+    if settings.get('combo_mode', "none") == "none":
+        return _base_index(settings, candidate)
+    entries, inner_count, outer_first = _combo_parts(settings)
+    inner_lookup = None
+    if settings['combo_mode'] in ("dict_ab", "dict_ba"):
+        inner_lookup = {}
+        for inner_index, entry in enumerate(settings['dict_b_entries']):
+            inner_lookup.setdefault(entry, inner_index)
+    for outer, entry in enumerate(entries):
+        if outer_first:
+            if not candidate.startswith(entry):
+                continue
+            inner = candidate[len(entry):]
+        else:
+            if not candidate.endswith(entry):
+                continue
+            inner = candidate[:len(candidate) - len(entry)]
+        if inner_lookup is not None:
+            inner_index = inner_lookup.get(inner)
+            if inner_index is None:
+                continue
+        else:
+            try:
+                inner_index = _base_index(settings, inner)
+            except ValueError:
+                continue
+        return outer * inner_count + inner_index
+    raise ValueError(f"候选 {candidate!r} 不在字典组合空间中")
+
+
+def dict_combo_batches(dict_entries, combo_mode, dict_b_entries=None,
+                       batch_size=GENERATION_BATCH_SIZE, stop_event=None, log=default_log):
+    """纯字典与字典A/B组合的批次生成器，dict_entries/dict_b_entries 为已处理的条目
+
+    字典与掩码/字符集的组合见 dict_combo_range_batches。
+    """
+    entries = _encode_all(dict_entries)
+    if combo_mode in ("dict_ab", "dict_ba"):
+        log(f"处理后的字典A条目数: {len(dict_entries)}")
+        log(f"处理后的字典B条目数: {len(dict_b_entries or [])}")
+        blocks = _affix_batches(entries, _encode_all(dict_b_entries or []),
+                                combo_mode == "dict_ab", batch_size, stop_event)
+        return _merge_batches(blocks, batch_size, stop_event)
+
+    log(f"处理后的字典条目数: {len(dict_entries)}")
+    return _join_batches(entries, batch_size, stop_event)
+
+
+def _affix_block(affix, block, affix_first):
+    """给数据块中每个候选加上前缀或后缀"""
+    if not affix:
+        return block
+    if affix_first:
+        return affix + block[:-1].replace(b'\n', b'\n' + affix) + b'\n'
+    return block.replace(b'\n', affix + b'\n')
+
+
+def _list_batches(items, start, stop, batch_size):
+    """已编码列表中 [start, stop) 的批次，空条目同样占一行"""
+    for offset in range(start, stop, batch_size):
+        chunk = items[offset:min(offset + batch_size, stop)]
+        yield b'\n'.join(chunk) + b'\n', len(chunk)
+
+
+def dict_combo_range_batches(parsed_mask, charset, length_range, dict_entries, combo_mode,
+                             dict_b_entries=None, batch_size=GENERATION_BATCH_SIZE,
+                             stop_event=None, start=0, stop=None):
+    """字典组合中序号 [start, stop) 的批次（stop 为 None 表示到组合数为止）
+
+    外层为字典A条目，内层为字典B或掩码/字符集候选；内层直接按序号区间生成，
+    再用 bytes.replace 为整块加上外层条目，不需要预先收集全部掩码组合。
+    """
+    settings = {
+        'parsed_mask': parsed_mask, 'charset': charset, 'length_range': length_range,
+        'dict_entries': dict_entries, 'combo_mode': combo_mode, 'dict_b_entries': dict_b_entries,
+    }
+    entries, inner_count, outer_first = _combo_parts(settings)
+    total = len(entries) * inner_count
+    stop = total if stop is None else min(stop, total)
+    if start >= stop:
+        return iter(())
+    entries = _encode_all(entries)
+    if combo_mode in ("dict_ab", "dict_ba"):
+        items = _encode_all(dict_b_entries)
+        inner_batches = lambda lo, hi: _list_batches(items, lo, hi, batch_size)
+    elif parsed_mask:
+        inner_batches = lambda lo, hi: mask_batches(parsed_mask, batch_size, stop_event, lo, hi)
+    else:
+        inner_batches = lambda lo, hi: charset_batches(charset, length_range, batch_size,
+                                                       stop_event, lo, hi)
+
+    def blocks():
+        for outer in range(start // inner_count, (stop - 1) // inner_count + 1):
+            offset = outer * inner_count
+            for block, count in inner_batches(max(start - offset, 0), min(stop - offset, inner_count)):
+                if _is_stopped(stop_event):
+                    return
+                yield _affix_block(entries[outer], block, outer_first), count
+
+    return _merge_batches(blocks(), batch_size, stop_event)
+
+
+def dict_append_batches(base_batches, dict_entries, dict_pos, batch_size=GENERATION_BATCH_SIZE,
+                        stop_event=None):
+    """字典追加模式的批次生成器"""
+    entries = _encode_all(dict_entries)
+    if dict_pos == "append_before":
+        yield from _join_batches(entries, batch_size, stop_event)
+    for batch in base_batches:
+        if _is_stopped(stop_event):
+            return
+        yield batch
+    if dict_pos == "append_after":
+        yield from _join_batches(entries, batch_size, stop_event)
+
+
+def combination_batches(parsed_mask, charset, length_range, dict_entries=None,
+                        combo_mode="none", dict_pos="none", dict_b_entries=None,
+                        advanced_settings=None, connector="-", batch_size=GENERATION_BATCH_SIZE,
+                        stop_event=None, log=default_log, start=0, stop=None):
+    """根据设置选择批次生成器，每批为 (换行拼接的 bytes, 候选数)
+
+    start/stop 限定只产出序号 [start, stop) 的候选：掩码、字符集和自定义字典组合
+    直接定位到 start，其余模式需顺序跳过前面的候选。
+    """
+    if start or stop is not None:
+        settings = {
+            'parsed_mask': parsed_mask, 'charset': charset, 'combo_mode': combo_mode or "none",
+            'dict_pos': dict_pos or "none", 'advanced_settings': advanced_settings,
+        }
+        if not is_indexable(settings):
+            if start:
+                log(f"当前生成模式不支持随机访问，将顺序跳过前 {start} 个候选", "warning")
+            batches = combination_batches(parsed_mask, charset, length_range, dict_entries,
+                                          combo_mode, dict_pos, dict_b_entries, advanced_settings,
+                                          connector, batch_size, stop_event, log)
+            return slice_batches(batches, start, stop, stop_event)
+
+    if advanced_settings:
+        return advanced_batches(advanced_settings, connector, batch_size, stop_event, start, stop)
+
+    dict_entries = dict_entries or []
+    combo_mode = combo_mode or "none"
+
+    # 字典与掩码/字符集组合按序号区间逐段生成内层候选，不收集全部掩码组合；
+    # 字典A/B组合只在限定区间时需要定位
+    mask_combo = combo_mode in ("dict_first", "mask_first")
+    if mask_combo or (combo_mode != "none" and (start or stop is not None)):
+        if mask_combo:
+            log(f"处理后的字典条目数: {len(dict_entries)}")
+        return dict_combo_range_batches(parsed_mask, charset, length_range, dict_entries,
+                                        combo_mode, dict_b_entries, batch_size, stop_event,
+                                        start, stop)
+
+    # 纯字典模式与字典A/B组合不需要基础生成器
+    if combo_mode in ("dict_ab", "dict_ba") or (not parsed_mask and not charset):
+        return dict_combo_batches(dict_entries, combo_mode, dict_b_entries,
+                                  batch_size, stop_event, log)
+
+    if parsed_mask:
+        log(f"掩码枚举引擎: {mask_engine(parsed_mask)}")
+        base_batches = mask_batches(parsed_mask, batch_size, stop_event, start, stop)
+    else:
+        base_batches = charset_batches(charset, length_range, batch_size, stop_event, start, stop)
+    if dict_pos in ("append_before", "append_after"):
+        return dict_append_batches(base_batches, dict_entries, dict_pos, batch_size, stop_event)
+    return base_batches
+
+
+# ===== 多进程并行生成 =====
+# 可随机访问的模式按连续序号区间拆分给进程池，每个任务独立定位到区间起点。
+
+def shard_ranges(start, stop, shards):
+    """把序号区间 [start, stop) 尽量均匀地拆分为 shards 个连续区间"""
+    size, extra = divmod(max(stop - start, 0), shards)
+    ranges = []
+    for shard in range(shards):
+        end = start + size + (1 if shard < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def parse_shard(text):
+    """解析 "i/N" 形式的分片参数（i 从1开始），返回 (i, N)"""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"分片参数格式应为 i/N: {text}")
+    if count <= 0 or not 1 <= index <= count:
+        raise ValueError(f"分片序号必须在 1 到 {max(count, 1)} 之间: {text}")
+    return index, count
+
+
+def resolve_range(total, skip=0, limit=None, shard=None):
+    """按 skip/limit 与分片 (i, N) 计算本次生成的序号区间 [start, stop)
+
+    与 hashcat 一致，limit 是从 skip 起算的候选数；shard 在 skip/limit 限定的
+    区间内再均分为 N 份取第 i 份，N 个节点的输出合起来与单节点完全一致且互不重叠。
+    """
+    start = min(skip, total)
+    stop = total if limit is None else min(skip + limit, total)
+    stop = max(stop, start)
+    if shard:
+        index, count = shard
+        start, stop = shard_ranges(start, stop, count)[index - 1]
+    return start, stop
+
+
+def _range_block(settings, start, stop, batch_size):
+    """进程池任务：生成序号区间内的全部候选，返回 (数据块, 候选数)"""
+    parts = []
+    total = 0
+    for block, count in combination_batches(batch_size=batch_size, log=_quiet_log,
+                                            start=start, stop=stop, **settings):
+        parts.append(block)
+        total += count
+    return b''.join(parts), total
+
+
+def _range_file(settings, start, stop, path, batch_size, checksum='none'):
+    """进程池任务：把序号区间内的候选直接写入 path，返回 (候选数, 校验值)
+
+    校验值按 checksum 算法随写出逐块计算，为十六进制字符串，算法为 none 时为 None。
+    """
+    total = 0
+    digest = new_checksum(checksum)
+    with open(path, 'wb') as f:
+        for block, count in combination_batches(batch_size=batch_size, log=_quiet_log,
+                                                start=start, stop=stop, **settings):
+            f.write(block)
+            if digest is not None:
+                digest.update(block)
+            total += count
+    return total, None if digest is None else digest.hexdigest()
+
+
+def _wait_result(result, stop_event=None):
+    """等待进程池任务完成，期间响应停止信号；停止时返回 None"""
+    while not result.ready():
+        if _is_stopped(stop_event):
+            return None
+        result.wait(0.2)
+    return result.get()
+
+
+def parallel_batches(settings, workers=None, start=0, stop=None, chunk_size=PARALLEL_CHUNK_SIZE,
+                     batch_size=GENERATION_BATCH_SIZE, stop_event=None, log=default_log, pool=None):
+    """多进程并行生成，按序号顺序产出 (数据块, 候选数)
+
+    区间按 chunk_size 拆分为任务提交到进程池，最多同时保留 workers*2 个
+    未完成任务，结果按提交顺序重新拼接，输出与单进程完全一致。
+    pool 为已有的 multiprocessing.Pool，未提供时临时创建。
+    """
+    if not is_indexable(settings):
+        raise ValueError("当前生成模式不支持并行生成")
+    workers = workers or os.cpu_count() or 1
+    total = settings_total(settings)
+    stop = total if stop is None else min(stop, total)
+    log(f"并行生成: {workers} 个进程，每个任务 {chunk_size} 个候选")
+
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes=workers)
+    try:
+        pending = deque()
+        for chunk_start in range(start, stop, chunk_size):
+            if len(pending) >= workers * 2:
+                result = _wait_result(pending.popleft(), stop_event)
+                if result is None:
+                    return
+                yield result
+            chunk_stop = min(chunk_start + chunk_size, stop)
+            pending.append(pool.apply_async(_range_block, (settings, chunk_start, chunk_stop, batch_size)))
+        while pending:
+            result = _wait_result(pending.popleft(), stop_event)
+            if result is None:
+                return
+            yield result
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+
+
+def shard_file_name(output_file, shard_index):
+    """分片文件命名：原文件名.shardN.扩展名（N从1开始）"""
+    file_name, file_ext = os.path.splitext(output_file)
+    return f"{file_name}.shard{shard_index}{file_ext}"
+
+
+def write_shard_files(settings, output_file, workers=None, start=0, stop=None,
+                      batch_size=GENERATION_BATCH_SIZE, stop_event=None, log=default_log, pool=None,
+                      manifest=None):
+    """多进程并行生成，每个分片由一个进程直接写入自己的文件
+
+    返回 [(文件路径, 序号起点, 序号终点, 候选数)]；停止时未完成的分片不计入。
+    manifest 为 PartManifest 时每个写完的分片按分片序号登记一行，校验值由写入进程逐块计算。
+    """
+    if not is_indexable(settings):
+        raise ValueError("当前生成模式不支持并行生成")
+    workers = workers or os.cpu_count() or 1
+    total = settings_total(settings)
+    stop = total if stop is None else min(stop, total)
+
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes=workers)
+    try:
+        checksum = manifest.checksum if manifest is not None else 'none'
+        pending = []
+        for shard_index, (shard_start, shard_stop) in enumerate(shard_ranges(start, stop, workers), 1):
+            path = shard_file_name(output_file, shard_index)
+            pending.append((shard_index, path, shard_start, shard_stop, pool.apply_async(
+                _range_file, (settings, shard_start, shard_stop, path, batch_size, checksum))))
+        shards = []
+        for shard_index, path, shard_start, shard_stop, result in pending:
+            done = _wait_result(result, stop_event)
+            if done is None:
+                break
+            count, digest = done
+            log(f"分片完成: {path} ({count} 个候选)")
+            if manifest is not None:
+                manifest.add(manifest.record(shard_index, path, shard_start, count, digest))
+            shards.append((path, shard_start, shard_stop, count))
+        return shards
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+
+
+# ===== 内存映射定长输出 =====
+# 纯掩码和定长字符集模式中每行字节数相同，第 i 个候选的文件偏移可直接算出：
+# 每个分割文件按精确大小预分配，各进程把自己的序号区间直接写入映射后的对应位置，
+# 不经过写入线程，也不需要按顺序拼接。
+
+def fixed_line_length(settings):
+    """每个候选（含换行）的字节数都相同时返回该长度，否则返回 None"""
+    if (settings.get('advanced_settings') or settings.get('combo_mode', "none") != "none"
+            or settings.get('dict_pos', "none") != "none"):
+        return None
+    if settings.get('parsed_mask'):
+        positions = settings['parsed_mask']
+    elif settings.get('charset'):
+        min_len, max_len = settings['length_range']
+        if min_len != max_len:
+            return None
+        positions = [settings['charset']] * min_len
+    else:
+        return None
+    line_length = 1
+    for position in positions:
+        sizes = {len(token.encode('utf-8')) for token in position}
+        if len(sizes) != 1:
+            return None
+        line_length += sizes.pop()
+    return line_length
+
+
+def preallocate_file(path, size):
+    """创建文件并预分配 size 字节；不支持 posix_fallocate 时退回 ftruncate"""
+    with open(path, 'wb') as f:
+        if size and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+                return
+            except OSError:
+                pass
+        f.truncate(size)
+
+
+def _mmap_tasks(start, stop, split_size, line_length, chunk_size):
+    """把序号区间按分割文件和块大小切成 (文件序号, 序号起点, 序号终点, 文件内偏移)"""
+    position = start
+    while position < stop:
+        relative = position - start
+        file_index = relative // split_size + 1
+        end = min(position + chunk_size, start + file_index * split_size, stop)
+        yield file_index, position, end, (relative % split_size) * line_length
+        position = end
+
+
+def _range_mmap(settings, start, stop, path, offset, line_length, batch_size, stop_event=None):
+    """把序号区间内的候选写入已预分配文件的 offset 处，返回候选数"""
+    base = offset - offset % mmap.ALLOCATIONGRANULARITY
+    length = (stop - start) * line_length
+    total = 0
+    with open(path, 'r+b') as f, mmap.mmap(f.fileno(), offset - base + length, offset=base) as mm:
+        position = offset - base
+        for block, count in combination_batches(batch_size=batch_size, stop_event=stop_event,
+                                                log=_quiet_log, start=start, stop=stop, **settings):
+            if len(block) != count * line_length:
+                raise ValueError("候选长度不一致，无法使用内存映射输出")
+            mm[position:position + len(block)] = block
+            position += len(block)
+            total += count
+    return total
+
+
+def write_mmap_parts(settings, output_file, split_size, workers=1, start=0, stop=None,
+                     batch_size=GENERATION_BATCH_SIZE, stop_event=None, log=default_log,
+                     chunk_size=PARALLEL_CHUNK_SIZE, progress=None, pool=None, manifest=None):
+    """定长候选的内存映射输出，分割规则与 split_batches 相同
+
+    先按精确大小预分配全部分割文件，再由 workers 个进程在计算出的偏移处填写。
+    返回已写入的候选数；progress(已写入数) 在每个任务完成后调用。停止时文件中
+    未填写的部分为零字节，输出不完整。manifest 为 PartManifest 时每个分割文件的
+    全部任务完成后登记一行；数据不经过写入器，校验值在登记前读一遍文件计算。
+    """
+    line_length = fixed_line_length(settings)
+    if line_length is None:
+        raise ValueError("当前生成模式的候选长度不固定，无法使用内存映射输出")
+    total = settings_total(settings)
+    stop = total if stop is None else min(stop, total)
+    count = max(stop - start, 0)
+
+    files = (count + split_size - 1) // split_size
+    for file_index in range(1, files + 1):
+        part_count = min(split_size, count - (file_index - 1) * split_size)
+        preallocate_file(part_file_name(output_file, file_index), part_count * line_length)
+    log(f"已预分配 {files} 个文件，共 {count * line_length} 字节（每行 {line_length} 字节）")
+
+    tasks = [(file_index, (settings, task_start, task_stop, part_file_name(output_file, file_index), offset,
+                           line_length, batch_size))
+             for file_index, task_start, task_stop, offset
+             in _mmap_tasks(start, stop, split_size, line_length, chunk_size)]
+    remaining = {}
+    for file_index, _task in tasks:
+        remaining[file_index] = remaining.get(file_index, 0) + 1
+
+    def task_done(file_index):
+        # 结果按提交顺序取出，文件的最后一个任务完成时整个文件已填写
+        remaining[file_index] -= 1
+        if manifest is not None and not remaining[file_index]:
+            path = part_file_name(output_file, file_index)
+            first = start + (file_index - 1) * split_size
+            checksum = manifest.new_checksum()
+            if checksum is not None:
+                hash_file(path, checksum)
+            manifest.add(manifest.record(file_index, path, first, min(split_size, stop - first), checksum))
+
+    written = 0
+    if workers <= 1:
+        for file_index, task in tasks:
+            if _is_stopped(stop_event):
+                break
+            done = _range_mmap(*task, stop_event)
+            written += done
+            if done < task[2] - task[1]:
+                break  # 任务中途停止，文件不完整
+            task_done(file_index)
+            if progress:
+                progress(written)
+        return written
+
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes=workers)
+    try:
+        pending = [(file_index, pool.apply_async(_range_mmap, task)) for file_index, task in tasks]
+        for file_index, result in pending:
+            done = _wait_result(result, stop_event)
+            if done is None:
+                break
+            written += done
+            task_done(file_index)
+            if progress:
+                progress(written)
+        return written
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+
+
+# ===== 按区间并行写分割文件 =====
+# 可随机访问的模式中每个分割文件的序号区间可以预先算出：每个文件由一个进程从头到尾
+# 生成、压缩并写出（先写临时文件，写完后改名并登记到清单），多个文件同时写入，
+# 不经过单个写入线程。续传时跳过清单中已登记的文件。
+
+def part_ranges(settings, start, stop, split_size, split_bytes=None):
+    """预先划分各分割文件的序号区间，返回 [(文件序号, 序号起点, 序号终点)]
+
+    split_bytes 对定长候选精确换算为候选数；候选长度不固定时按平均行长（含换行）
+    换算，各文件的大小为近似值。
+    """
+    split_size, split_bytes = effective_split(settings, split_size, split_bytes)
+    if split_bytes:
+        count, size = candidate_stats(settings)
+        average = (count + size) / max(count, 1)
+        split_size = min(split_size, max(int(split_bytes // average), 1))
+    return [(file_index, position, min(position + split_size, stop))
+            for file_index, position in enumerate(range(start, stop, split_size), 1)]
+
+
+def _range_part(settings, output_file, file_index, start, stop, batch_size, writer_options,
+                manifest_path, checksum, stop_event=None):
+    """进程池任务：把序号区间内的候选写成第 file_index 个分割文件并登记到清单，返回候选数
+
+    以临时文件名写入，写完后改名；停止时返回 None，临时文件留给调用方删除。
+    """
+    manifest = PartManifest(manifest_path, append=True, checksum=checksum,
+                            durable=writer_options.get('durability', 'none') != 'none')
+    options = dict(writer_options, publish=True, compress_workers=1)
+    writer = PartWriter(output_file, log=_quiet_log, first_candidate=start, manifest=manifest, **options)
+    written = 0
+    try:
+        for block, count in combination_batches(batch_size=batch_size, stop_event=stop_event,
+                                                log=_quiet_log, start=start, stop=stop, **settings):
+            writer.write(file_index, block, count)
+            written += count
+        if _is_stopped(stop_event):
+            return None
+        writer.finish()
+    finally:
+        writer.close()
+    return written
+
+
+def _remove_unfinished(output_file, ranges):
+    """删除停止时未写完的分割文件临时文件及其索引"""
+    for file_index, _start, _stop in ranges:
+        path = part_file_name(output_file, file_index) + PART_TEMP_SUFFIX
+        for leftover in (path, index_file_name(path)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def write_range_parts(settings, output_file, split_size, workers=1, start=0, stop=None, split_bytes=None,
+                      batch_size=GENERATION_BATCH_SIZE, stop_event=None, log=default_log, writer_options=None,
+                      checksum=MANIFEST_CHECKSUM, resume=False, progress=None):
+    """按预先划分的序号区间并行写分割文件，返回已写入的候选数
+
+    workers 个进程各写一个完整的分割文件（压缩、分割后压缩、可定位索引按
+    writer_options），写完后改名并登记到 输出文件.manifest.jsonl。resume 为真时跳过
+    清单中区间一致且文件存在的分割文件。progress(已写入数) 在每个文件完成后调用。
+    停止时终止进程并删除未写完的临时文件，已登记的文件保持完整。
+    """
+    if not is_indexable(settings):
+        raise ValueError("当前生成模式不支持并行生成")
+    total = settings_total(settings)
+    stop = total if stop is None else min(stop, total)
+    ranges = part_ranges(settings, start, stop, split_size, split_bytes)
+    if split_bytes and fixed_line_length(settings) is None:
+        log("候选长度不固定，按平均行长划分各文件的区间，文件大小为近似值")
+    manifest_path = manifest_file_name(output_file)
+    PartManifest(manifest_path, append=resume, checksum=checksum)  # 新任务清空清单，并确认校验算法可用
+    records = load_manifest(manifest_path)[1] if resume else {}
+    finished = {file_index for file_index, part_start, part_stop in ranges
+                if file_index in records and records[file_index]['first'] == part_start
+                and records[file_index]['count'] == part_stop - part_start
+                and os.path.exists(records[file_index]['path'])}
+    written = sum(records[file_index]['count'] for file_index in finished)
+    ranges = [entry for entry in ranges if entry[0] not in finished]
+    if finished:
+        log(f"跳过清单中已写完的 {len(finished)} 个分割文件（{written} 个候选）")
+
+    options = dict(writer_options or {})
+    if options.get('compress_level') == 'auto' and (output_file.endswith('.gz') or options.get('recompress')):
+        # 各进程使用同一个级别，只在这里测量一次
+        sample = _range_block(settings, start, min(start + batch_size, stop), batch_size)[0]
+        options['compress_level'] = resolve_compression_level(
+            'auto', sample, workers, os.path.dirname(os.path.abspath(output_file)), log)
+    tasks = [(settings, output_file, file_index, part_start, part_stop, batch_size, options, manifest_path, checksum)
+             for file_index, part_start, part_stop in ranges]
+    log(f"并行写分割文件: {len(tasks)} 个文件，{min(workers, max(len(tasks), 1))} 个进程")
+
+    if workers <= 1:
+        try:
+            for task in tasks:
+                count = _range_part(*task, stop_event)
+                if count is None:
+                    break
+                written += count
+                log(f"分割文件已写完: {part_file_name(output_file, task[2])}（{count} 个候选）")
+                if progress:
+                    progress(written)
+        finally:
+            _remove_unfinished(output_file, ranges)
+        return written
+
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        pending = deque((task[2], pool.apply_async(_range_part, task)) for task in tasks)
+        while pending:
+            count = _wait_result(pending[0][1], stop_event)
+            if count is None:
+                break
+            file_index, _result = pending.popleft()
+            written += count
+            log(f"分割文件已写完: {part_file_name(output_file, file_index)}（{count} 个候选）")
+            if progress:
+                progress(written)
+        # 停止时其它进程可能已写完之后的文件，它们已登记，同样计入
+        written += sum(result.get() for _file_index, result in pending if result.ready() and result.successful())
+        return written
+    finally:
+        pool.terminate()
+        pool.join()
+        _remove_unfinished(output_file, ranges)
+
+
+def split_block(block, count):
+    """在第 count 个候选之后切分数据块"""
+    position = 0
+    for _ in range(count):
+        position = block.index(b'\n', position) + 1
+    return block[:position], block[position:]
+
+
+def slice_batches(batches, start=0, stop=None, stop_event=None):
+    """顺序跳过前 start 个候选，只产出序号 [start, stop) 的批次"""
+    position = 0
+    for block, count in batches:
+        if _is_stopped(stop_event) or (stop is not None and position >= stop):
+            return
+        end = position + count
+        if end <= start:
+            position = end
+            continue
+        if position < start:
+            _skipped, block = split_block(block, start - position)
+            count -= start - position
+            position = start
+        if stop is not None and position + count > stop:
+            block, _rest = split_block(block, stop - position)
+            count = stop - position
+        yield block, count
+        position += count
+
+
+def split_batches(batches, split_size, stop_event=None, file_index=1, in_file=0,
+                  split_bytes=None, split_seconds=None, in_file_bytes=0):
+    """按分割策略切分批次，产出 (数据块, 候选数, 文件序号)
+
+    每个文件最多 split_size 个候选；split_bytes 为每个文件最多的（未压缩）字节数，
+    按整行切分，单个候选超过该大小时独占一个文件；split_seconds 为每个文件最长的
+    写入时间（秒，按批次检查）。任一条件达到即换到下一个文件。
+    文件序号从1开始；只有真正有数据写入时才会出现新的序号。
+    续传时 file_index/in_file/in_file_bytes 为当前文件序号及其中已有的候选数和字节数，
+    按时间分割时当前文件重新计时。
+    """
+    opened = time.monotonic()
+    for block, count in batches:
+        if _is_stopped(stop_event):
+            return
+        while count:
+            if in_file and (in_file >= split_size or (split_bytes and in_file_bytes >= split_bytes)
+                            or (split_seconds and time.monotonic() - opened >= split_seconds)):
+                file_index += 1
+                in_file = in_file_bytes = 0
+                opened = time.monotonic()
+            take, position = min(count, split_size - in_file), None
+            if split_bytes and in_file_bytes + len(block) > split_bytes:
+                position = block.rfind(b'\n', 0, split_bytes - in_file_bytes) + 1
+                if not position:
+                    if in_file:
+                        # 当前文件已放不下下一行
+                        in_file_bytes = split_bytes
+                        continue
+                    position = block.index(b'\n') + 1
+                lines = block.count(b'\n', 0, position)
+                if lines < take:
+                    take = lines
+                else:
+                    position = None
+            if take == count:
+                yield block, count, file_index
+                in_file += count
+                in_file_bytes += len(block)
+                break
+            if position is None:
+                head, block = split_block(block, take)
+            else:
+                head, block = block[:position], block[position:]
+            yield head, take, file_index
+            in_file += take
+            in_file_bytes += len(head)
+            count -= take
+
+
+def split_policy(split_bytes=None, split_seconds=None, parallel=False):
+    """按字节、时间分割或并行写分割文件的设置，随检查点保存；只按候选数分割时返回 None"""
+    if not (split_bytes or split_seconds or parallel):
+        return None
+    return {'bytes': split_bytes or None, 'seconds': split_seconds or None, 'parallel': bool(parallel)}
+
+
+def effective_split(settings, split_size, split_bytes=None):
+    """定长候选时把字节上限换算为候选数，返回 (每个文件的候选数, 仍需按字节切分的上限)
+
+    换算后不必逐块查找换行，内存映射输出和预先划分区间也能按字节分割。
+    """
+    line_length = fixed_line_length(settings) if split_bytes else None
+    if line_length is None:
+        return split_size, split_bytes
+    return min(split_size, max(split_bytes // line_length, 1)), None
+
+
+def is_stream_target(output_file):
+    """输出目标为标准输出（"-"）或命名管道时返回真，此时不分割文件"""
+    if output_file == '-':
+        return True
+    try:
+        return stat.S_ISFIFO(os.stat(output_file).st_mode)
+    except OSError:
+        return False
+
+
+def stream_batches(batches, out, stop_event=None):
+    """把批次按整块写入流（标准输出或命名管道），返回 (候选数, 读取端是否已关闭)
+
+    写入阻塞时生成随之暂停，速度跟随读取端；读取端退出（EPIPE）时停止生成而不报错。
+    """
+    written = 0
+    try:
+        for block, count in batches:
+            if _is_stopped(stop_event):
+                break
+            out.write(block)
+            written += count
+        out.flush()
+    except BrokenPipeError:
+        return written, True
+    return written, False
+
+
+def write_json_atomic(path, data):
+    """先写临时文件再原子替换，读者不会看到写了一半的 JSON"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def fsync_directory(path):
+    """把 path 所在目录中的新建、改名记录写入磁盘；不支持对目录 fsync 的平台上忽略"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ByteBudgetQueue(queue.Queue):
+    """按字节数限制容量的写入队列
+
+    队列中数据块的总字节数达到 budget 后 put() 阻塞，直到写入线程取走数据，
+    生成速度超过磁盘时内存占用不会无限增长。单个超过预算的数据块在队列为空时
+    仍可放入；检查点标记和结束标记 None 不受预算限制，写入线程退出时不会卡住。
+    同时统计生成端因队列已满而等待的次数和时间。
+    """
+
+    def __init__(self, budget=WRITE_QUEUE_BUDGET):
+        super().__init__(maxsize=max(int(budget), 1))
+        self.stall_count = 0
+        self.stall_time = 0.0
+
+    @staticmethod
+    def _item_size(item):
+        # 每项至少计1字节，使只含检查点等标记时队列也不为空
+        if isinstance(item, tuple) and isinstance(item[-1], (bytes, bytearray)):
+            return len(item[-1]) + 1
+        return 1
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.queued_bytes = 0
+        self.peak_bytes = 0
+
+    def _qsize(self):
+        return self.queued_bytes
+
+    def _put(self, item):
+        self.queue.append(item)
+        self.queued_bytes += self._item_size(item)
+        self.peak_bytes = max(self.peak_bytes, self.queued_bytes)
+
+    def _get(self):
+        item = self.queue.popleft()
+        self.queued_bytes -= self._item_size(item)
+        return item
+
+    def put(self, item, block=True, timeout=None):
+        """放入一项，队列已满时阻塞并计入等待统计"""
+        if self._item_size(item) == 1:
+            with self.not_full:
+                self._put(item)
+                self.unfinished_tasks += 1
+                self.not_empty.notify()
+            return
+        with self.mutex:
+            stalled = self.queued_bytes >= self.maxsize
+        if not stalled:
+            return super().put(item, block, timeout)
+        started = time.monotonic()
+        try:
+            return super().put(item, block, timeout)
+        finally:
+            with self.mutex:
+                self.stall_time += time.monotonic() - started
+                self.stall_count += 1
+
+    def stats(self):
+        """当前队列字节数、项数、峰值字节数、等待次数和累计等待秒数"""
+        with self.mutex:
+            return {
+                'queued_bytes': self.queued_bytes,
+                'queued_items': len(self.queue),
+                'peak_bytes': self.peak_bytes,
+                'budget': self.maxsize,
+                'stall_count': self.stall_count,
+                'stall_time': self.stall_time,
+            }
+
+
+# ===== 并行 gzip =====
+# 数据按 COMPRESSION_BLOCK_SIZE 切块，各块独立压缩为 gzip 成员后按顺序拼接，
+# 多成员 gzip 可由 gzip/zcat/hashcat 直接读取。zlib 压缩时释放 GIL，线程池即可并行。
+
+def gzip_member(data, level=GZIP_LEVEL):
+    """把数据压缩为一个完整的 gzip 成员（mtime 固定为0，相同输入得到相同输出）"""
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def gzip_blocks(blocks, level=GZIP_LEVEL, pool=None, window=None):
+    """按顺序返回各数据块压缩后的 gzip 成员
+
+    pool 为线程池时并行压缩，同时最多有 window 个块在压缩中。
+    """
+    if pool is None:
+        for block in blocks:
+            yield gzip_member(block, level)
+        return
+    window = window or 2 * (os.cpu_count() or 1)
+    pending = deque()
+    for block in blocks:
+        pending.append(pool.submit(gzip_member, block, level))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def measure_write_throughput(directory, size=32 * 1024 * 1024):
+    """在目录中写入并 fsync 一个临时文件，返回磁盘写入速度（字节/秒）"""
+    path = os.path.join(directory or '.', f".write_test_{os.getpid()}.tmp")
+    block = os.urandom(1024 * 1024)
+    started = time.perf_counter()
+    try:
+        with open(path, 'wb') as f:
+            for _ in range(max(size // len(block), 1)):
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        elapsed = time.perf_counter() - started
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return max(size // len(block), 1) * len(block) / max(elapsed, 1e-6)
+
+
+def choose_compression_level(sample, workers=1, disk_rate=None):
+    """按实测的压缩速度和磁盘速度选择压缩级别
+
+    每个候选级别的整体速度取 CPU（单线程速度×可并行的线程数）与磁盘（磁盘速度÷压缩率）
+    中较慢的一方；在速度不低于最快级别90%的级别中选压缩率最高的。
+    """
+    if not sample:
+        return GZIP_LEVEL
+    rates = {}
+    for level in AUTO_COMPRESSION_LEVELS:
+        started = time.perf_counter()
+        compressed = gzip_member(sample, level)
+        cpu_rate = (len(sample) / max(time.perf_counter() - started, 1e-6)
+                    * min(workers, os.cpu_count() or 1))
+        if disk_rate:
+            cpu_rate = min(cpu_rate, disk_rate * len(sample) / max(len(compressed), 1))
+        rates[level] = cpu_rate
+    fastest = max(rates.values())
+    return max(level for level, rate in rates.items() if rate >= fastest * 0.9)
+
+
+def resolve_compression_level(level, sample, workers=1, directory=None, log=default_log):
+    """level 为 'auto' 时测量后选择压缩级别，否则原样返回整数级别"""
+    if level != 'auto':
+        return int(level)
+    disk_rate = measure_write_throughput(directory)
+    chosen = choose_compression_level(sample[:COMPRESSION_BLOCK_SIZE], workers, disk_rate)
+    log(f"自动选择压缩级别 {chosen}（磁盘写入约 {disk_rate / 1048576:.0f} MB/s，压缩线程 {workers}）")
+    return chosen
+
+
+def compress_file(path, level=GZIP_LEVEL, pool=None, remove_source=True, first_candidate=None,
+                  checksum=None, durable=False):
+    """把已完成的文件压缩为 path.gz（多成员 gzip），返回压缩后的路径
+
+    每个成员在换行处结束；first_candidate 不为 None 时同时写出可定位索引。
+    checksum 为增量哈希对象时随写出更新，得到压缩文件的校验值而无需再读一遍。
+    先写入临时文件再改名，中途失败不会留下不完整的 .gz；durable 为真时改名前
+    fsync 压缩文件、改名后 fsync 目录，之后才删除原文件。
+    """
+    target = path + '.gz'
+    temp_path = target + '.tmp'
+    index = BlockIndex(first_candidate) if first_candidate is not None else None
+    sizes = deque()
+
+    def read_blocks(f):
+        while True:
+            block = f.read(COMPRESSION_BLOCK_SIZE)
+            if not block:
+                return
+            if not block.endswith(b'\n'):
+                block += f.readline()
+            sizes.append((len(block), block.count(b'\n')))
+            yield block
+
+    with open(path, 'rb') as source, open(temp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as out:
+        for member in gzip_blocks(read_blocks(source), level, pool):
+            size, count = sizes.popleft()
+            if index is not None:
+                index.add(out.tell(), len(member), size, count)
+            if checksum is not None:
+                checksum.update(member)
+            out.write(member)
+        if durable:
+            out.flush()
+            os.fsync(out.fileno())
+    if index is not None:
+        index.save(target)
+    os.replace(temp_path, target)
+    if durable:
+        fsync_directory(target)
+    if remove_source:
+        os.remove(path)
+    return target
+
+
+# ===== 可定位的压缩格式 =====
+# .gz 输出的每个 gzip 成员都可独立解压，且在换行处结束。旁路索引文件 <文件>.idx
+# 记录每个成员的 [压缩偏移, 压缩长度, 原始偏移, 原始长度, 首个候选序号, 候选数]，
+# 读取者据此直接定位到第 N 个候选所在的成员，多个进程可并行解压互不重叠的区间。
+
+BLOCK_INDEX_VERSION = 1
+
+
+def index_file_name(path):
+    """压缩文件对应的可定位索引文件"""
+    return f"{path}.idx"
+
+
+class BlockIndex:
+    """可定位压缩文件的成员索引"""
+
+    def __init__(self, first_candidate=0, blocks=None):
+        self.first_candidate = first_candidate
+        self.blocks = blocks or []
+
+    @property
+    def candidates(self):
+        """已索引的候选数"""
+        if not self.blocks:
+            return 0
+        last = self.blocks[-1]
+        return last[4] + last[5] - self.first_candidate
+
+    @property
+    def uncompressed_size(self):
+        if not self.blocks:
+            return 0
+        return self.blocks[-1][2] + self.blocks[-1][3]
+
+    def add(self, offset, length, size, count):
+        """登记一个刚写入的成员"""
+        self.blocks.append([offset, length, self.uncompressed_size, size,
+                            self.first_candidate + self.candidates, count])
+
+    def truncate(self, file_size):
+        """续传截断文件后，丢弃超出文件长度的成员"""
+        self.blocks = [block for block in self.blocks if block[0] + block[1] <= file_size]
+
+    def save(self, path):
+        write_json_atomic(index_file_name(path), {
+            'version': BLOCK_INDEX_VERSION,
+            'first_candidate': self.first_candidate,
+            'candidates': self.candidates,
+            'blocks': self.blocks,
+        })
+
+    @classmethod
+    def load(cls, path):
+        """读取压缩文件的索引，不存在时抛出 FileNotFoundError"""
+        with open(index_file_name(path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != BLOCK_INDEX_VERSION:
+            raise ValueError(f"不支持的索引版本: {data.get('version')}")
+        return cls(data['first_candidate'], data['blocks'])
+
+    def find(self, candidate):
+        """包含第 candidate 个候选的成员序号"""
+        if not self.first_candidate <= candidate < self.first_candidate + self.candidates:
+            raise IndexError(f"候选序号 {candidate} 不在文件范围内")
+        return bisect_right([block[4] for block in self.blocks], candidate) - 1
+
+    def split(self, parts):
+        """按成员边界把文件分成 parts 个候选区间 [(start, stop), ...]，供多个进程并行读取
+
+        成员数少于 parts 时多出的区间为空。
+        """
+        end = self.first_candidate + self.candidates
+        bounds = [self.blocks[len(self.blocks) * part // parts][4] if self.blocks else end
+                  for part in range(parts)]
+        bounds.append(end)
+        return [(bounds[i], bounds[i + 1]) for i in range(parts)]
+
+
+def read_candidates(path, start=None, stop=None, index=None):
+    """从可定位压缩文件读取序号 [start, stop) 的候选，按成员返回数据块
+
+    只解压区间覆盖的成员；序号为全局序号（与索引中的首个候选序号一致）。
+    """
+    index = index or BlockIndex.load(path)
+    end = index.first_candidate + index.candidates
+    start = index.first_candidate if start is None else max(start, index.first_candidate)
+    stop = end if stop is None else min(stop, end)
+    if start >= stop:
+        return
+    with open(path, 'rb') as f:
+        for offset, length, _size, _usize, first, count in index.blocks[index.find(start):]:
+            if first >= stop:
+                return
+            f.seek(offset)
+            block = gzip.decompress(f.read(length))
+            if first < start or first + count > stop:
+                for block, _count in slice_batches([(block, count)], max(start - first, 0), stop - first):
+                    yield block
+            else:
+                yield block
+
+
+# ===== 写入时的磁盘空间监控 =====
+# 共享的临时磁盘上其它任务也在写入，开始前的空间检查不够：写入过程中定期检查输出
+# 文件系统的可用空间，不足时依次暂停等待、切换之后的分割文件为压缩输出或备用目录，
+# 最后在磁盘写满之前停止，使调用方能记录准确的检查点。
+
+class OutputSpaceError(OSError):
+    """输出文件系统可用空间不足，已在写满之前停止写入"""
+
+
+def disk_free(path):
+    """path 所在文件系统的可用字节数（path 不存在时取其所在目录）"""
+    directory = os.path.dirname(os.path.abspath(path)) if not os.path.isdir(path) else path
+    return shutil.disk_usage(directory or '.').free
+
+
+class SpaceGuard:
+    """写入前检查可用空间，不足时暂停、切换策略或停止
+
+    可用空间低于 min_free 时暂停写入（生成端随写入队列一起等待），每隔
+    SPACE_POLL_INTERVAL 秒重新检查，最多等待 wait 秒。空间仍未恢复时对之后打开的
+    分割文件依次采用：gzip 压缩（compress 为真且输出尚未压缩时）、spill_dirs 中第一个
+    可用空间足够的目录。当前文件无法迁移，在 min_free 的四分之一以内继续写完；低于
+    该保留空间或已无可用策略时抛出 OutputSpaceError。
+    """
+
+    def __init__(self, min_free=MIN_FREE_SPACE, wait=SPACE_WAIT, spill_dirs=(), compress=True,
+                 stop_event=None, log=default_log):
+        self.min_free = min_free
+        self.reserve = min_free // 4
+        # 两次检查之间写入的数据不超过保留空间的一半
+        self.check_bytes = max(min(SPACE_CHECK_BYTES, self.reserve // 2), 1)
+        self.wait = wait
+        self.spill_dirs = list(spill_dirs)
+        self.compress = compress
+        self.stop_event = stop_event
+        self.log = log
+        self.pauses = 0
+        self.pause_time = 0.0
+        self._switched = None
+        self._unchecked = 0
+        self._last_check = 0.0
+
+    def check(self, writer, size):
+        """写入 size 字节之前调用；空间不足且无法恢复时抛出 OutputSpaceError"""
+        now = time.monotonic()
+        self._unchecked += size
+        if self._unchecked < self.check_bytes and now - self._last_check < SPACE_CHECK_INTERVAL:
+            return
+        self._unchecked = 0
+        self._last_check = now
+        path = writer.current_file
+        free = disk_free(path) - size
+        if free >= self.min_free:
+            return
+        if self._switched == writer.file_index and free >= self.reserve:
+            return  # 已为之后的分割文件切换策略，当前文件在保留空间内写完
+
+        directory = os.path.dirname(os.path.abspath(path))
+        self.log(f"输出目录 {directory} 可用空间仅 {format_size(max(free, 0))}，"
+                 f"低于 {format_size(self.min_free)}，暂停写入", "warning")
+        self.pauses += 1
+        deadline = now + self.wait
+        while time.monotonic() < deadline and not _is_stopped(self.stop_event):
+            time.sleep(max(min(SPACE_POLL_INTERVAL, deadline - time.monotonic()), 0))
+            free = disk_free(path) - size
+            if free >= self.min_free:
+                break
+        self.pause_time += time.monotonic() - now
+        self._last_check = time.monotonic()
+        if free >= self.min_free:
+            self.log(f"可用空间已恢复到 {format_size(free)}，继续写入")
+            return
+        if free >= self.reserve and (_is_stopped(self.stop_event) or self._switched == writer.file_index):
+            return
+        if free >= self.reserve and self._fallback(writer):
+            self._switched = writer.file_index
+            return
+        raise OutputSpaceError(f"输出目录 {directory} 可用空间不足（剩余 {format_size(max(free, 0))}），"
+                               f"已在写满之前停止")
+
+    def _fallback(self, writer):
+        """对之后的分割文件采用下一种策略，没有可用策略时返回 False"""
+        next_index = writer.file_index + 1
+        if self.compress and not writer.part_path(next_index).endswith('.gz'):
+            writer.switch_parts(next_index, compress=True)
+            self.log(f"之后的分割文件（第 {next_index} 个起）改为 gzip 压缩输出", "warning")
+            return True
+        while self.spill_dirs:
+            directory = self.spill_dirs.pop(0)
+            os.makedirs(directory, exist_ok=True)
+            free = disk_free(directory)
+            if free >= self.min_free:
+                writer.switch_parts(next_index, directory=directory)
+                self.log(f"之后的分割文件（第 {next_index} 个起）改为写入备用目录 {directory}"
+                         f"（可用 {format_size(free)}）", "warning")
+                return True
+            self.log(f"备用目录 {directory} 可用空间仅 {format_size(free)}，跳过", "warning")
+        return False
+
+
+class PartWriter:
+    """分割文件写入器：每个分割文件只打开一次，持续追加已编码的数据块
+
+    文件序号变化时关闭当前文件并打开下一个；本次运行中新打开的文件会被清空，
+    只有续传的 append_index 文件以追加方式打开。
+
+    .gz 输出按 COMPRESSION_BLOCK_SIZE 切块压缩为独立的 gzip 成员，compress_workers
+    大于1时由线程池并行压缩并按顺序写入；sync() 把未满的块也写成一个成员，使返回的
+    偏移始终落在完整成员边界上。compress_level 可为 1-9 或 'auto'（首块数据到达时
+    按实测速度选择）。recompress 为真且输出不是 .gz 时，写完的分割文件在后台压缩为
+    .gz，与下一个文件的生成同时进行；最后一个文件在 finish() 时压缩。
+
+    first_candidate 为接下来写入的第一个候选的序号（续传时为检查点的游标），各分割文件
+    的首个候选序号按实际写入的候选数累计，记入 part_firsts，与分割策略无关。
+    seekable 为真时为每个 .gz 文件写出可定位索引。
+
+    layout 记录从第几个分割文件起改为压缩输出或写入其它目录（由 SpaceGuard 切换，
+    条带输出时每个文件一条），随检查点保存，续传时传回以找到已写出的文件。
+    space_guard 在每次写入前检查可用空间。
+
+    publish 为真时分割文件先以 <文件名>.tmp 写入，写完后原子改名，下游工具看到正式
+    文件名即可使用。manifest 为 PartManifest 时每个分割文件写完（改名、分割后压缩
+    完成）后登记一行：位置、候选序号区间、字节数和写出时逐块计算的校验值。
+    append_count/append_bytes 为续传文件中已有的候选数和未压缩字节数。
+
+    durability 为落盘策略（DURABILITY_MODES）：none 只把数据交给操作系统；interval
+    每写入 fsync_bytes 字节或距上次超过 fsync_seconds 秒时 fsync 当前文件；close 在
+    分割文件写完时 fsync，并总是以临时文件写入、fsync 后改名。interval 和 close 下
+    写完的文件都先 fsync 再改名或登记，durable_position() 只给出已 fsync 的位置。
+    """
+
+    def __init__(self, output_file, append_index=0, buffer_size=WRITE_BUFFER_SIZE,
+                 compress_level=GZIP_LEVEL, compress_workers=1, recompress=False, log=default_log,
+                 seekable=False, first_candidate=0, layout=None, space_guard=None,
+                 manifest=None, publish=False, append_count=0, append_bytes=0, durability='none',
+                 fsync_bytes=FSYNC_BYTES, fsync_seconds=FSYNC_SECONDS):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"未知的落盘策略: {durability}")
+        self.output_file = output_file
+        self.append_index = append_index
+        self.buffer_size = buffer_size
+        self.compressed = output_file.endswith('.gz')
+        self.compress_level = compress_level
+        self.compress_workers = max(int(compress_workers), 1)
+        self.recompress = recompress and not self.compressed
+        self.log = log
+        self.seekable = seekable
+        self.cursor = first_candidate
+        self.part_firsts = {}
+        self.layout = [dict(entry) for entry in layout or []]
+        self.space_guard = space_guard
+        self.manifest = manifest
+        self.publish = publish or durability == 'close'
+        self.append_count = append_count
+        self.append_bytes = append_bytes
+        self.durability = durability
+        self.fsync_bytes = fsync_bytes
+        self.fsync_seconds = fsync_seconds
+        self.index = None
+        self.file_index = 0
+        self.current_file = None
+        self.bytes_written = 0
+        self._raw = None
+        self._checksum = None
+        self._count = 0
+        self._part_bytes = 0
+        self._durable = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._pending = bytearray()
+        self._members = deque()
+        self._pool = None
+        self._background = None
+        self._background_jobs = []
+        if self.compress_workers > 1 and (self.compressed or self.recompress):
+            self._pool = ThreadPoolExecutor(max_workers=self.compress_workers)
+
+    def part_path(self, file_index):
+        """第 file_index 个分割文件的实际路径（按 layout 中的切换记录）"""
+        return layout_part_path(self.output_file, self.layout, file_index)
+
+    def switch_parts(self, file_index, directory=None, compress=False):
+        """从第 file_index 个分割文件起写入 directory 或改为 gzip 压缩"""
+        self.layout.append({'from': file_index, 'directory': directory, 'compress': compress})
+
+    def writing_path(self, file_index):
+        """第 file_index 个分割文件写入时的路径：publish 时为临时文件名"""
+        path = self.part_path(file_index)
+        return path + PART_TEMP_SUFFIX if self.publish else path
+
+    def _open(self, file_index):
+        self._close_part()
+        self.file_index = file_index
+        self.current_file = self.writing_path(file_index)
+        self.compressed = self.part_path(file_index).endswith('.gz')
+        mode = 'ab' if file_index == self.append_index else 'wb'
+        # 条带输出时由 StripedPartWriter 按全部文件的写入顺序先行记录
+        self.part_firsts.setdefault(file_index, self.cursor - (self.append_count if mode == 'ab' else 0))
+        self._count = self._part_bytes = 0
+        self._checksum = None
+        if mode == 'ab':
+            self._count = self.append_count
+            self._part_bytes = self.append_bytes
+        if self.manifest is not None:
+            self._checksum = self.manifest.new_checksum()
+            if mode == 'ab' and self._checksum is not None:
+                # 续传：校验值从文件中已有的部分接着算
+                hash_file(self.current_file, self._checksum)
+        self._raw = open(self.current_file, mode, buffering=self.buffer_size)
+        if self.seekable and self.compressed:
+            self.index = BlockIndex(self.part_first_candidate(file_index))
+            if mode == 'ab':
+                # 续传：沿用已截断文件范围内的索引
+                try:
+                    self.index.blocks = BlockIndex.load(self.current_file).blocks
+                except FileNotFoundError:
+                    pass
+                self.index.truncate(self._raw.tell())
+        # 新文件的开头（上一个文件已在关闭时 fsync）或续传时截断后的位置都是可信的
+        self._durable = self._position()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _position(self):
+        """当前文件中已交给文件对象的位置（gzip 缓冲区已写出时）"""
+        return {
+            'file_index': self.file_index,
+            'in_file': self._count,
+            'in_file_bytes': self._part_bytes,
+            'offset': self._raw.tell(),
+            'current_file': self.current_file,
+            'cursor': self.part_firsts[self.file_index] + self._count,
+        }
+
+    def part_first_candidate(self, file_index):
+        """第 file_index 个分割文件的首个候选序号"""
+        return self.part_firsts[file_index]
+
+    def _level(self, sample):
+        if self.compress_level == 'auto':
+            self.compress_level = resolve_compression_level(
+                'auto', sample, self.compress_workers,
+                os.path.dirname(os.path.abspath(self.output_file)), self.log)
+        return self.compress_level
+
+    def _compress_pending(self):
+        """把缓冲的数据作为一个 gzip 成员交给压缩线程，未完成的成员过多时先写出最早的"""
+        if not self._pending:
+            return
+        # 缓冲区在数据写出或交给压缩线程后才清空，压缩中途被中断时 sync() 仍能写出这部分数据
+        data = bytes(self._pending)
+        level = self._level(data)
+        count = data.count(b'\n') if self.index is not None else 0
+        if self._pool is None and self.compress_workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=self.compress_workers)
+        if self._pool is None:
+            self._write_member(gzip_member(data, level), len(data), count)
+            self._pending.clear()
+            return
+        self._members.append((self._pool.submit(gzip_member, data, level), len(data), count))
+        self._pending.clear()
+        while len(self._members) > 2 * self.compress_workers:
+            self._write_next_member()
+
+    def _write_next_member(self):
+        member, size, count = self._members[0]
+        self._write_member(member.result(), size, count)
+        self._members.popleft()
+
+    def _write_raw(self, data):
+        if self._checksum is not None:
+            self._checksum.update(data)
+        self._raw.write(data)
+
+    def _write_member(self, member, size, count):
+        offset = self._raw.tell()
+        self._write_raw(member)
+        if self.index is not None:
+            self.index.add(offset, len(member), size, count)
+
+    def _drain(self):
+        self._compress_pending()
+        while self._members:
+            self._write_next_member()
+        if self.index is not None:
+            self.index.save(self.current_file)
+
+    def write(self, file_index, block, count=None):
+        """把数据块追加到第 file_index 个分割文件，count 为块中的候选数（省略时按换行数计）"""
+        if file_index != self.file_index or self._raw is None:
+            self._open(file_index)
+        if self.space_guard is not None:
+            self.space_guard.check(self, len(block))
+        if self.compressed:
+            self._pending += block
+            if len(self._pending) >= COMPRESSION_BLOCK_SIZE:
+                self._compress_pending()
+        else:
+            self._write_raw(block)
+        self.bytes_written += len(block)
+        count = block.count(b'\n') if count is None else count
+        self._count += count
+        self.cursor += count
+        self._part_bytes += len(block)
+        if self.durability == 'interval':
+            self._unsynced += len(block)
+            if ((self.fsync_bytes and self._unsynced >= self.fsync_bytes)
+                    or (self.fsync_seconds and time.monotonic() - self._synced_at >= self.fsync_seconds)):
+                self.make_durable()
+
+    def sync(self):
+        """把已写入的数据交给操作系统，返回当前文件的字节数"""
+        if self._raw is None:
+            return 0
+        self._drain()
+        self._raw.flush()
+        return self._raw.tell()
+
+    def make_durable(self):
+        """sync() 后按落盘策略 fsync 当前文件（none 时不 fsync），返回当前文件的字节数"""
+        offset = self.sync()
+        if self._raw is None:
+            return offset
+        if self.durability != 'none':
+            os.fsync(self._raw.fileno())
+        self._durable = self._position()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        return offset
+
+    def durable_position(self):
+        """检查点可以信任的位置：none 时为 sync() 后的当前位置，否则为最后一次 fsync 的位置
+
+        返回 {'file_index', 'in_file', 'in_file_bytes', 'offset', 'current_file', 'cursor'}，
+        还没有打开文件时返回 None。
+        """
+        if self._raw is None:
+            return None
+        self.sync()
+        if self.durability == 'none':
+            return self._position()
+        return dict(self._durable)
+
+    def compress_part(self, file_index, count=None):
+        """在后台把已完成的第 file_index 个分割文件压缩为 .gz，完成后登记到清单
+
+        count 为文件中的候选数，省略时压缩前按换行数统计。
+        """
+        path = self.part_path(file_index)
+        if self._background is None:
+            self._background = ThreadPoolExecutor(max_workers=1)
+        if self.compress_level == 'auto':
+            with open(path, 'rb') as f:
+                level = self._level(f.read(COMPRESSION_BLOCK_SIZE))
+        else:
+            level = self.compress_level
+        self._background_jobs.append(self._background.submit(
+            self._compress_and_register, file_index, path, level, count))
+
+    def _compress_and_register(self, file_index, path, level, count):
+        first_candidate = self.part_first_candidate(file_index) if self.seekable else None
+        durable = self.durability != 'none'
+        if self.manifest is None:
+            return compress_file(path, level, self._pool, True, first_candidate, durable=durable)
+        if count is None:
+            count = count_lines(path)
+        checksum = self.manifest.new_checksum()
+        target = compress_file(path, level, self._pool, True, first_candidate, checksum, durable)
+        self.manifest.add(self.manifest.record(file_index, target, self.part_first_candidate(file_index),
+                                               count, checksum))
+        return target
+
+    def _close_part(self, finished=True):
+        if self._raw is None:
+            return
+        try:
+            self._drain()
+            if self.durability != 'none':
+                # 写完或停止时关闭的文件都先 fsync，之后的改名、登记和检查点才可信
+                self._raw.flush()
+                os.fsync(self._raw.fileno())
+        finally:
+            raw, self._raw = self._raw, None
+            raw.close()
+        if finished:
+            self._finalize(self.file_index, self.current_file, self._count, self._checksum)
+
+    def _finalize(self, file_index, current_file, count, checksum):
+        """已写完的分割文件：临时文件改为正式文件名，然后压缩（分割后压缩时）或登记
+
+        count 为 None 时（续传前补登记）按文件内容统计候选数和校验值。
+        """
+        path = self.part_path(file_index)
+        if current_file != path:
+            os.replace(current_file, path)
+            if os.path.exists(index_file_name(current_file)):
+                os.replace(index_file_name(current_file), index_file_name(path))
+            if self.durability != 'none':
+                fsync_directory(path)
+        if self.recompress and not path.endswith('.gz'):
+            self.compress_part(file_index, count)
+        elif self.manifest is not None:
+            if count is None:
+                count = count_lines(path)
+                checksum = self.manifest.new_checksum()
+                if checksum is not None:
+                    hash_file(path, checksum)
+            self.manifest.add(self.manifest.record(file_index, path, self.part_first_candidate(file_index),
+                                                   count, checksum))
+
+    def recover_part(self, file_index):
+        """续传前处理上次中断时已写完、但尚未改名或压缩的第 file_index 个分割文件"""
+        path = unfinished_part(self, file_index)
+        if path is None:
+            return
+        if path != self.part_path(file_index):
+            self._finalize(file_index, path, None, None)
+        else:
+            self.compress_part(file_index)
+
+    def recover_parts(self, file_index):
+        """续传前处理第 file_index 个之前的所有分割文件"""
+        recover_part_firsts(self, file_index)
+        for index in range(1, file_index):
+            self.recover_part(index)
+
+    def _wait_background(self):
+        jobs, self._background_jobs = self._background_jobs, []
+        for job in jobs:
+            job.result()
+
+    def end_part(self):
+        """当前分割文件已写完：关闭并登记（分割后压缩时在后台压缩）"""
+        self._close_part(finished=True)
+
+    def finish(self):
+        """任务完成：关闭并压缩最后一个分割文件，等待后台压缩全部完成"""
+        self._close_part(finished=True)
+        self._wait_background()
+
+    def close(self):
+        """关闭当前文件并等待后台压缩完成；未 finish() 的当前文件保持原样以便续传"""
+        try:
+            self._close_part(finished=False)
+        finally:
+            try:
+                self._wait_background()
+            finally:
+                for pool in (self._background, self._pool):
+                    if pool is not None:
+                        pool.shutdown(wait=True)
+                self._background = self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def unfinished_part(writer, file_index):
+    """上次中断时已写完、但尚未改名（写完后发布）或压缩（分割后压缩）的分割文件的路径，
+    没有时返回 None"""
+    path = writer.part_path(file_index)
+    if writer.publish and os.path.exists(path + PART_TEMP_SUFFIX):
+        return path + PART_TEMP_SUFFIX
+    if writer.recompress and not path.endswith('.gz') and os.path.exists(path):
+        return path
+    return None
+
+
+def recover_part_firsts(writer, file_index):
+    """续传前推算之前尚未登记的分割文件的首个候选序号，记入 writer.part_firsts
+
+    第 file_index 个文件从 writer.cursor - append_count 开始；往前依次减去各文件的候选数
+    （清单中有记录时取记录，否则统计文件），到最早一个尚未改名或压缩的文件为止。
+    按字节或时间分割时各文件的候选数不同，只能这样从续传位置倒推。
+    """
+    pending = [index for index in range(1, file_index) if unfinished_part(writer, index)]
+    if not pending:
+        return
+    records = writer.manifest.load() if writer.manifest is not None else {}
+    first = writer.cursor - (writer.append_count if writer.append_index == file_index else 0)
+    for index in range(file_index - 1, pending[0] - 1, -1):
+        record = records.get(index)
+        if record is not None:
+            first -= record['count']
+        else:
+            first -= count_lines(unfinished_part(writer, index) or writer.part_path(index))
+        writer.part_firsts[index] = first
+
+
+def layout_part_path(output_file, layout, file_index):
+    """按 layout 中的切换记录（压缩、目录）确定第 file_index 个分割文件的路径"""
+    path = part_file_name(output_file, file_index)
+    for entry in layout:
+        if entry['from'] <= file_index:
+            if entry.get('directory'):
+                path = os.path.join(entry['directory'], os.path.basename(path))
+            if entry.get('compress') and not path.endswith('.gz'):
+                path += '.gz'
+    return path
+
+
+# ===== 分割文件清单 =====
+# 每个写完的分割文件在 <输出文件>.manifest.jsonl 中登记序号区间、候选数、字节数和
+# 写出时逐块计算的校验值，用于发布、校验和去重传输，不需要再读一遍输出。
+
+def manifest_file_name(output_file):
+    """输出文件对应的分割文件清单（JSON lines，每个写完的分割文件一行）"""
+    return f"{output_file}.manifest.jsonl"
+
+
+def new_checksum(algorithm=MANIFEST_CHECKSUM):
+    """按算法名创建增量哈希对象，none 时返回 None；xxh 系列需要 xxhash 模块"""
+    if algorithm == 'none':
+        return None
+    if algorithm.startswith('xxh'):
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError(f"校验算法 {algorithm} 需要安装 xxhash 模块") from None
+        return getattr(xxhash, algorithm)()
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise ValueError(f"不支持的校验算法: {algorithm}") from None
+
+
+class PartManifest:
+    """只追加的分割文件清单，可由多个写入线程同时登记
+
+    每个写完的分割文件一行：part、path、first（首个候选序号）、count、bytes、
+    checksum（"算法:十六进制"，算法为 none 时为 null）。校验值由写入器随数据块写出
+    逐块计算，不需要再读一遍文件。下游工具持续读取（tail）清单，看到某个文件的记录
+    即可开始处理它。续传时中断前已登记的文件可能再次登记，同一分割文件有多行时以
+    最后一行为准。任务完成后 finalize() 把清单整理为首行任务汇总加按序号排列的记录。
+    durable 为真时每次登记和整理后 fsync 清单。
+    """
+
+    def __init__(self, path, append=False, checksum=MANIFEST_CHECKSUM, durable=False):
+        new_checksum(checksum)  # 算法不可用时在开始写入前报错
+        self.path = path
+        self.checksum = checksum
+        self.durable = durable
+        self._lock = threading.Lock()
+        if not append:
+            # 新任务：清空上次同名任务的清单
+            open(path, 'w', encoding='utf-8').close()
+
+    def new_checksum(self):
+        """清单所用算法的增量哈希对象，算法为 none 时为 None"""
+        return new_checksum(self.checksum)
+
+    def record(self, file_index, path, first, count, checksum):
+        """一个分割文件的记录：序号区间为 [first, first + count)
+
+        checksum 为增量哈希对象，或进程池任务返回的十六进制校验值。
+        """
+        if checksum is not None and not isinstance(checksum, str):
+            checksum = checksum.hexdigest()
+        return {
+            'part': file_index,
+            'path': os.path.abspath(path),
+            'first': first,
+            'count': count,
+            'bytes': os.path.getsize(path),
+            'checksum': None if checksum is None else f"{self.checksum}:{checksum}",
+        }
+
+    def add(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            if self.durable:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def load(self):
+        """读取清单，返回 {分割文件序号: 最后一条记录}"""
+        return load_manifest(self.path)[1]
+
+    def finalize(self, **job):
+        """任务完成：重写清单，首行为任务汇总 {"job": {...}}，之后按序号每个分割文件一行
+
+        job 为调用方补充的任务信息（输出文件、指纹、序号范围等），返回汇总。
+        """
+        records = [record for _part, record in sorted(self.load().items())]
+        job.update(parts=len(records), count=sum(record['count'] for record in records),
+                   bytes=sum(record['bytes'] for record in records), checksum=self.checksum)
+        temp_path = self.path + PART_TEMP_SUFFIX
+        with self._lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for entry in [{'job': job}] + records:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                if self.durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        return job
+
+
+def load_manifest(path):
+    """读取清单，返回 (任务汇总或 None, {分割文件序号: 最后一条记录})"""
+    job, records = None, {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if 'job' in record:
+                        job = record['job']
+                    else:
+                        records[record['part']] = record
+    except FileNotFoundError:
+        pass
+    return job, records
+
+
+def hash_file(path, checksum):
+    """用文件内容更新 hashlib 对象并返回它"""
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(WRITE_BUFFER_SIZE), b''):
+            checksum.update(block)
+    return checksum
+
+
+def count_lines(path):
+    """文件中的换行数（即候选数），.gz 文件按解压后的内容统计"""
+    with (gzip.open if path.endswith('.gz') else open)(path, 'rb') as f:
+        return sum(block.count(b'\n') for block in iter(lambda: f.read(WRITE_BUFFER_SIZE), b''))
+
+
+# ===== 多目录条带输出 =====
+# 分割文件按轮询或剩余空间分配到多个目录（通常各在一块磁盘上），每个目录由独立的
+# 写入线程和字节预算队列驱动：当前文件所在磁盘忙于落盘时，后续文件已在其它磁盘上
+# 同时写入，总写入带宽随磁盘数增加。每个文件的位置记入 layout（随检查点保存）和
+# 分割文件清单。
+
+STRIPE_MODES = ("round-robin", "free-space")
+
+
+def total_disk_free(directories):
+    """多个目录的可用空间之和，同一文件系统上的目录只计一次"""
+    free = {}
+    for directory in directories:
+        free[os.stat(directory).st_dev] = shutil.disk_usage(directory).free
+    return sum(free.values())
+
+
+class StripedPartWriter:
+    """把分割文件分配到多个目录并由各目录的写入线程同时写入，接口与 PartWriter 相同
+
+    mode 为 "round-robin" 时按顺序轮流分配（有 space_guard 时跳过可用空间不足的目录），
+    为 "free-space" 时分配给当前可用空间最大的目录。每个目录一个 PartWriter，
+    options 原样传给它们（压缩、分割后压缩、可定位索引等）；各文件的首个候选序号由条带
+    按全部文件的写入顺序累计，与各目录的写入器共享。sync() 等待所有目录的
+    队列写完并刷新，返回当前文件的字节数；任一目录的写入线程出错时，之后的 write()/
+    sync()/finish() 抛出该错误。
+    """
+
+    def __init__(self, output_file, directories, mode="round-robin", append_index=0, layout=None,
+                 space_guard=None, manifest=None, queue_budget=WRITE_QUEUE_BUDGET, log=default_log,
+                 **options):
+        if mode not in STRIPE_MODES:
+            raise ValueError(f"未知的条带分配方式: {mode}")
+        if not directories:
+            raise ValueError("条带输出至少需要一个目录")
+        self.output_file = output_file
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.mode = mode
+        self.append_index = append_index
+        self.layout = [dict(entry) for entry in layout or []]
+        self.space_guard = space_guard
+        self.manifest = manifest
+        self.queue_budget = max(queue_budget // len(self.directories), 1)
+        self.log = log
+        self.options = options
+        self.recompress = options.get('recompress', False) and not output_file.endswith('.gz')
+        self.publish = options.get('publish', False) or options.get('durability') == 'close'
+        self.cursor = options.get('first_candidate', 0)
+        self.append_count = options.get('append_count', 0)
+        self.part_firsts = {}
+        self.file_index = 0
+        self.current_file = None
+        self.bytes_written = 0
+        self.error = None
+        self._next = 0
+        self._children = {}
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+
+    def part_path(self, file_index):
+        """第 file_index 个分割文件的实际路径"""
+        return layout_part_path(self.output_file, self.layout, file_index)
+
+    def writing_path(self, file_index):
+        """第 file_index 个分割文件写入时的路径"""
+        path = self.part_path(file_index)
+        return path + PART_TEMP_SUFFIX if self.publish else path
+
+    def switch_parts(self, file_index, directory=None, compress=False):
+        """空间不足时的切换：压缩对之后的文件生效，directory 加入条带目录"""
+        if compress:
+            self.layout.append({'from': file_index, 'directory': None, 'compress': True})
+        if directory:
+            self.directories.append(os.path.abspath(directory))
+
+    def _choose_directory(self):
+        if self.mode == "free-space":
+            # 从轮询位置开始比较，可用空间相同（如同一文件系统）时仍轮流分配
+            start = self._next % len(self.directories)
+            self._next += 1
+            return max(self.directories[start:] + self.directories[:start], key=disk_free)
+        for _ in range(len(self.directories)):
+            directory = self.directories[self._next % len(self.directories)]
+            self._next += 1
+            if self.space_guard is None or disk_free(directory) >= self.space_guard.min_free:
+                return directory
+        return directory
+
+    def _child(self, directory):
+        child = self._children.get(directory)
+        if child is None:
+            writer = PartWriter(self.output_file, append_index=self.append_index, log=self.log,
+                                manifest=self.manifest, **self.options)
+            writer.layout = self.layout  # 与条带共享，各线程按同一份记录确定路径
+            writer.part_firsts = self.part_firsts
+            work = ByteBudgetQueue(self.queue_budget)
+            thread = threading.Thread(target=self._run, args=(writer, work), daemon=True)
+            thread.start()
+            child = self._children[directory] = (writer, work, thread)
+        return child
+
+    def _run(self, writer, work):
+        """目录写入线程：(文件序号, 候选数, 数据块) 写入，(None, "end") 结束当前文件，
+        (None, "finish") 完成最后一个文件并等待后台压缩，None 退出"""
+        try:
+            while True:
+                try:
+                    item = work.get(timeout=1)
+                except queue.Empty:
+                    continue
+                try:
+                    if item is None:
+                        return
+                    if self.error is not None:
+                        continue
+                    if item == (None, "end"):
+                        writer.end_part()
+                    elif item[0] is None:
+                        writer.finish()
+                    else:
+                        writer.write(item[0], item[2], item[1])
+                except Exception as e:
+                    self.error = e
+                finally:
+                    work.task_done()
+        finally:
+            try:
+                writer.close()
+            except Exception as e:
+                if self.error is None:
+                    self.error = e
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def _put(self, work, thread, item):
+        while True:
+            self._check()
+            try:
+                work.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not thread.is_alive():
+                    raise RuntimeError("条带写入线程已退出")
+
+    def write(self, file_index, block, count=None):
+        """把数据块交给第 file_index 个分割文件所在目录的写入线程"""
+        self._check()
+        if file_index != self.file_index or self.current_file is None:
+            if self.current_file is not None:
+                # 上一个文件已写完，其目录线程关闭它，不必等到该目录的下一个文件
+                writer, work, thread = self._child(os.path.dirname(self.current_file))
+                self._put(work, thread, (None, "end"))
+            if not any(entry['from'] == file_index and entry.get('directory') for entry in self.layout):
+                self.layout.append({'from': file_index, 'directory': self._choose_directory(), 'compress': False})
+            appended = self.append_count if file_index == self.append_index else 0
+            self.part_firsts.setdefault(file_index, self.cursor - appended)
+            self.file_index = file_index
+            self.current_file = self.writing_path(file_index)
+        if self.space_guard is not None:
+            self.space_guard.check(self, len(block))
+        writer, work, thread = self._child(os.path.dirname(self.current_file))
+        if count is None:
+            count = block.count(b'\n')
+        self._put(work, thread, (file_index, count, block))
+        self.bytes_written += len(block)
+        self.cursor += count
+
+    def _join(self):
+        for _writer, work, _thread in self._children.values():
+            work.join()
+        self._check()
+
+    def sync(self):
+        """等待所有目录写完已交出的数据并刷新，返回当前文件的字节数"""
+        self._join()
+        offset = 0
+        for writer, _work, _thread in self._children.values():
+            size = writer.sync()
+            if writer.current_file == self.current_file:
+                offset = size
+        return offset
+
+    def make_durable(self):
+        """等待所有目录写完，按落盘策略 fsync 各目录的当前文件，返回当前文件的字节数"""
+        self._join()
+        offset = 0
+        for writer, _work, _thread in self._children.values():
+            size = writer.make_durable()
+            if writer.current_file == self.current_file:
+                offset = size
+        return offset
+
+    def durable_position(self):
+        """当前文件所在目录的写入器给出的可信位置（见 PartWriter.durable_position）
+
+        之前的文件已由各目录线程关闭（非 none 策略时已 fsync），只需看当前文件。
+        """
+        self._join()
+        position = None
+        for writer, _work, _thread in self._children.values():
+            if writer.current_file == self.current_file:
+                position = writer.durable_position()
+            else:
+                writer.sync()
+        return position
+
+    def compress_part(self, file_index, count=None):
+        """在后台把已完成的第 file_index 个分割文件压缩为 .gz（由其所在目录的写入器执行）"""
+        self._child(os.path.dirname(self.part_path(file_index)))[0].compress_part(file_index, count)
+
+    def recover_parts(self, file_index):
+        """续传前由各文件所在目录的写入器处理之前已写完、尚未改名或压缩的分割文件"""
+        recover_part_firsts(self, file_index)
+        for index in range(1, file_index):
+            self._child(os.path.dirname(self.part_path(index)))[0].recover_part(index)
+
+    def finish(self):
+        """任务完成：各目录完成最后一个文件（分割后压缩时压缩）并等待后台压缩"""
+        for writer, work, thread in self._children.values():
+            self._put(work, thread, (None, "finish"))
+        self._join()
+
+    def close(self):
+        """结束各目录的写入线程并关闭文件，返回前抛出写入中的错误"""
+        for _writer, work, _thread in self._children.values():
+            work.put(None)
+        for _writer, _work, thread in self._children.values():
+            thread.join()
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# ===== 检查点与续传 =====
+# 检查点记录序号游标、分割文件序号、当前文件中的候选数和字节偏移，
+# 续传时把当前文件截断到记录的偏移，再从游标处继续生成。
+
+def checkpoint_file_name(output_file):
+    """输出文件对应的检查点文件"""
+    return f"{output_file}.progress.json"
+
+
+def job_fingerprint(settings, split_size, start=0, stop=None, split_policy=None):
+    """生成设置的指纹，续传前确认任务没有变化
+
+    split_policy 为按字节、时间分割或并行写分割文件的设置（见 split_policy()），只按
+    候选数分割时为 None，指纹与之前的版本相同。
+    """
+    job = [settings, split_size, start, stop]
+    if split_policy:
+        job.append(split_policy)
+    payload = json.dumps(job, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def new_checkpoint(settings, output_file, split_size, start=0, stop=None, total=0, split_policy=None,
+                   durability=None):
+    """新任务的初始检查点
+
+    in_file_bytes 为当前文件中已有的未压缩字节数，按字节分割时续传用。durability 为
+    写入时的落盘策略 {'mode', 'bytes', 'seconds'}（见 durability_policy()），决定续传时
+    记录的位置是否已 fsync。
+    """
+    return {
+        'fingerprint': job_fingerprint(settings, split_size, start, stop, split_policy),
+        'output_file': os.path.abspath(output_file),
+        'split_size': split_size,
+        'split_policy': split_policy,
+        'durability': durability or durability_policy(),
+        'start': start,
+        'stop': stop,
+        'total': total,
+        'cursor': start,
+        'written': 0,
+        'file_index': 1,
+        'in_file': 0,
+        'in_file_bytes': 0,
+        'offset': 0,
+        'current_file': os.path.abspath(output_file),
+        'layout': [],
+        'timestamp': time.time(),
+    }
+
+
+def durability_policy(mode='none', fsync_bytes=FSYNC_BYTES, fsync_seconds=FSYNC_SECONDS):
+    """落盘策略的设置，随检查点保存；PartWriter 的 durability/fsync_bytes/fsync_seconds 选项由此得出"""
+    if mode not in DURABILITY_MODES:
+        raise ValueError(f"未知的落盘策略: {mode}")
+    if mode != 'interval':
+        return {'mode': mode, 'bytes': None, 'seconds': None}
+    return {'mode': mode, 'bytes': fsync_bytes or None, 'seconds': fsync_seconds or None}
+
+
+def durability_options(policy):
+    """落盘策略对应的 PartWriter 选项"""
+    return {'durability': policy['mode'], 'fsync_bytes': policy['bytes'], 'fsync_seconds': policy['seconds']}
+
+
+def checkpoint_writer(checkpoint, writer):
+    """按写入器给出的可信位置（见 PartWriter.durable_position）更新检查点
+
+    interval 和 close 策略下检查点可能落后于已写入的数据，续传时从已 fsync 的位置
+    重新生成之后的候选。
+    """
+    position = writer.durable_position()
+    if position is not None:
+        update_checkpoint(checkpoint, position['cursor'] - checkpoint['start'], position['file_index'],
+                          position['in_file'], position['offset'], position['current_file'], writer.layout,
+                          position['in_file_bytes'])
+    return checkpoint
+
+
+def update_checkpoint(checkpoint, written, file_index, in_file, offset, current_file, layout=None,
+                      in_file_bytes=0):
+    """记录已落盘的位置：written 为本任务已写入的候选数，offset 为当前文件字节数
+
+    layout 为 PartWriter.layout，记录空间不足时分割文件的压缩与目录切换；
+    in_file_bytes 为当前文件中的未压缩字节数（.gz 输出时与 offset 不同）。
+    """
+    if layout is not None:
+        checkpoint['layout'] = [dict(entry) for entry in layout]
+    checkpoint.update({
+        'cursor': checkpoint['start'] + written,
+        'written': written,
+        'file_index': file_index,
+        'in_file': in_file,
+        'in_file_bytes': in_file_bytes,
+        'offset': offset,
+        'current_file': os.path.abspath(current_file),
+        'timestamp': time.time(),
+    })
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    """原子写入检查点"""
+    write_json_atomic(path, checkpoint)
+
+
+def load_checkpoint(path):
+    """读取检查点，不存在或已损坏时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def prepare_resume(checkpoint):
+    """把当前分割文件截断到检查点记录的字节偏移
+
+    检查点之后写入的半截数据被丢弃；文件比记录的偏移短说明数据丢失，
+    无法精确续传，抛出 ValueError。落盘策略为 none 时记录的位置没有 fsync，
+    断电后文件末尾可能是零字节或半行，未压缩文件在截断前检查偏移之前的一段数据。
+    """
+    current_file = checkpoint['current_file']
+    offset = checkpoint['offset']
+    if checkpoint['in_file'] == 0:
+        return
+    size = os.path.getsize(current_file) if os.path.exists(current_file) else -1
+    if size < offset:
+        raise ValueError(f"文件 {current_file} 只有 {max(size, 0)} 字节，小于检查点记录的 {offset} 字节，无法续传")
+    with open(current_file, 'r+b') as f:
+        durability = checkpoint.get('durability') or {'mode': 'none'}
+        if durability['mode'] == 'none' and not current_file.endswith(('.gz', '.gz' + PART_TEMP_SUFFIX)):
+            f.seek(max(offset - RESUME_CHECK_BYTES, 0))
+            tail = f.read(offset - f.tell())
+            if b'\0' in tail or not tail.endswith(b'\n'):
+                raise ValueError(f"文件 {current_file} 在检查点位置之前的数据不完整（写入时没有 fsync，"
+                                 f"可能是断电造成的），无法续传")
+        f.truncate(offset)
+
+
+def part_file_name(output_file, file_index):
+    """分割文件命名：第一个文件使用原名，其后为 原文件名_N.扩展名"""
+    if file_index <= 1:
+        return output_file
+    file_name, file_ext = os.path.splitext(output_file)
+    return f"{file_name}_{file_index}{file_ext}"
+
+
+def prepare_generation(spec, stop_event=None, log=default_log):
+    """校验生成参数并加载字典，返回可直接传给生成器的设置
+
+    spec 的键与界面变量同名（去掉 _var 后缀），例如 mask、charset、min_len、
+    max_len、dict_file、dict_b_file、dict_combo、dict_pos、custom_dict 等；
+    字典处理选项放在 spec['processing'] 中。参数无效时抛出 ValueError。
+    """
+    settings = {
+        'parsed_mask': None,
+        'charset': None,
+        'length_range': None,
+        'dict_entries': [],
+        'combo_mode': spec.get('dict_combo') or "none",
+        'dict_pos': spec.get('dict_pos') or "none",
+        'dict_b_entries': None,
+        'advanced_settings': None,
+        'connector': spec.get('connector', "-"),
+    }
+
+    # 自定义字典组合
+    if spec.get('custom_dict'):
+        chars = spec.get('custom_chars')
+        if not chars:
+            raise ValueError("自定义字符不能为空")
+        try:
+            length = int(spec.get('custom_dict_length', 3))
+        except ValueError:
+            raise ValueError("生成长度必须为整数")
+        if length <= 0:
+            raise ValueError("生成长度必须为正整数")
+        settings['advanced_settings'] = {
+            "custom_dict": (chars, spec.get('custom_dict_mode', "combination"), length)
+        }
+        return settings
+
+    # 字典设置
+    dict_file = spec.get('dict_file')
+    dict_b_file = spec.get('dict_b_file')
+    combo_mode = settings['combo_mode']
+    # 追加到掩码或字符集候选前后时仍需解析基础生成参数
+    has_base = bool(spec.get('mask') or spec.get('charset') or spec.get('include_special'))
+    is_pure_dict = (bool(dict_file) and combo_mode == "none"
+                    and (settings['dict_pos'] == "none" or not has_base))
+
+    if combo_mode != "none" and not dict_file:
+        raise ValueError("必须选择字典文件A")
+    if combo_mode in ("dict_ab", "dict_ba") and not dict_b_file:
+        raise ValueError("字典组合模式下必须选择字典文件B")
+    if dict_file:
+        options = normalize_processing_options(spec.get('processing'))
+        settings['dict_entries'] = load_dict_entries(dict_file, options, stop_event)
+        log(f"字典A加载完成，条目数: {len(settings['dict_entries'])}")
+        if combo_mode in ("dict_ab", "dict_ba"):
+            settings['dict_b_entries'] = load_dict_entries(dict_b_file, options, stop_event)
+            log(f"字典B加载完成，条目数: {len(settings['dict_b_entries'])}")
+    if is_pure_dict or combo_mode in ("dict_ab", "dict_ba"):
+        return settings
+
+    # 重复字符模式
+    if spec.get('repeat_char'):
+        try:
+            repeat_len = int(spec.get('repeat_len', 2))
+            pattern_len = int(spec.get('pattern_len', 3))
+        except ValueError:
+            raise ValueError("重复次数和模式长度必须为整数")
+        if repeat_len <= 0:
+            raise ValueError("重复次数必须为正整数")
+        if pattern_len <= 0:
+            raise ValueError("模式长度必须为正整数")
+        charset = spec.get('custom_charset')
+        if not charset:
+            raise ValueError("高级生成下必须提供自定义字符集")
+        if len(charset) < pattern_len:
+            raise ValueError(f"自定义字符集长度({len(charset)})小于模式长度({pattern_len})")
+        settings['advanced_settings'] = {
+            "repeat_char": (repeat_len, pattern_len, charset, spec.get('pattern_type', "repeat"))
+        }
+        return settings
+
+    # 掩码或字符集+长度
+    mask = spec.get('mask')
+    if mask:
+        settings['parsed_mask'] = parse_hashcat_mask(mask)
+        if not settings['parsed_mask']:
+            raise ValueError("掩码不能为空")
+        return settings
+
+    charset = spec.get('charset') or ""
+    if spec.get('include_special'):
+        charset = "".join(sorted(set(charset + HASHCAT_CHARSETS['s'])))
+    if not charset:
+        raise ValueError("未使用掩码时，基础字符集不能为空")
+    try:
+        min_len = int(spec.get('min_len', 1))
+        max_len = int(spec.get('max_len', 8))
+    except ValueError:
+        raise ValueError("最小长度和最大长度必须为整数")
+    if min_len <= 0:
+        raise ValueError("最小长度必须为正整数")
+    if max_len < min_len:
+        raise ValueError("最大长度必须大于或等于最小长度")
+    settings['charset'] = charset
+    settings['length_range'] = (min_len, max_len)
+    return settings
+
+
+def generate(spec, batch_size=GENERATION_BATCH_SIZE, stop_event=None, log=default_log,
+             skip=0, limit=None):
+    """库接口：按 spec 生成候选，返回 bytes 数据块迭代器
+
+    每个数据块由最多 batch_size 个候选以换行拼接而成（末尾带换行），
+    可直接写入文件或套接字。spec 的格式见 prepare_generation。
+    skip/limit 跳过前 skip 个候选并最多产出 limit 个。
+
+        for block in generate({'mask': '?d?d?d'}):
+            sock.sendall(block)
+    """
+    settings = prepare_generation(spec, stop_event, log)
+    stop = None if limit is None else skip + limit
+    for block, _count in combination_batches(batch_size=batch_size, stop_event=stop_event,
+                                             log=log, start=skip, stop=stop, **settings):
+        yield block
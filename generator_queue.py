@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字符组合生成器 - 共享目录任务队列
+把一个任务的序号空间切成许多小块，任意数量的进程或机器通过共享目录
+（本地磁盘或NFS）领取、生成并登记完成，无需任何外部服务。
+
+目录结构:
+    job.json                任务描述（生成参数、总组合数、块大小）
+    pending/NNNNNNNN        待领取的块
+    claimed/NNNNNNNN        已领取的块，内容为领取者，修改时间即租约心跳
+    done/NNNNNNNN.json      完成记录
+    output/<名称>.chunkNNNNNNNN<扩展名>   每块的输出，按块号顺序拼接即为完整输出
+
+领取通过把 pending/NNNNNNNN 重命名到 claimed/ 完成，rename 是原子操作，
+同一块只有一个进程能成功；租约超时的块会被其它进程改名回 pending/ 重新领取。
+"""
+
+import json
+import os
+import socket
+import time
+
+import generator_core
+from generator_core import GENERATION_BATCH_SIZE, _is_stopped, default_log, write_json_atomic
+
+QUEUE_CHUNK_SIZE = 10000000  # 每块的候选数
+LEASE_TIMEOUT = 300  # 租约超时（秒），超时未心跳的块会被重新领取
+HEARTBEAT_INTERVAL = 30  # 生成过程中刷新租约的间隔（秒）
+POLL_INTERVAL = 5  # 其它节点仍在处理时的等待间隔（秒）
+
+
+def _chunk_name(chunk_index):
+    return f"{chunk_index:08d}"
+
+
+def _queue_paths(queue_dir):
+    return {
+        'job': os.path.join(queue_dir, "job.json"),
+        'pending': os.path.join(queue_dir, "pending"),
+        'claimed': os.path.join(queue_dir, "claimed"),
+        'done': os.path.join(queue_dir, "done"),
+        'output': os.path.join(queue_dir, "output"),
+    }
+
+
+def default_worker_id():
+    """主机名:进程号，用于标识领取者"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def init_queue(queue_dir, spec, chunk_size=QUEUE_CHUNK_SIZE, output_name="combinations.txt",
+               log=default_log):
+    """按生成参数创建任务队列，返回任务描述
+
+    job.json 已存在时抛出 FileExistsError，避免覆盖正在运行的任务。
+    """
+    paths = _queue_paths(queue_dir)
+    if os.path.exists(paths['job']):
+        raise FileExistsError(f"任务队列已存在: {paths['job']}")
+    settings = generator_core.prepare_generation(spec, log=log)
+    total = generator_core.settings_total(settings)
+    chunks = (total + chunk_size - 1) // chunk_size
+
+    for key in ('pending', 'claimed', 'done', 'output'):
+        os.makedirs(paths[key], exist_ok=True)
+    for chunk_index in range(chunks):
+        open(os.path.join(paths['pending'], _chunk_name(chunk_index)), 'wb').close()
+
+    job = {
+        'spec': spec,
+        'total': total,
+        'chunk_size': chunk_size,
+        'chunks': chunks,
+        'output_name': os.path.basename(output_name),
+        'created': time.time(),
+    }
+    # job.json 最后写入：workers 只在它存在后才开始领取
+    write_json_atomic(paths['job'], job)
+    log(f"任务队列已创建: {queue_dir}，共 {total} 个候选，{chunks} 块")
+    return job
+
+
+def load_job(queue_dir):
+    """读取任务描述"""
+    with open(_queue_paths(queue_dir)['job'], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def chunk_output_path(queue_dir, job, chunk_index):
+    """块的输出文件路径"""
+    file_name, file_ext = os.path.splitext(job['output_name'])
+    return os.path.join(_queue_paths(queue_dir)['output'],
+                        f"{file_name}.chunk{_chunk_name(chunk_index)}{file_ext}")
+
+
+def claim_chunk(queue_dir, worker_id):
+    """原子地领取一个待处理块，返回块号；没有可领取的块时返回 None"""
+    paths = _queue_paths(queue_dir)
+    for name in sorted(os.listdir(paths['pending'])):
+        pending_path = os.path.join(paths['pending'], name)
+        claimed_path = os.path.join(paths['claimed'], name)
+        try:
+            # 先刷新修改时间，rename 会保留它，避免刚领取就被判定为租约超时
+            os.utime(pending_path)
+            os.rename(pending_path, claimed_path)
+        except FileNotFoundError:
+            continue  # 已被其它进程领取
+        if os.path.exists(os.path.join(paths['done'], name + ".json")):
+            # 超时放回后原领取者又完成了，不必重做
+            os.remove(claimed_path)
+            continue
+        with open(claimed_path, 'w', encoding='utf-8') as f:
+            f.write(worker_id)
+        return int(name)
+    return None
+
+
+def _is_owner(claimed_path, worker_id):
+    try:
+        with open(claimed_path, 'r', encoding='utf-8') as f:
+            return f.read() == worker_id
+    except FileNotFoundError:
+        return False
+
+
+def release_chunk(queue_dir, chunk_index, worker_id):
+    """放弃领取的块（例如被停止），放回待领取目录"""
+    paths = _queue_paths(queue_dir)
+    name = _chunk_name(chunk_index)
+    claimed_path = os.path.join(paths['claimed'], name)
+    if _is_owner(claimed_path, worker_id):
+        try:
+            os.rename(claimed_path, os.path.join(paths['pending'], name))
+        except FileNotFoundError:
+            pass
+
+
+def reclaim_expired(queue_dir, lease_timeout=LEASE_TIMEOUT, log=default_log):
+    """把租约超时的块放回待领取目录，返回放回的块数
+
+    已有完成记录的块（领取者完成后尚未清理就崩溃）直接清理，不再重做。
+    """
+    paths = _queue_paths(queue_dir)
+    now = time.time()
+    reclaimed = 0
+    for name in sorted(os.listdir(paths['claimed'])):
+        claimed_path = os.path.join(paths['claimed'], name)
+        try:
+            if now - os.path.getmtime(claimed_path) < lease_timeout:
+                continue
+            if os.path.exists(os.path.join(paths['done'], name + ".json")):
+                os.remove(claimed_path)
+                continue
+            os.rename(claimed_path, os.path.join(paths['pending'], name))
+        except FileNotFoundError:
+            continue  # 其它进程已处理
+        log(f"块 {name} 租约超时，已重新放回队列", "warning")
+        reclaimed += 1
+    return reclaimed
+
+
+def queue_status(queue_dir):
+    """返回各状态的块数"""
+    paths = _queue_paths(queue_dir)
+    return {
+        'pending': len(os.listdir(paths['pending'])),
+        'claimed': len(os.listdir(paths['claimed'])),
+        'done': sum(1 for name in os.listdir(paths['done']) if name.endswith(".json")),
+    }
+
+
+def process_chunk(queue_dir, job, settings, chunk_index, worker_id,
+                  batch_size=GENERATION_BATCH_SIZE, stop_event=None):
+    """生成一个块并登记完成，返回完成记录；被停止时返回 None
+
+    输出先写入临时文件再改名，重复处理（租约超时后原领取者仍完成）只会
+    用相同内容覆盖同一文件。
+    """
+    paths = _queue_paths(queue_dir)
+    name = _chunk_name(chunk_index)
+    claimed_path = os.path.join(paths['claimed'], name)
+    start = chunk_index * job['chunk_size']
+    stop = min(start + job['chunk_size'], job['total'])
+    output_path = chunk_output_path(queue_dir, job, chunk_index)
+    temp_path = f"{output_path}.{worker_id.replace(':', '_')}.tmp"
+
+    count = 0
+    size = 0
+    last_heartbeat = time.time()
+    with open(temp_path, 'wb') as f:
+        for block, block_count in generator_core.combination_batches(
+                batch_size=batch_size, stop_event=stop_event, log=generator_core._quiet_log,
+                start=start, stop=stop, **settings):
+            f.write(block)
+            count += block_count
+            size += len(block)
+            if time.time() - last_heartbeat >= HEARTBEAT_INTERVAL:
+                last_heartbeat = time.time()
+                try:
+                    os.utime(claimed_path)
+                except FileNotFoundError:
+                    pass
+    if _is_stopped(stop_event):
+        os.remove(temp_path)
+        return None
+    os.replace(temp_path, output_path)
+
+    record = {
+        'chunk': chunk_index,
+        'start': start,
+        'stop': stop,
+        'count': count,
+        'bytes': size,
+        'path': os.path.relpath(output_path, queue_dir),
+        'worker': worker_id,
+        'finished': time.time(),
+    }
+    write_json_atomic(os.path.join(paths['done'], name + ".json"), record)
+    if _is_owner(claimed_path, worker_id):
+        try:
+            os.remove(claimed_path)
+        except FileNotFoundError:
+            pass
+    return record
+
+
+def run_worker(queue_dir, worker_id=None, lease_timeout=LEASE_TIMEOUT,
+               batch_size=GENERATION_BATCH_SIZE, stop_event=None, log=default_log):
+    """持续领取并处理块，直到全部完成或被停止，返回本进程完成的块数
+
+    没有待领取的块但仍有块在其它节点处理时，定期检查租约，
+    接手崩溃节点的块。
+    """
+    worker_id = worker_id or default_worker_id()
+    job = load_job(queue_dir)
+    settings = generator_core.prepare_generation(job['spec'], stop_event, log)
+    if generator_core.settings_total(settings) != job['total']:
+        raise ValueError("本节点计算的总组合数与任务不一致，请检查字典文件是否相同")
+    log(f"节点 {worker_id} 开始处理队列: {queue_dir}")
+
+    completed = 0
+    while not _is_stopped(stop_event):
+        chunk_index = claim_chunk(queue_dir, worker_id)
+        if chunk_index is None:
+            if reclaim_expired(queue_dir, lease_timeout, log):
+                continue
+            status = queue_status(queue_dir)
+            if not status['claimed']:
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+        try:
+            record = process_chunk(queue_dir, job, settings, chunk_index, worker_id,
+                                   batch_size, stop_event)
+        except BaseException:
+            release_chunk(queue_dir, chunk_index, worker_id)
+            raise
+        if record is None:
+            release_chunk(queue_dir, chunk_index, worker_id)
+            break
+        completed += 1
+        status = queue_status(queue_dir)
+        log(f"块 {chunk_index} 完成（{record['count']} 个候选），"
+            f"队列进度: {status['done']}/{job['chunks']}")
+    log(f"节点 {worker_id} 结束，本节点完成 {completed} 块")
+    return completed
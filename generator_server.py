@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字符组合生成器 - 本地候选服务
+在 Unix 域套接字或本机 TCP 端口上运行一个生成任务，把候选数据块分发给任意数量的
+消费者：每块只交给一个消费者，消费者断开或超时未确认的块重新放回队列。
+
+协议（每条命令一行）:
+    GET                     领取一块
+    BLOCK id 起点 候选数 字节数\\n<数据>   服务端返回的数据块
+    WAIT                    暂无可领取的块（其它消费者持有未确认的块），稍后重试
+    DONE                    全部完成
+    ACK id                  确认已处理完该块
+
+地址格式: unix:/路径 或含 / 的路径为 Unix 域套接字；端口 或 主机:端口 为 TCP（默认 127.0.0.1）。
+"""
+
+import heapq
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+from collections import deque
+
+from generator_core import _is_stopped, default_log
+
+SERVER_PREFETCH_BLOCKS = 16  # 预先生成等待领取的块数
+BLOCK_LEASE_TIMEOUT = 300  # 已领取未确认的块超过此时间（秒）重新放回队列
+CLIENT_RETRY_INTERVAL = 0.5  # 收到 WAIT 后的重试间隔（秒）
+STATUS_INTERVAL = 10  # 服务端记录进度的间隔（秒）
+DONE_GRACE_PERIOD = 4 * CLIENT_RETRY_INTERVAL  # 全部完成后继续应答的时间，使等待中的消费者收到 DONE
+
+_DONE = object()
+
+
+def parse_address(text):
+    """解析地址，返回 (socket 协议族, 地址)"""
+    if text.startswith("unix:"):
+        return socket.AF_UNIX, text[len("unix:"):]
+    if "/" in text:
+        return socket.AF_UNIX, text
+    host, _sep, port = text.rpartition(":")
+    try:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    except ValueError:
+        raise ValueError(f"无效的服务地址: {text}") from None
+
+
+class CandidateDispatcher:
+    """数据块分发状态：生成线程预取、已领取未确认的块、确认进度
+
+    cursor 为连续确认的序号终点：其之前的候选都已被确认处理，
+    服务中断后可用 --skip cursor 继续。
+    """
+
+    def __init__(self, batches, start=0, lease_timeout=BLOCK_LEASE_TIMEOUT,
+                 prefetch=SERVER_PREFETCH_BLOCKS, stop_event=None):
+        self.lease_timeout = lease_timeout
+        self.stop_event = stop_event
+        self.cursor = start
+        self.acked = 0
+        self._ready = queue.Queue(maxsize=prefetch)
+        self._requeue = deque()
+        self._inflight = {}
+        self._acked_ranges = []
+        self._exhausted = False
+        self._lock = threading.Lock()
+        self._producer = threading.Thread(target=self._produce, args=(batches, start), daemon=True)
+        self._producer.start()
+
+    def _produce(self, batches, start):
+        block_id = 0
+        try:
+            for block, count in batches:
+                if _is_stopped(self.stop_event):
+                    break
+                self._ready.put((block_id, start, count, block))
+                block_id += 1
+                start += count
+        finally:
+            self._ready.put(None)
+
+    def take(self, owner):
+        """领取一块，返回 (id, 起点, 候选数, 数据)；暂无可领取时返回 None，全部完成时返回 _DONE"""
+        with self._lock:
+            item = self._requeue.popleft() if self._requeue else None
+        if item is None and not self._exhausted:
+            try:
+                item = self._ready.get(timeout=1)
+            except queue.Empty:
+                return None
+            if item is None:
+                self._exhausted = True
+                self._ready.put(None)  # 让其它等待中的连接也看到结束
+        if item is None:
+            with self._lock:
+                return _DONE if self.finished else None
+        with self._lock:
+            self._inflight[item[0]] = (item, owner, time.monotonic())
+        return item
+
+    def ack(self, block_id, owner):
+        """确认已处理的块，推进连续确认的游标"""
+        with self._lock:
+            entry = self._inflight.get(block_id)
+            if entry is None or entry[1] != owner:
+                return False
+            del self._inflight[block_id]
+            _block_id, start, count, _block = entry[0]
+            self.acked += count
+            heapq.heappush(self._acked_ranges, (start, start + count))
+            while self._acked_ranges and self._acked_ranges[0][0] == self.cursor:
+                self.cursor = heapq.heappop(self._acked_ranges)[1]
+            return True
+
+    def release(self, owner):
+        """消费者断开：把它未确认的块放回队列，返回放回的块数"""
+        with self._lock:
+            blocks = [block_id for block_id, entry in self._inflight.items() if entry[1] == owner]
+            for block_id in sorted(blocks):
+                self._requeue.append(self._inflight.pop(block_id)[0])
+            return len(blocks)
+
+    def expire(self):
+        """把超时未确认的块放回队列，返回放回的块数"""
+        now = time.monotonic()
+        with self._lock:
+            blocks = [block_id for block_id, entry in self._inflight.items()
+                      if now - entry[2] >= self.lease_timeout]
+            for block_id in sorted(blocks):
+                self._requeue.append(self._inflight.pop(block_id)[0])
+            return len(blocks)
+
+    @property
+    def inflight(self):
+        with self._lock:
+            return len(self._inflight)
+
+    @property
+    def finished(self):
+        """生成结束且所有块都已确认"""
+        return self._exhausted and not self._inflight and not self._requeue
+
+
+class _CandidateHandler(socketserver.StreamRequestHandler):
+    """一个消费者连接"""
+
+    def handle(self):
+        dispatcher = self.server.dispatcher
+        owner = object()
+        try:
+            for line in self.rfile:
+                command = line.split()
+                if not command:
+                    continue
+                if command[0] == b"GET":
+                    item = dispatcher.take(owner)
+                    if item is _DONE:
+                        self.wfile.write(b"DONE\n")
+                    elif item is None:
+                        self.wfile.write(b"WAIT\n")
+                    else:
+                        block_id, start, count, block = item
+                        self.wfile.write(b"BLOCK %d %d %d %d\n" % (block_id, start, count, len(block)))
+                        self.wfile.write(block)
+                    self.wfile.flush()
+                elif command[0] == b"ACK" and len(command) == 2:
+                    dispatcher.ack(int(command[1]), owner)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            released = dispatcher.release(owner)
+            if released:
+                self.server.log(f"消费者断开，{released} 个未确认的块已重新放回队列", "warning")
+
+
+class _UnixCandidateServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPCandidateServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(address, batches, start=0, lease_timeout=BLOCK_LEASE_TIMEOUT, stop_event=None,
+          log=default_log):
+    """在 address 上分发 batches 的数据块，直到全部被确认或被停止，返回连续确认的游标"""
+    family, bind_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            if not stat.S_ISSOCK(os.stat(bind_address).st_mode):
+                raise FileExistsError(f"服务地址已存在且不是套接字: {bind_address}")
+            os.remove(bind_address)  # 上次运行残留的套接字文件
+        server = _UnixCandidateServer(bind_address, _CandidateHandler)
+    else:
+        server = _TCPCandidateServer(bind_address, _CandidateHandler)
+    dispatcher = CandidateDispatcher(batches, start, lease_timeout, stop_event=stop_event)
+    server.dispatcher = dispatcher
+    server.log = log
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    log(f"候选服务已启动: {address}")
+
+    last_status = time.monotonic()
+    try:
+        while not dispatcher.finished and not _is_stopped(stop_event):
+            time.sleep(0.2)
+            expired = dispatcher.expire()
+            if expired:
+                log(f"{expired} 个块超时未确认，已重新放回队列", "warning")
+            if time.monotonic() - last_status >= STATUS_INTERVAL:
+                last_status = time.monotonic()
+                log(f"已确认 {dispatcher.acked} 个候选，处理中 {dispatcher.inflight} 块")
+        if dispatcher.finished:
+            time.sleep(DONE_GRACE_PERIOD)
+    finally:
+        server.shutdown()
+        server.server_close()
+        if family == socket.AF_UNIX:
+            try:
+                os.remove(bind_address)
+            except OSError:
+                pass
+        if dispatcher.finished:
+            log(f"全部候选已分发并确认，共 {dispatcher.acked} 个")
+        else:
+            log(f"服务已停止，序号 {dispatcher.cursor} 之前的候选均已确认，"
+                f"可用 --skip {dispatcher.cursor} 继续", "warning")
+    return dispatcher.cursor
+
+
+def consume(address, handle, stop_event=None, log=default_log):
+    """消费者：循环领取数据块交给 handle(数据)，处理完成后确认，返回处理的候选数"""
+    family, connect_address = parse_address(address)
+    total = 0
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(connect_address)
+        stream = sock.makefile('rwb')
+        while not _is_stopped(stop_event):
+            stream.write(b"GET\n")
+            stream.flush()
+            header = stream.readline().split()
+            if not header or header[0] == b"DONE":
+                break
+            if header[0] == b"WAIT":
+                time.sleep(CLIENT_RETRY_INTERVAL)
+                continue
+            block_id, _start, count, size = (int(value) for value in header[1:5])
+            data = stream.read(size)
+            if len(data) != size:
+                raise ConnectionError("服务端连接中断")
+            handle(data)
+            total += count
+            # 确认随下一次领取一起发送，停止时在关闭连接前发送
+            stream.write(b"ACK %d\n" % block_id)
+        stream.flush()
+    log(f"消费者完成，共处理 {total} 个候选")
+    return total
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字符组合生成器 - 输出校验
+按分割文件清单（输出文件.manifest.jsonl）或一组分割文件，多进程并行把每个文件读一遍：
+用 mmap 和 bytes.count 统计候选数、计算校验值、检查文件末尾是否被截断；之后核对
+各文件的序号区间是否首尾相接、总数是否与生成参数的组合数一致，并在序号空间中随机
+抽取若干位置，与生成器在同一序号处产出的候选逐个比对。
+
+只给出分割文件时按文件名中的分割序号（out_N.txt 中的 N，没有序号的为第 1 个）排序，
+序号区间按各文件的候选数依次累加。
+"""
+
+import gzip
+import mmap
+import multiprocessing
+import os
+import random
+import re
+import zlib
+from collections import deque
+
+import generator_core
+from generator_core import default_log
+
+VERIFY_CHUNK_SIZE = 64 * 1024 * 1024  # 每次统计的数据量，块在换行处结束
+VERIFY_SAMPLES = 16  # 随机抽查的候选数
+VERIFY_REPORT_LIMIT = 10  # 抽查不一致时逐个列出的数量
+LINE_SEARCH_STEP = 1024 * 1024  # 在数据块中定位某一行时按此步长先统计换行数
+
+
+def _plain_chunks(path):
+    """按换行边界切分的文件内容（mmap），产出 (数据块, 原始字节)"""
+    size = os.path.getsize(path)
+    if not size:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = 0
+        while position < size:
+            end = mm.find(b'\n', min(position + VERIFY_CHUNK_SIZE, size) - 1) + 1 or size
+            chunk = mm[position:end]
+            yield chunk, chunk
+            position = end
+
+
+def _gzip_chunks(path):
+    """按换行边界切分的解压内容，压缩数据另行计算校验值，产出 (数据块, None)"""
+    with gzip.open(path, 'rb') as f:
+        while True:
+            chunk = f.read(VERIFY_CHUNK_SIZE)
+            if not chunk:
+                return
+            if not chunk.endswith(b'\n'):
+                chunk += f.readline()
+            yield chunk, None
+
+
+def _line_at(chunk, k):
+    """以换行结尾的数据块中第 k 行（0 起）的内容，不含换行"""
+    position = 0
+    if k:
+        # 先按步长统计换行数跳过整段，再在所在的段内逐行查找
+        while True:
+            count = chunk.count(b'\n', position, position + LINE_SEARCH_STEP)
+            if count >= k:
+                break
+            k -= count
+            position += LINE_SEARCH_STEP
+        for _ in range(k):
+            position = chunk.index(b'\n', position) + 1
+    end = chunk.find(b'\n', position)
+    return chunk[position:] if end < 0 else chunk[position:end]
+
+
+def scan_part(path, algorithm=None, lines=()):
+    """把一个分割文件读一遍，返回统计结果
+
+    结果为 {'path', 'bytes', 'lines', 'checksum', 'samples', 'error'}：lines 为换行数，
+    checksum 为 "算法:十六进制"（algorithm 为 None 或 none 时为 None），samples 为
+    {行号: 内容}，取出参数 lines 中各行（文件内 0 起的行号）。.gz 文件统计解压后的
+    内容，校验值按压缩数据计算，与清单一致。文件末尾不是完整的一行或 gzip 数据
+    不完整时 error 说明原因；文件无法读取时 bytes 为 None。
+    """
+    result = {'path': path, 'bytes': 0, 'lines': 0, 'checksum': None, 'samples': {}, 'error': None}
+    wanted = deque(sorted(set(lines)))
+    checksum = generator_core.new_checksum(algorithm) if algorithm else None
+    try:
+        result['bytes'] = os.path.getsize(path)
+        compressed = path.endswith('.gz')
+        if compressed and checksum is not None:
+            generator_core.hash_file(path, checksum)
+        last = b'\n'
+        for chunk, raw in (_gzip_chunks if compressed else _plain_chunks)(path):
+            if raw is not None and checksum is not None:
+                checksum.update(raw)
+            count = chunk.count(b'\n')
+            while wanted and wanted[0] < result['lines'] + count + (not chunk.endswith(b'\n')):
+                line = wanted.popleft()
+                result['samples'][line] = _line_at(chunk, line - result['lines'])
+            result['lines'] += count
+            last = chunk[-1:]
+        if last != b'\n':
+            result['error'] = "文件末尾不是完整的一行，可能被截断"
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        result['error'] = f"gzip 数据不完整或已损坏: {e}"
+    except (OSError, ValueError) as e:
+        result['bytes'] = None
+        result['error'] = f"无法读取: {e}"
+        return result
+    if checksum is not None:
+        result['checksum'] = f"{algorithm}:{checksum.hexdigest()}"
+    return result
+
+
+def _scan_task(task):
+    """进程池任务"""
+    return scan_part(*task)
+
+
+def part_number(path):
+    """文件名中的分割序号：out_N.txt 为 N，没有序号的为 1"""
+    name = os.path.basename(path)
+    for suffix in (generator_core.PART_TEMP_SUFFIX, '.gz'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    match = re.search(r'_(\d+)(\.[^._]*)?$', name)
+    return int(match.group(1)) if match else 1
+
+
+def load_parts(sources):
+    """校验对象：一个清单文件，或一组分割文件；返回 (任务汇总或 None, 记录列表)
+
+    分割文件没有记录时只有 part 和 path，按分割序号排序。
+    """
+    if len(sources) == 1 and sources[0].endswith('.manifest.jsonl'):
+        if not os.path.exists(sources[0]):
+            raise ValueError(f"清单文件不存在: {sources[0]}")
+        job, records = generator_core.load_manifest(sources[0])
+        if not records:
+            raise ValueError(f"清单中没有分割文件: {sources[0]}")
+        return job, [record for _part, record in sorted(records.items())]
+    paths = sorted(sources, key=part_number)
+    numbers = [part_number(path) for path in paths]
+    if len(set(numbers)) != len(numbers):
+        raise ValueError("分割文件的序号有重复，请分别校验不同任务的输出")
+    return None, [{'part': number, 'path': path} for number, path in zip(numbers, paths)]
+
+
+def _checksum_algorithm(records):
+    """清单记录使用的校验算法，没有记录校验值时为 None"""
+    for record in records:
+        if record.get('checksum'):
+            return record['checksum'].split(':', 1)[0]
+    return None
+
+
+def _sample_lines(records, positions):
+    """把全局序号映射到各文件：返回 {记录下标: {文件内行号: 全局序号}}"""
+    plan = {}
+    for position in positions:
+        for i, record in enumerate(records):
+            if record['first'] <= position < record['first'] + record['count']:
+                plan.setdefault(i, {})[position - record['first']] = position
+                break
+    return plan
+
+
+def _scan_all(tasks, workers):
+    """并行扫描，按提交顺序产出结果"""
+    if workers <= 1 or len(tasks) <= 1:
+        yield from map(_scan_task, tasks)
+        return
+    pool = multiprocessing.Pool(processes=min(workers, len(tasks)))
+    try:
+        yield from pool.imap(_scan_task, tasks)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def verify_output(sources, settings=None, start=0, stop=None, workers=None, samples=VERIFY_SAMPLES,
+                  seed=None, log=default_log):
+    """校验生成的输出，返回报告 {'parts', 'lines', 'bytes', 'sampled', 'problems'}
+
+    sources 为一个清单文件或一组分割文件；settings 为生成这些输出的参数时核对总数
+    （序号 [start, stop)，stop 为 None 表示到组合数为止），可随机访问的模式下再随机
+    抽查 samples 个位置。workers 个进程并行读取各文件。problems 为发现的问题列表，
+    为空表示校验通过。
+    """
+    workers = workers or os.cpu_count() or 1
+    job, records = load_parts(sources)
+    problems = []
+    algorithm = _checksum_algorithm(records)
+    expected_total = None
+    if settings is not None:
+        total = generator_core.settings_total(settings)
+        stop = total if stop is None else min(stop, total)
+        expected_total = stop - start
+    elif job is not None:
+        start, expected_total = job['first'], job['count']
+    elif records and 'first' in records[0]:
+        start = records[0]['first']
+    indexable = settings is not None and generator_core.is_indexable(settings) and samples > 0
+    rng = random.Random(seed)
+
+    # 清单给出了各文件的序号区间时，抽查的行在同一次读取中取出
+    plan = {}
+    positions = []
+    known_ranges = all('first' in record for record in records)
+    if indexable and known_ranges:
+        end = min(max(record['first'] + record['count'] for record in records), stop)
+        positions = sorted(rng.randrange(start, end) for _ in range(samples)) if end > start else []
+        plan = _sample_lines(records, positions)
+    log(f"校验 {len(records)} 个文件（{min(workers, len(records))} 个进程）"
+        + (f"，校验算法 {algorithm}" if algorithm else ""))
+
+    tasks = [(record['path'], algorithm, tuple(plan.get(i, {}))) for i, record in enumerate(records)]
+    results = []
+    first = start
+    for record, result in zip(records, _scan_all(tasks, workers)):
+        results.append(result)
+        name = record['path']
+        if result['error']:
+            problems.append(f"{name}: {result['error']}")
+        if result['bytes'] is None:
+            # 无法读取的文件不再逐项比较，序号区间按清单记录（没有清单时无法确定）继续
+            first = record['first'] + record['count'] if 'count' in record else first
+            record.setdefault('first', first)
+            record.setdefault('count', 0)
+            continue
+        if 'count' in record:
+            if result['lines'] != record['count']:
+                problems.append(f"{name}: 候选数 {result['lines']}，清单记录 {record['count']}")
+            if result['bytes'] != record['bytes']:
+                problems.append(f"{name}: 大小 {result['bytes']} 字节，清单记录 {record['bytes']} 字节")
+            if record.get('checksum') and result['checksum'] != record['checksum']:
+                problems.append(f"{name}: 校验值不一致")
+            if record['first'] != first:
+                problems.append(f"{name}: 首个候选序号 {record['first']}，应为 {first}（与上一个文件不相接）")
+            first = record['first'] + record['count']
+        else:
+            record.update(first=first, count=result['lines'])
+            first += result['lines']
+        log(f"{name}: {result['lines']} 个候选，{generator_core.format_size(result['bytes'])}")
+
+    numbers = [record['part'] for record in records]
+    missing = sorted(set(range(1, max(numbers) + 1)) - set(numbers))
+    if missing:
+        problems.append(f"缺少第 {', '.join(map(str, missing[:10]))}{' 等' if len(missing) > 10 else ''} 个分割文件")
+    lines = sum(result['lines'] for result in results)
+    if expected_total is not None and lines != expected_total:
+        problems.append(f"候选总数 {lines}，应为 {expected_total}")
+
+    # 只给出分割文件时，序号区间在统计后才知道，抽查的行再读一遍所在的文件；
+    # 缺少分割文件时之后各文件的序号无法确定，不抽查
+    if indexable and missing and not known_ranges:
+        log("缺少分割文件，无法确定之后各文件的序号区间，跳过抽查", "warning")
+    elif indexable and not known_ranges and lines:
+        end = min(start + lines, stop)
+        positions = sorted(rng.randrange(start, end) for _ in range(samples)) if end > start else []
+        plan = _sample_lines(records, positions)
+        tasks = [(records[i]['path'], None, tuple(lines_in_part)) for i, lines_in_part in sorted(plan.items())]
+        for i, result in zip(sorted(plan), _scan_all(tasks, workers)):
+            results[i]['samples'] = result['samples']
+
+    sampled = mismatched = 0
+    for i, lines_in_part in sorted(plan.items()):
+        for line, position in sorted(lines_in_part.items()):
+            found = results[i]['samples'].get(line)
+            if found is None:
+                continue
+            expected = generator_core._range_block(settings, position, position + 1, 1)[0].rstrip(b'\n')
+            sampled += 1
+            if found != expected:
+                mismatched += 1
+                if mismatched <= VERIFY_REPORT_LIMIT:
+                    problems.append(f"{records[i]['path']}: 第 {position} 个候选为 {found!r}，"
+                                    f"生成器给出 {expected!r}")
+    if mismatched > VERIFY_REPORT_LIMIT:
+        problems.append(f"抽查的 {sampled} 个候选中共 {mismatched} 个与生成器不一致")
+    if indexable:
+        log(f"随机抽查 {sampled} 个候选")
+
+    return {
+        'parts': len(records),
+        'lines': lines,
+        'bytes': sum(result['bytes'] or 0 for result in results),
+        'sampled': sampled,
+        'problems': problems,
+    }
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""可定位压缩格式：按 .idx 索引直接定位到任意候选序号，只解压覆盖的成员"""
+
+import gzip
+import io
+import itertools
+import sys
+
+import pytest
+
+import generator_cli
+import generator_core
+
+LINES = [''.join(combo).encode() + b"\n" for combo in itertools.product(
+    "abcdefghijklmnopqrstuvwxyz", "0123456789", "0123456789")]
+
+
+@pytest.fixture(autouse=True)
+def small_members(monkeypatch):
+    monkeypatch.setattr(generator_core, "COMPRESSION_BLOCK_SIZE", 1000)
+
+
+def _run(*args):
+    assert generator_cli.main(["--mask", "?l?d?d", "--batch-size", "50", "--no-space-check", "-q",
+                               "--seekable-index", *args]) == 0
+
+
+def _read(path, start=None, stop=None):
+    return b"".join(generator_core.read_candidates(str(path), start, stop))
+
+
+def test_index_matches_members(tmp_path):
+    path = tmp_path / "out.txt.gz"
+    _run("-o", str(path))
+    index = generator_core.BlockIndex.load(str(path))
+    assert (index.first_candidate, index.candidates) == (0, len(LINES))
+    assert index.uncompressed_size == len(b"".join(LINES))
+    data = path.read_bytes()
+    assert index.blocks[0][0] == 0
+    assert index.blocks[-1][0] + index.blocks[-1][1] == len(data)
+    for offset, length, raw_offset, size, first, count in index.blocks:
+        member = gzip.decompress(data[offset:offset + length])
+        assert len(member) == size
+        assert member == b"".join(LINES[first:first + count])
+        assert raw_offset == sum(len(line) for line in LINES[:first])
+
+
+@pytest.mark.parametrize("candidate", [0, 1, 249, 250, 251, 1337, 2599])
+def test_seek_to_candidate(tmp_path, candidate):
+    path = tmp_path / "out.txt.gz"
+    _run("-o", str(path))
+    index = generator_core.BlockIndex.load(str(path))
+    offset, length, _raw_offset, _size, first, count = index.blocks[index.find(candidate)]
+    assert first <= candidate < first + count
+    with open(path, "rb") as f:
+        f.seek(offset)
+        member = gzip.decompress(f.read(length))
+    assert member.split(b"\n")[candidate - first] + b"\n" == LINES[candidate]
+    assert _read(path, candidate, candidate + 1) == LINES[candidate]
+
+
+@pytest.mark.parametrize("start, stop", [(None, None), (0, 1), (3, 17), (240, 260), (999, 2600), (2599, 5000)])
+def test_read_ranges(tmp_path, start, stop):
+    path = tmp_path / "out.txt.gz"
+    _run("-o", str(path))
+    assert _read(path, start, stop) == b"".join(LINES[start:stop])
+
+
+def test_out_of_range(tmp_path):
+    path = tmp_path / "out.txt.gz"
+    _run("-o", str(path))
+    index = generator_core.BlockIndex.load(str(path))
+    with pytest.raises(IndexError):
+        index.find(len(LINES))
+    assert _read(path, 3000, 4000) == b""
+
+
+def test_split_parts_use_global_candidate_numbers(tmp_path):
+    _run("--split-size", "700", "-o", str(tmp_path / "out.txt.gz"))
+    for index, name in enumerate(["out.txt.gz", "out.txt_2.gz", "out.txt_3.gz", "out.txt_4.gz"]):
+        path = tmp_path / name
+        first = index * 700
+        assert generator_core.BlockIndex.load(str(path)).first_candidate == first
+        assert _read(path, first + 5, first + 42) == b"".join(LINES[first + 5:first + 42])
+        assert _read(path) == b"".join(LINES[first:first + 700])
+
+
+def test_index_split_covers_file(tmp_path):
+    path = tmp_path / "out.txt.gz"
+    _run("-o", str(path))
+    index = generator_core.BlockIndex.load(str(path))
+    ranges = index.split(4)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(LINES)
+    assert all(ranges[i][1] == ranges[i + 1][0] for i in range(3))
+    assert b"".join(_read(path, start, stop) for start, stop in ranges) == b"".join(LINES)
+
+
+def test_recompress_parts_write_index(tmp_path):
+    _run("--split-size", "700", "--recompress-parts", "-o", str(tmp_path / "out.txt"))
+    path = tmp_path / "out_2.txt.gz"
+    assert generator_core.BlockIndex.load(str(path)).first_candidate == 700
+    assert _read(path, 900, 1000) == b"".join(LINES[900:1000])
+
+
+def test_cli_read_shards(tmp_path, monkeypatch):
+    path = tmp_path / "out.txt.gz"
+    _run("-o", str(path))
+    output = b""
+    for shard in ("1/3", "2/3", "3/3"):
+        stdout = io.TextIOWrapper(io.BytesIO())
+        monkeypatch.setattr(sys, "stdout", stdout)
+        assert generator_cli.main(["--read", str(path), "--shard", shard, "-q"]) == 0
+        output += stdout.buffer.getvalue()
+    assert output == b"".join(LINES)
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, "stdout", stdout)
+    assert generator_cli.main(["--read", str(path), "-s", "1234", "-l", "3", "-q"]) == 0
+    assert stdout.buffer.getvalue() == b"".join(LINES[1234:1237])
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""自定义字典组合的元素拆分：与原界面一致，逗号之间的空项保留为空字符串元素"""
+
+import itertools
+
+import pytest
+
+import generator_core
+
+
+def _quiet(*_args):
+    pass
+
+
+def _spec(mode, chars="a,,bc", length=2):
+    return {'custom_dict': True, 'custom_chars': chars, 'custom_dict_mode': mode, 'custom_dict_length': length}
+
+
+def test_tokens_keep_empty_items():
+    assert generator_core.custom_dict_tokens("a,, bc ,") == ["a", "", "bc", ""]
+
+
+@pytest.mark.parametrize("mode", ["combination", "permutation", "permutation2"])
+def test_empty_token_candidates_and_total(mode):
+    tokens = ["a", "", "bc"]
+    if mode == "combination":
+        combos = itertools.product(tokens, repeat=2)
+    else:
+        combos = itertools.permutations(tokens, 2)
+    expected = [("-" if mode == "permutation2" else "").join(combo) for combo in combos]
+    spec = _spec(mode)
+    lines = b"".join(generator_core.generate(spec, log=_quiet)).decode().split("\n")[:-1]
+    assert lines == expected
+    settings = generator_core.prepare_generation(spec, log=_quiet)
+    assert generator_core.settings_total(settings) == len(expected)
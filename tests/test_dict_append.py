@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""字典追加模式（--dict-pos append_before/append_after）的生成结果与总组合数"""
+
+import pytest
+
+import generator_cli
+import generator_core
+
+
+def _quiet(*_args):
+    pass
+
+
+@pytest.fixture
+def dict_file(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("x\ny\nz\n", encoding="utf-8")
+    return str(path)
+
+
+def _run(tmp_path, *args):
+    output = tmp_path / "out.txt"
+    assert generator_cli.main([*args, "-o", str(output)]) == 0
+    return output.read_text(encoding="utf-8").splitlines()
+
+
+def _split(lines, dict_pos, base_count):
+    """把输出拆成 (字典部分, 基础候选部分)；字典条目的顺序不作要求"""
+    if dict_pos == "append_before":
+        return sorted(lines[:-base_count]), lines[-base_count:]
+    return sorted(lines[base_count:]), lines[:base_count]
+
+
+@pytest.mark.parametrize("dict_pos", ["append_before", "append_after"])
+def test_append_to_mask(tmp_path, dict_file, dict_pos):
+    lines = _run(tmp_path, "--dict-a", dict_file, "--mask", "?d", "--dict-pos", dict_pos)
+    assert _split(lines, dict_pos, 10) == (["x", "y", "z"], list("0123456789"))
+
+
+@pytest.mark.parametrize("dict_pos", ["append_before", "append_after"])
+def test_append_to_charset(tmp_path, dict_file, dict_pos):
+    lines = _run(tmp_path, "--dict-a", dict_file, "--charset", "ab", "--min-len", "1", "--max-len", "1",
+                 "--dict-pos", dict_pos)
+    assert _split(lines, dict_pos, 2) == (["x", "y", "z"], ["a", "b"])
+
+
+def test_pure_dict_without_position(tmp_path, dict_file):
+    assert sorted(_run(tmp_path, "--dict-a", dict_file, "--mask", "?d")) == ["x", "y", "z"]
+
+
+@pytest.mark.parametrize("dict_pos", ["append_before", "append_after"])
+def test_append_total_counts_dictionary_entries(dict_file, dict_pos):
+    # 与原界面不同，追加模式的总组合数包含字典条目本身，与实际输出的行数一致
+    settings = generator_core.prepare_generation({'dict_file': dict_file, 'mask': '?d', 'dict_pos': dict_pos},
+                                                 log=_quiet)
+    total = generator_core.calculate_total_combinations(
+        settings['parsed_mask'], settings['charset'], settings['length_range'], settings['dict_entries'],
+        settings['combo_mode'], settings['dict_pos'], settings['dict_b_entries'], settings['advanced_settings'])
+    assert total == 13
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""分块并行 gzip 输出：多成员文件解压后与未压缩输出一致，与压缩线程数无关"""
+
+import gzip
+import itertools
+import json
+import zlib
+
+import pytest
+
+import generator_cli
+import generator_core
+
+EXPECTED = b"".join(''.join(combo).encode() + b"\n" for combo in itertools.product(
+    "abcdefghijklmnopqrstuvwxyz", "0123456789", "0123456789"))
+
+
+@pytest.fixture(autouse=True)
+def small_members(monkeypatch):
+    # 小成员使测试数据也被分成多个 gzip 成员
+    monkeypatch.setattr(generator_core, "COMPRESSION_BLOCK_SIZE", 1000)
+
+
+def _run(*args):
+    assert generator_cli.main(["--mask", "?l?d?d", "--batch-size", "50", "--no-space-check", "-q", *args]) == 0
+
+
+def _members(data):
+    """多成员 gzip 中各成员解压后的内容"""
+    members = []
+    while data:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        members.append(decompressor.decompress(data))
+        assert decompressor.eof
+        data = decompressor.unused_data
+    return members
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_multi_member_gzip_decompresses_to_keyspace(tmp_path, workers):
+    output_file = tmp_path / "out.txt.gz"
+    _run("--compress-workers", str(workers), "-o", str(output_file))
+    data = output_file.read_bytes()
+    assert gzip.decompress(data) == EXPECTED
+    members = _members(data)
+    assert len(members) > 10
+    # 每个成员在换行处结束，可以独立解压
+    assert all(member.endswith(b"\n") for member in members)
+    assert b"".join(members) == EXPECTED
+
+
+def test_output_is_independent_of_worker_count(tmp_path):
+    _run("--compress-workers", "1", "-o", str(tmp_path / "one.txt.gz"))
+    _run("--compress-workers", "4", "-o", str(tmp_path / "four.txt.gz"))
+    assert (tmp_path / "one.txt.gz").read_bytes() == (tmp_path / "four.txt.gz").read_bytes()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_split_gz_parts(tmp_path, workers):
+    _run("--compress-workers", str(workers), "--split-size", "700", "-o", str(tmp_path / "out.txt.gz"))
+    names = ["out.txt.gz", "out.txt_2.gz", "out.txt_3.gz", "out.txt_4.gz"]
+    data = [gzip.decompress((tmp_path / name).read_bytes()) for name in names]
+    assert [part.count(b"\n") for part in data] == [700, 700, 700, 500]
+    assert b"".join(data) == EXPECTED
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_recompress_parts_matches_plain_output(tmp_path, workers):
+    _run("--split-size", "700", "-o", str(tmp_path / "plain.txt"))
+    _run("--split-size", "700", "--recompress-parts", "--compress-workers", str(workers),
+         "-o", str(tmp_path / "out.txt"))
+    for plain, packed in [("plain.txt", "out.txt.gz"), ("plain_2.txt", "out_2.txt.gz"),
+                          ("plain_3.txt", "out_3.txt.gz"), ("plain_4.txt", "out_4.txt.gz")]:
+        assert gzip.decompress((tmp_path / packed).read_bytes()) == (tmp_path / plain).read_bytes()
+        assert len(_members((tmp_path / packed).read_bytes())) > 1
+    # 压缩后删除未压缩的分割文件，清单登记压缩后的文件
+    assert not list(tmp_path.glob("out*.txt"))
+    with open(tmp_path / "out.txt.manifest.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f][1:]
+    assert [record['path'] for record in records] == [
+        str(tmp_path / name) for name in ("out.txt.gz", "out_2.txt.gz", "out_3.txt.gz", "out_4.txt.gz")]
+    assert [record['first'] for record in records] == [0, 700, 1400, 2100]
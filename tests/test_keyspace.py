@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""随机访问索引：按序号区间生成的输出、序号与候选的双向映射与 itertools 枚举一致"""
+
+import itertools
+
+import pytest
+
+import generator_core
+
+BATCH_SIZE = 7  # 较小的批次，使区间边界落在批次中间
+RANGES = [(0, 1), (0, 7), (3, 11), (6, 8), (13, 29), (20, 41), (95, 212)]
+
+
+def _quiet(*_args):
+    pass
+
+
+@pytest.fixture
+def dict_files(tmp_path):
+    # 乱序并含重复，处理后的条目按排序去重
+    a = tmp_path / "a.txt"
+    a.write_text("pw\nab\npw\nx\n", encoding="utf-8")
+    b = tmp_path / "b.txt"
+    b.write_text("9\n12\n", encoding="utf-8")
+    return str(a), str(b)
+
+
+def _charset(charset, min_len, max_len):
+    return [''.join(combo) for length in range(min_len, max_len + 1)
+            for combo in itertools.product(charset, repeat=length)]
+
+
+def _cases(dict_a, dict_b):
+    """(名称, spec, 期望的全部候选)"""
+    entries = ["ab", "pw", "x"]
+    entries_b = ["12", "9"]
+    mask = [''.join(combo) for combo in itertools.product("0123456789", repeat=2)]
+    return [
+        ("mask", {'mask': '?d?l?d'}, [''.join(c) for c in itertools.product(
+            "0123456789", "abcdefghijklmnopqrstuvwxyz", "0123456789")]),
+        ("charset", {'charset': 'ab1', 'min_len': 1, 'max_len': 3}, _charset("ab1", 1, 3)),
+        ("custom_combination", {'custom_dict': True, 'custom_chars': 'a,bc,d', 'custom_dict_mode': 'combination',
+                                'custom_dict_length': 3},
+         [''.join(c) for c in itertools.product(["a", "bc", "d"], repeat=3)]),
+        ("custom_permutation", {'custom_dict': True, 'custom_chars': 'a,b,c,d', 'custom_dict_mode': 'permutation',
+                                'custom_dict_length': 3},
+         [''.join(c) for c in itertools.permutations("abcd", 3)]),
+        ("custom_permutation2", {'custom_dict': True, 'custom_chars': 'a,b,c,d', 'custom_dict_mode': 'permutation2',
+                                 'custom_dict_length': 2, 'connector': '+'},
+         ['+'.join(c) for c in itertools.permutations("abcd", 2)]),
+        ("pure_dict", {'dict_file': dict_a}, entries),
+        ("append_before", {'dict_file': dict_a, 'mask': '?d?d', 'dict_pos': 'append_before'},
+         entries + mask),
+        ("append_after", {'dict_file': dict_a, 'mask': '?d?d', 'dict_pos': 'append_after'},
+         mask + entries),
+        ("dict_first", {'dict_file': dict_a, 'mask': '?d?d', 'dict_combo': 'dict_first'},
+         [e + m for e in entries for m in mask]),
+        ("mask_first", {'dict_file': dict_a, 'mask': '?d?d', 'dict_combo': 'mask_first'},
+         [m + e for e in entries for m in mask]),
+        ("dict_first_charset", {'dict_file': dict_a, 'charset': 'ab', 'min_len': 1, 'max_len': 2,
+                                'dict_combo': 'dict_first'},
+         [e + c for e in entries for c in _charset("ab", 1, 2)]),
+        ("dict_ab", {'dict_file': dict_a, 'dict_b_file': dict_b, 'dict_combo': 'dict_ab'},
+         [a + b for a in entries for b in entries_b]),
+        ("dict_ba", {'dict_file': dict_a, 'dict_b_file': dict_b, 'dict_combo': 'dict_ba'},
+         [b + a for a in entries for b in entries_b]),
+    ]
+
+
+def _lines(blocks):
+    return b"".join(blocks).decode().split("\n")[:-1]
+
+
+@pytest.fixture
+def cases(dict_files):
+    return _cases(*dict_files)
+
+
+def _settings(spec):
+    return generator_core.prepare_generation(spec, log=_quiet)
+
+
+def test_full_output_and_total(cases):
+    for name, spec, expected in cases:
+        assert _lines(generator_core.generate(spec, batch_size=BATCH_SIZE, log=_quiet)) == expected, name
+        assert generator_core.settings_total(_settings(spec)) == len(expected), name
+
+
+def test_ranges_across_batch_edges(cases):
+    for name, spec, expected in cases:
+        settings = _settings(spec)
+        for start, stop in RANGES:
+            want = expected[start:stop]
+            got = [block for block, _count in generator_core.combination_batches(
+                batch_size=BATCH_SIZE, log=_quiet, start=start, stop=stop, **settings)]
+            assert _lines(got) == want, (name, start, stop)
+            block, count = generator_core._range_block(settings, start, stop, BATCH_SIZE)
+            assert (_lines([block]), count) == (want, len(want)), (name, start, stop)
+            limited = generator_core.generate(spec, batch_size=BATCH_SIZE, log=_quiet,
+                                              skip=start, limit=stop - start)
+            assert _lines(limited) == want, (name, start, stop)
+
+
+def test_index_round_trip(cases):
+    for name, spec, expected in cases:
+        settings = _settings(spec)
+        if not generator_core.is_indexable(settings):
+            assert name in ("pure_dict", "append_before", "append_after")
+            continue
+        for index, candidate in enumerate(expected):
+            assert generator_core.keyspace_candidate(settings, index) == candidate, (name, index)
+            assert generator_core.keyspace_index(settings, candidate) == index, (name, candidate)
+        with pytest.raises(IndexError):
+            generator_core.keyspace_candidate(settings, len(expected))
+        with pytest.raises(ValueError):
+            generator_core.keyspace_index(settings, "not-in-space")
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""分片文件和内存映射输出同样写出清单；流式输出没有清单，指定校验算法时报错"""
+
+import hashlib
+import io
+import itertools
+import json
+import sys
+
+import pytest
+
+import generator_cli
+import generator_core
+import generator_verify
+
+MASK = "?l?d?d"
+EXPECTED = b"".join(''.join(combo).encode() + b"\n" for combo in itertools.product(
+    "abcdefghijklmnopqrstuvwxyz", "0123456789", "0123456789"))
+
+
+def _quiet(*_args):
+    pass
+
+
+def _run(*args):
+    return generator_cli.main(["--mask", MASK, "--no-space-check", "-q", *args])
+
+
+def _manifest(output_file):
+    with open(generator_core.manifest_file_name(str(output_file)), encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    return entries[0]['job'], entries[1:]
+
+
+def _check(output_file, parts, algorithm="sha256"):
+    job, records = _manifest(output_file)
+    assert (job['parts'], job['count'], job['bytes']) == (parts, len(EXPECTED) // 4, len(EXPECTED))
+    data = b""
+    first = 0
+    for index, record in enumerate(records, 1):
+        with open(record['path'], 'rb') as f:
+            content = f.read()
+        assert (record['part'], record['first']) == (index, first)
+        assert (record['count'], record['bytes']) == (content.count(b"\n"), len(content))
+        if algorithm == "none":
+            assert record['checksum'] is None
+        else:
+            assert record['checksum'] == f"{algorithm}:" + hashlib.new(algorithm, content).hexdigest()
+        first += record['count']
+        data += content
+    assert data == EXPECTED
+    settings = generator_core.prepare_generation({'mask': MASK}, log=_quiet)
+    report = generator_verify.verify_output([generator_core.manifest_file_name(str(output_file))], settings,
+                                            workers=1, samples=50, seed=1, log=_quiet)
+    assert report['problems'] == []
+    return records
+
+
+@pytest.mark.parametrize("algorithm", ["sha256", "blake2b", "none"])
+def test_shard_files_manifest(tmp_path, algorithm):
+    output_file = tmp_path / "out.txt"
+    assert _run("--workers", "3", "--shard-files", "--checksum", algorithm, "-o", str(output_file)) == 0
+    records = _check(output_file, 3, algorithm)
+    assert [record['path'] for record in records] == [
+        str(tmp_path / f"out.shard{index}.txt") for index in (1, 2, 3)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_mmap_manifest(tmp_path, workers):
+    output_file = tmp_path / "out.txt"
+    assert _run("--mmap", "--workers", str(workers), "--split-size", "700", "-o", str(output_file)) == 0
+    records = _check(output_file, 4)
+    assert [record['count'] for record in records] == [700, 700, 700, 500]
+
+
+def test_mmap_stopped_registers_only_filled_parts(tmp_path):
+    class StopAfter:
+        calls = 0
+
+        def is_set(self):
+            self.calls += 1
+            return self.calls > 12
+
+    settings = generator_core.prepare_generation({'mask': MASK}, log=_quiet)
+    output_file = str(tmp_path / "out.txt")
+    manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file))
+    written = generator_core.write_mmap_parts(settings, output_file, 700, batch_size=100, chunk_size=300,
+                                              stop_event=StopAfter(), log=_quiet, manifest=manifest)
+    assert 0 < written < 2600
+    records = manifest.load()
+    assert records and max(records) < 4
+    for record in records.values():
+        with open(record['path'], 'rb') as f:
+            assert b"\0" not in f.read()
+
+
+def _stdout(monkeypatch):
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, "stdout", stdout)
+    return stdout
+
+
+def test_stream_without_manifest(tmp_path, monkeypatch):
+    messages = []
+    settings = generator_core.prepare_generation({'mask': MASK}, log=_quiet)
+    stdout = _stdout(monkeypatch)
+    generator_cli.run_headless(settings, "-", 1000000, log=lambda message, level="info": messages.append(
+        (level, message)), space_check=False)
+    assert stdout.buffer.getvalue() == EXPECTED
+    assert any(level == "warning" and "清单" in message for level, message in messages)
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("algorithm", ["sha256", "blake2b"])
+def test_stream_rejects_checksum(monkeypatch, algorithm):
+    stdout = _stdout(monkeypatch)
+    assert _run("--checksum", algorithm, "-o", "-") == 2
+    assert stdout.buffer.getvalue() == b""
+    _stdout(monkeypatch)
+    assert _run("--checksum", "none", "-o", "-") == 0
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""NumPy 向量化引擎与后缀块模板引擎的输出与 itertools.product 一致"""
+
+import itertools
+import math
+
+import pytest
+
+import generator_core
+
+MASKS = [
+    "?d",
+    "?d?d?d",
+    "?l?d?l",
+    "?u?d?d?s",
+    "abc?d?l",
+]
+BATCH_SIZES = [1, 7, 100, 1000, generator_core.GENERATION_BATCH_SIZE]
+ENGINES = ["template", "numpy"]
+
+
+def _expected(parsed_mask):
+    return [''.join(combo).encode() for combo in itertools.product(*parsed_mask)]
+
+
+def _lines(batches):
+    """拼接批次并检查每批的候选数与换行数一致"""
+    lines = []
+    for block, count in batches:
+        assert block.endswith(b'\n')
+        assert block.count(b'\n') == count
+        lines.extend(block[:-1].split(b'\n'))
+    return lines
+
+
+def _engine_batches(engine, parsed_mask, batch_size, start=0, stop=None):
+    total = math.prod(len(position) for position in parsed_mask)
+    stop = total if stop is None else min(stop, total)
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+        tables = generator_core._numpy_tables(parsed_mask)
+        return generator_core._numpy_mask_batches(tables, start, stop, batch_size)
+    return generator_core._template_mask_batches(parsed_mask, batch_size, start=start, stop=stop)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+@pytest.mark.parametrize("mask", MASKS)
+def test_engine_matches_product(engine, mask, batch_size):
+    parsed_mask = generator_core.parse_hashcat_mask(mask)
+    assert _lines(_engine_batches(engine, parsed_mask, batch_size)) == _expected(parsed_mask)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 100])
+@pytest.mark.parametrize("start, stop", [(0, 1), (5, 17), (99, 101), (237, 1000), (1234, 5678), (17000, 17576)])
+def test_engines_agree_on_ranges(batch_size, start, stop):
+    parsed_mask = generator_core.parse_hashcat_mask("?l?l?l")
+    expected = _expected(parsed_mask)[start:stop]
+    for engine in ENGINES:
+        assert _lines(_engine_batches(engine, parsed_mask, batch_size, start, stop)) == expected, engine
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_charset_batches_with_each_engine(monkeypatch, engine):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        # 没有 NumPy 时 mask_engine 选择模板引擎
+        monkeypatch.setattr(generator_core, "_numpy", False)
+    expected = [''.join(combo).encode() for length in range(1, 4)
+                for combo in itertools.product("ab1", repeat=length)]
+    assert generator_core.mask_engine(["ab1"]) == engine
+    assert _lines(generator_core.charset_batches("ab1", (1, 3), batch_size=5)) == expected
+    assert _lines(generator_core.charset_batches("ab1", (1, 3), batch_size=5, start=2, stop=30)) == expected[2:30]
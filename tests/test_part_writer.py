@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""分割文件写入器：按候选数、按字节数换文件，清单记录与文件内容一致"""
+
+import hashlib
+
+import pytest
+
+import generator_core
+
+
+def _lines(count, width=None):
+    """序号候选；width 为 None 时长度不固定"""
+    return [(b"%0*d" % (width, i) if width else b"x" * (i % 7) + b"%d" % i) + b"\n" for i in range(count)]
+
+
+def _batches(lines, sizes):
+    """按 sizes 循环切分为批次，使文件边界落在批次中间"""
+    position, turn = 0, 0
+    while position < len(lines):
+        size = sizes[turn % len(sizes)]
+        yield b"".join(lines[position:position + size]), len(lines[position:position + size])
+        position += size
+        turn += 1
+
+
+def _write(output_file, batches, split_size, split_bytes=None, **options):
+    manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file))
+    with generator_core.PartWriter(output_file, manifest=manifest, log=lambda *_args: None, **options) as writer:
+        last = 0
+        for block, count, file_index in generator_core.split_batches(batches, split_size,
+                                                                     split_bytes=split_bytes):
+            assert file_index in (last, last + 1)
+            last = file_index
+            writer.write(file_index, block, count)
+        writer.finish()
+    return [record for _part, record in sorted(manifest.load().items())]
+
+
+def _read(record):
+    with open(record['path'], 'rb') as f:
+        return f.read()
+
+
+def _check_records(records, lines):
+    data = b"".join(lines)
+    first = 0
+    for index, record in enumerate(records, 1):
+        content = _read(record)
+        assert record['part'] == index
+        assert (record['first'], record['count'], record['bytes']) == (first, content.count(b"\n"), len(content))
+        assert record['checksum'] == "sha256:" + hashlib.sha256(content).hexdigest()
+        first += record['count']
+    assert b"".join(_read(record) for record in records) == data
+    assert first == len(lines)
+
+
+@pytest.mark.parametrize("sizes", [[1], [3, 10], [64]])
+def test_rollover_by_count(tmp_path, sizes):
+    output_file = str(tmp_path / "out.txt")
+    lines = _lines(100, width=3)
+    records = _write(output_file, _batches(lines, sizes), split_size=30)
+    assert [record['count'] for record in records] == [30, 30, 30, 10]
+    assert [record['path'] for record in records] == [
+        str(tmp_path / name) for name in ("out.txt", "out_2.txt", "out_3.txt", "out_4.txt")]
+    _check_records(records, lines)
+
+
+@pytest.mark.parametrize("sizes", [[1], [5, 17], [200]])
+def test_rollover_by_bytes(tmp_path, sizes):
+    output_file = str(tmp_path / "out.txt")
+    lines = _lines(150)
+    records = _write(output_file, _batches(lines, sizes), split_size=1000, split_bytes=64)
+    for record in records[:-1]:
+        content = _read(record)
+        # 按整行切分，且下一行放不进当前文件
+        assert content.endswith(b"\n") and len(content) <= 64
+        next_line = lines[record['first'] + record['count']]
+        assert len(content) + len(next_line) > 64
+    _check_records(records, lines)
+
+
+def test_rollover_by_count_and_bytes_whichever_first(tmp_path):
+    lines = _lines(60, width=9)  # 每行 10 字节
+    records = _write(str(tmp_path / "out.txt"), _batches(lines, [7]), split_size=4, split_bytes=25)
+    assert {record['count'] for record in records} == {2}
+    records = _write(str(tmp_path / "b.txt"), _batches(lines, [7]), split_size=4, split_bytes=100)
+    assert {record['count'] for record in records} == {4}
+    _check_records(records, lines)
+
+
+def test_oversized_line_gets_own_part(tmp_path):
+    lines = [b"a\n", b"b" * 40 + b"\n", b"c\n", b"d\n"]
+    records = _write(str(tmp_path / "out.txt"), _batches(lines, [4]), split_size=100, split_bytes=10)
+    assert [_read(record) for record in records] == [b"a\n", lines[1], b"c\nd\n"]
+
+
+def test_publish_renames_parts_after_rollover(tmp_path):
+    lines = _lines(50, width=2)
+    records = _write(str(tmp_path / "out.txt"), _batches(lines, [9]), split_size=20, publish=True)
+    assert not [path for path in tmp_path.iterdir() if path.name.endswith(generator_core.PART_TEMP_SUFFIX)]
+    _check_records(records, lines)
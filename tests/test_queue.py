@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""共享目录任务队列：租约超时重新放回、超时后原领取者完成的块不再重做"""
+
+import os
+import time
+
+import pytest
+
+import generator_core
+import generator_queue
+
+SPEC = {'mask': '?d?d?d'}
+CHUNK_SIZE = 300  # 1000 个候选分为 4 块
+
+
+def _quiet(*_args):
+    pass
+
+
+@pytest.fixture
+def queue_dir(tmp_path):
+    path = str(tmp_path / "queue")
+    generator_queue.init_queue(path, SPEC, CHUNK_SIZE, "out.txt", log=_quiet)
+    return path
+
+
+def _expire(queue_dir, chunk_index, age=1000):
+    """把已领取块的心跳时间调到 age 秒之前"""
+    path = os.path.join(queue_dir, "claimed", f"{chunk_index:08d}")
+    old = time.time() - age
+    os.utime(path, (old, old))
+
+
+def _process(queue_dir, chunk_index, worker_id):
+    job = generator_queue.load_job(queue_dir)
+    settings = generator_core.prepare_generation(job['spec'], log=_quiet)
+    return generator_queue.process_chunk(queue_dir, job, settings, chunk_index, worker_id)
+
+
+def test_init_and_claim_in_order(queue_dir):
+    job = generator_queue.load_job(queue_dir)
+    assert (job['total'], job['chunks']) == (1000, 4)
+    assert [generator_queue.claim_chunk(queue_dir, "w") for _ in range(5)] == [0, 1, 2, 3, None]
+    assert generator_queue.queue_status(queue_dir) == {'pending': 0, 'claimed': 4, 'done': 0}
+    with pytest.raises(FileExistsError):
+        generator_queue.init_queue(queue_dir, SPEC, CHUNK_SIZE, log=_quiet)
+
+
+def test_reclaim_expired_only_after_lease_timeout(queue_dir):
+    assert generator_queue.claim_chunk(queue_dir, "a") == 0
+    assert generator_queue.claim_chunk(queue_dir, "a") == 1
+    _expire(queue_dir, 0)
+    assert generator_queue.reclaim_expired(queue_dir, lease_timeout=300, log=_quiet) == 1
+    assert sorted(os.listdir(os.path.join(queue_dir, "claimed"))) == ["00000001"]
+    # 超时的块回到待领取目录，由其它节点按顺序重新领取
+    assert generator_queue.claim_chunk(queue_dir, "b") == 0
+    assert generator_queue.reclaim_expired(queue_dir, lease_timeout=300, log=_quiet) == 0
+
+
+def test_expired_chunk_with_done_record_is_cleaned_up(queue_dir):
+    assert generator_queue.claim_chunk(queue_dir, "a") == 0
+    _process(queue_dir, 0, "a")
+    # 模拟完成记录写入后、清理领取记录前崩溃
+    open(os.path.join(queue_dir, "claimed", "00000000"), "w").close()
+    _expire(queue_dir, 0)
+    assert generator_queue.reclaim_expired(queue_dir, lease_timeout=300, log=_quiet) == 0
+    assert generator_queue.queue_status(queue_dir) == {'pending': 3, 'claimed': 0, 'done': 1}
+
+
+def test_chunk_finished_after_reclaim_is_dropped_on_claim(queue_dir):
+    assert generator_queue.claim_chunk(queue_dir, "a") == 0
+    _expire(queue_dir, 0)
+    assert generator_queue.reclaim_expired(queue_dir, lease_timeout=300, log=_quiet) == 1
+    # 原领取者在租约超时后仍完成了这一块
+    record = _process(queue_dir, 0, "a")
+    assert (record['start'], record['stop'], record['count']) == (0, 300, 300)
+    # 其它节点领取时发现已有完成记录，丢弃该块并领取下一块
+    assert generator_queue.claim_chunk(queue_dir, "b") == 1
+    assert generator_queue.queue_status(queue_dir) == {'pending': 2, 'claimed': 1, 'done': 1}
+
+
+def test_late_finish_does_not_remove_new_owner_claim(queue_dir):
+    assert generator_queue.claim_chunk(queue_dir, "a") == 0
+    _expire(queue_dir, 0)
+    generator_queue.reclaim_expired(queue_dir, lease_timeout=300, log=_quiet)
+    assert generator_queue.claim_chunk(queue_dir, "b") == 0
+    _process(queue_dir, 0, "a")
+    # b 的领取记录保留，由 b 完成后清理；a 放弃时也不会动 b 的块
+    generator_queue.release_chunk(queue_dir, 0, "a")
+    assert os.listdir(os.path.join(queue_dir, "claimed")) == ["00000000"]
+    _process(queue_dir, 0, "b")
+    assert generator_queue.queue_status(queue_dir) == {'pending': 3, 'claimed': 0, 'done': 1}
+
+
+def test_workers_reproduce_keyspace(queue_dir):
+    assert generator_queue.claim_chunk(queue_dir, "crashed") == 0
+    _expire(queue_dir, 0)
+    assert generator_queue.run_worker(queue_dir, "a", lease_timeout=300, log=_quiet) == 4
+    assert generator_queue.run_worker(queue_dir, "b", lease_timeout=300, log=_quiet) == 0
+    job = generator_queue.load_job(queue_dir)
+    data = b"".join(open(generator_queue.chunk_output_path(queue_dir, job, i), "rb").read() for i in range(4))
+    assert data == b"".join(b"%03d\n" % i for i in range(1000))
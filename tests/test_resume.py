@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""中断后 --resume 续传：拼接后的分割文件和清单与一次写完的结果完全一致"""
+
+import json
+import os
+import threading
+
+import pytest
+
+import generator_cli
+import generator_core
+
+
+def _quiet(*_args):
+    pass
+
+
+class _StopAfter(threading.Event):
+    """第 calls 次检查停止标志时触发停止，模拟用户在生成中途中断"""
+
+    def __init__(self, calls):
+        super().__init__()
+        self.calls = calls
+
+    def is_set(self):
+        self.calls -= 1
+        if self.calls <= 0:
+            self.set()
+        return super().is_set()
+
+
+VARIANTS = {
+    'default': dict(spec={'mask': '?l?d?d'}, split_size=700),
+    'publish_close': dict(spec={'mask': '?l?d?d'}, split_size=700,
+                          writer_options={'publish': True, 'durability': 'close'}),
+    'split_bytes': dict(spec={'charset': 'abcd', 'min_len': 1, 'max_len': 5}, split_size=100000,
+                        split_bytes=2000),
+}
+
+
+def _run(directory, variant, stop_event=None, resume=False):
+    options = dict(VARIANTS[variant])
+    settings = generator_core.prepare_generation(options.pop('spec'), log=_quiet)
+    os.makedirs(directory, exist_ok=True)
+    output_file = os.path.join(directory, "out.txt")
+    return generator_cli.run_headless(
+        settings, output_file, options.pop('split_size'), batch_size=50, stop_event=stop_event, log=_quiet,
+        checkpoint_file=output_file + ".progress.json", resume=resume, space_check=False, **options)
+
+
+def _result(directory):
+    """(按清单顺序拼接的分割文件内容, 去掉目录的清单)"""
+    with open(os.path.join(directory, "out.txt.manifest.jsonl"), encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    data = b""
+    for entry in entries[1:]:
+        with open(entry['path'], 'rb') as part:
+            data += part.read()
+        entry['path'] = os.path.basename(entry['path'])
+    entries[0]['job']['output_file'] = os.path.basename(entries[0]['job']['output_file'])
+    leftovers = [name for name in os.listdir(directory) if name.endswith(generator_core.PART_TEMP_SUFFIX)]
+    return data, entries, leftovers
+
+
+@pytest.mark.parametrize("variant", sorted(VARIANTS))
+@pytest.mark.parametrize("calls", [3, 15, 20, 41])  # 15: 默认分割时恰好停在文件边界
+def test_resume_matches_uninterrupted_run(tmp_path, variant, calls):
+    full = str(tmp_path / "full")
+    total = _run(full, variant)
+    expected = _result(full)
+    assert expected[0].count(b"\n") == total and len(expected[1]) > 3
+
+    resumed = str(tmp_path / "resumed")
+    written = _run(resumed, variant, stop_event=_StopAfter(calls))
+    assert 0 < written < total
+    checkpoint_file = os.path.join(resumed, "out.txt.progress.json")
+    checkpoint = generator_core.load_checkpoint(checkpoint_file)
+    assert checkpoint['written'] <= written
+    if checkpoint['in_file']:
+        # 模拟检查点之后写入的半截数据，续传时截断
+        with open(checkpoint['current_file'], 'ab') as f:
+            f.write(b"zz\nhalf")
+    assert _run(resumed, variant, resume=True) == total
+    assert not os.path.exists(checkpoint_file)
+    assert _result(resumed) == expected
+    assert expected[2] == []
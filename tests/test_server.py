@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""候选服务的分发状态：未确认的块重新放回队列，游标只越过连续确认的区间"""
+
+import threading
+import time
+
+import pytest
+
+import generator_core
+import generator_server
+
+
+def _quiet(*_args):
+    pass
+
+
+def _batches(counts):
+    """每块的数据为其候选序号，便于核对"""
+    start = 0
+    for count in counts:
+        yield b"".join(b"%d\n" % index for index in range(start, start + count)), count
+        start += count
+
+
+def _take(dispatcher, owner):
+    item = dispatcher.take(owner)
+    assert item is not None and item is not generator_server._DONE
+    return item
+
+
+def _drain(dispatcher, owner):
+    """取完并确认剩余的块，返回按领取顺序的 (id, 起点, 候选数)"""
+    taken = []
+    while True:
+        item = dispatcher.take(owner)
+        if item is generator_server._DONE:
+            return taken
+        assert item is not None
+        taken.append(item[:3])
+        assert dispatcher.ack(item[0], owner)
+
+
+def test_cursor_advances_only_over_contiguous_acks():
+    dispatcher = generator_server.CandidateDispatcher(_batches([3, 4, 5, 6]), start=10)
+    owner = object()
+    items = [_take(dispatcher, owner) for _ in range(4)]
+    assert [item[:3] for item in items] == [(0, 10, 3), (1, 13, 4), (2, 17, 5), (3, 22, 6)]
+    assert dispatcher.ack(1, owner) and dispatcher.ack(3, owner)
+    assert (dispatcher.cursor, dispatcher.acked) == (10, 10)
+    assert dispatcher.ack(0, owner)
+    assert dispatcher.cursor == 17  # 块 2 未确认，块 3 之后不能越过
+    assert not dispatcher.ack(0, owner)  # 重复确认无效
+    assert dispatcher.ack(2, owner)
+    assert (dispatcher.cursor, dispatcher.acked) == (28, 18)
+    assert dispatcher.take(owner) is generator_server._DONE
+    assert dispatcher.finished
+
+
+def test_release_requeues_unacked_blocks_of_owner():
+    dispatcher = generator_server.CandidateDispatcher(_batches([2, 2, 2, 2]))
+    a, b = object(), object()
+    a_items = [_take(dispatcher, a) for _ in range(2)]
+    b_item = _take(dispatcher, b)
+    assert dispatcher.ack(a_items[0][0], a)
+    assert not dispatcher.ack(b_item[0], a)  # 只有领取者能确认
+    assert dispatcher.release(a) == 1
+    assert dispatcher.inflight == 1
+    # 放回的块先于新块被领取，数据不变
+    assert _take(dispatcher, b) == a_items[1]
+    assert not dispatcher.ack(a_items[1][0], a)
+    assert dispatcher.ack(a_items[1][0], b)
+    assert dispatcher.cursor == 4
+    assert dispatcher.ack(b_item[0], b)
+    assert _drain(dispatcher, b) == [(3, 6, 2)]
+    assert (dispatcher.cursor, dispatcher.acked) == (8, 8)
+
+
+def test_expire_requeues_only_after_lease_timeout():
+    dispatcher = generator_server.CandidateDispatcher(_batches([1, 1, 1]), lease_timeout=300)
+    a = object()
+    item = _take(dispatcher, a)
+    assert dispatcher.expire() == 0
+    dispatcher.lease_timeout = 0
+    assert dispatcher.expire() == 1
+    assert not dispatcher.ack(item[0], a)  # 超时后的确认被忽略，不重复计数
+    assert dispatcher.cursor == 0
+    b = object()
+    assert _drain(dispatcher, b) == [(0, 0, 1), (1, 1, 1), (2, 2, 1)]
+    assert (dispatcher.cursor, dispatcher.acked) == (3, 3)
+
+
+def test_stop_event_keeps_cursor_at_contiguous_end():
+    stop_event = threading.Event()
+    dispatcher = generator_server.CandidateDispatcher(_batches([5] * 100), prefetch=1, stop_event=stop_event)
+    owner = object()
+    items = [_take(dispatcher, owner) for _ in range(3)]
+    dispatcher.ack(items[0][0], owner)
+    dispatcher.ack(items[2][0], owner)
+    stop_event.set()
+    assert dispatcher.cursor == 5
+
+
+@pytest.mark.skipif(not hasattr(generator_server.socket, "AF_UNIX"), reason="需要 Unix 域套接字")
+def test_serve_and_consume_over_unix_socket(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator_server, "DONE_GRACE_PERIOD", 0.5)
+    address = str(tmp_path / "gen.sock")
+    settings = generator_core.prepare_generation({'mask': '?d?d?d'}, log=_quiet)
+    batches = generator_core.combination_batches(batch_size=64, log=_quiet, **settings)
+    result = {}
+    server = threading.Thread(target=lambda: result.update(
+        cursor=generator_server.serve(address, batches, log=_quiet)))
+    server.start()
+    for _ in range(100):
+        if (tmp_path / "gen.sock").exists():
+            break
+        time.sleep(0.05)
+    received = []
+    assert generator_server.consume(address, received.append, log=_quiet) == 1000
+    server.join(timeout=30)
+    assert result['cursor'] == 1000
+    assert b"".join(received) == b"".join(b"%03d\n" % i for i in range(1000))
+
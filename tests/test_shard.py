@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""--shard i/N 与 hashcat 含义的 -s/-l：各分片合起来与单节点输出完全一致且互不重叠"""
+
+import itertools
+
+import pytest
+
+import generator_cli
+import generator_core
+
+
+@pytest.fixture
+def dict_file(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("pw\nab\nx\n", encoding="utf-8")
+    return str(path)
+
+
+def _run(path, *args):
+    assert generator_cli.main([*args, "--no-space-check", "--split-size", "1000000", "-o", str(path)]) == 0
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+def test_resolve_range():
+    assert generator_core.resolve_range(100) == (0, 100)
+    assert generator_core.resolve_range(100, skip=10, limit=20) == (10, 30)
+    assert generator_core.resolve_range(100, skip=90, limit=20) == (90, 100)
+    assert generator_core.resolve_range(100, skip=150) == (100, 100)
+    # 在 skip/limit 限定的区间内均分，余数分给前面的分片
+    shards = [generator_core.resolve_range(100, 10, 23, (i, 3)) for i in (1, 2, 3)]
+    assert shards == [(10, 18), (18, 26), (26, 33)]
+
+
+@pytest.mark.parametrize("text", ["0/3", "4/3", "1/0", "a/b", "3"])
+def test_parse_shard_rejects(text):
+    with pytest.raises(ValueError):
+        generator_core.parse_shard(text)
+
+
+@pytest.mark.parametrize("count", [1, 3, 7])
+def test_cli_shards_concatenate_to_full_output(tmp_path, dict_file, count):
+    args = ("--dict-a", dict_file, "--mask", "?d?l", "--combo-mode", "dict_first")
+    expected = [e + "".join(m) for e in ("ab", "pw", "x")
+                for m in itertools.product("0123456789", "abcdefghijklmnopqrstuvwxyz")]
+    assert _run(tmp_path / "full.txt", *args) == expected
+    lines = []
+    for index in range(1, count + 1):
+        lines += _run(tmp_path / f"shard{index}.txt", *args, "--shard", f"{index}/{count}")
+    assert lines == expected
+
+
+@pytest.mark.parametrize("args", [
+    ("--mask", "?l?d?d"),
+    ("--charset", "abc", "--min-len", "1", "--max-len", "4"),
+])
+def test_cli_skip_limit_and_shard_within_range(tmp_path, args):
+    expected = _run(tmp_path / "full.txt", *args)
+    assert _run(tmp_path / "sl.txt", *args, "-s", "37", "-l", "51") == expected[37:88]
+    assert _run(tmp_path / "tail.txt", *args, "--skip", "100") == expected[100:]
+    lines = []
+    for index in (1, 2, 3, 4):
+        lines += _run(tmp_path / f"s{index}.txt", *args, "-s", "37", "-l", "51", "--shard", f"{index}/4")
+    assert lines == expected[37:88]
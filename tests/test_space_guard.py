@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""写入时的空间监控：低于阈值时暂停，空间不恢复时切换为压缩或备用目录，最后停止"""
+
+import os
+import shutil
+import threading
+
+import pytest
+
+import generator_core
+
+MIN_FREE = 1000  # 保留空间为 250 字节，每写入 125 字节检查一次
+
+
+def _quiet(*_args):
+    pass
+
+
+@pytest.fixture
+def disk(monkeypatch):
+    """按目录设定可用空间的 shutil.disk_usage；值可为数字或每次调用依次取出的列表"""
+    free = {}
+
+    def disk_usage(path):
+        value = free[os.path.abspath(path)]
+        if isinstance(value, list):
+            value = value.pop(0) if len(value) > 1 else value[0]
+        return shutil._ntuple_diskusage(10 ** 12, 10 ** 12 - value, value)
+
+    monkeypatch.setattr(generator_core.shutil, "disk_usage", disk_usage)
+    monkeypatch.setattr(generator_core, "SPACE_POLL_INTERVAL", 0.01)
+    return free
+
+
+def _writer(tmp_path, **options):
+    guard = generator_core.SpaceGuard(min_free=MIN_FREE, wait=0.1, log=_quiet, **options)
+    writer = generator_core.PartWriter(str(tmp_path / "out.txt"), space_guard=guard, log=_quiet)
+    return writer, guard
+
+
+def _block(size=200):
+    return b"x" * (size - 1) + b"\n"
+
+
+def test_enough_space_does_not_pause(tmp_path, disk):
+    disk[str(tmp_path)] = 10 ** 9
+    writer, guard = _writer(tmp_path)
+    with writer:
+        for file_index in (1, 1, 2):
+            writer.write(file_index, _block())
+    assert (guard.pauses, writer.layout) == (0, [])
+
+
+def test_pauses_until_space_recovers(tmp_path, disk):
+    disk[str(tmp_path)] = [10 ** 9, 900, 900, 900, 5000]
+    writer, guard = _writer(tmp_path, compress=False)
+    with writer:
+        writer.write(1, _block())
+        writer.write(1, _block())
+        writer.write(2, _block())
+    assert guard.pauses == 1
+    assert 0 < guard.pause_time < 5
+    assert writer.layout == []
+    assert os.path.getsize(tmp_path / "out_2.txt") == 200
+
+
+def test_switches_next_parts_to_gzip(tmp_path, disk):
+    disk[str(tmp_path)] = 800  # 低于阈值但高于保留空间
+    writer, guard = _writer(tmp_path)
+    with writer:
+        writer.write(1, _block())
+        writer.write(1, _block())  # 当前文件在保留空间内写完
+        disk[str(tmp_path)] = 10 ** 9
+        writer.write(2, _block())
+    assert guard.pauses == 1
+    assert writer.layout == [{'from': 2, 'directory': None, 'compress': True}]
+    assert writer.part_path(2) == str(tmp_path / "out_2.txt.gz")
+    assert os.path.getsize(tmp_path / "out.txt") == 400
+    assert os.path.exists(tmp_path / "out_2.txt.gz")
+
+
+def test_spills_to_directory_with_space(tmp_path, disk):
+    small, large = tmp_path / "small", tmp_path / "large"
+    disk[str(tmp_path)] = 800
+    disk[str(small)] = 500
+    disk[str(large)] = 10 ** 9
+    writer, guard = _writer(tmp_path, compress=False, spill_dirs=[str(small), str(large)])
+    with writer:
+        writer.write(1, _block())
+        writer.write(1, _block())
+        writer.write(2, _block())
+    assert writer.layout == [{'from': 2, 'directory': str(large), 'compress': False}]
+    assert os.path.getsize(large / "out_2.txt") == 200
+    assert guard.spill_dirs == []
+
+
+def test_stops_below_reserve(tmp_path, disk):
+    disk[str(tmp_path)] = 300  # 写入后低于保留空间
+    writer, guard = _writer(tmp_path)
+    with writer:
+        with pytest.raises(generator_core.OutputSpaceError):
+            writer.write(1, _block())
+    assert guard.pauses == 1
+
+
+def test_stops_when_no_strategy_left(tmp_path, disk):
+    disk[str(tmp_path)] = 800
+    writer, _guard = _writer(tmp_path, compress=False)
+    with writer:
+        with pytest.raises(generator_core.OutputSpaceError):
+            writer.write(1, _block())
+
+
+def test_stop_event_ends_pause_without_switching(tmp_path, disk):
+    disk[str(tmp_path)] = 800
+    stop_event = threading.Event()
+    stop_event.set()
+    writer, guard = _writer(tmp_path, compress=False, stop_event=stop_event)
+    with writer:
+        writer.write(1, _block())
+    assert (guard.pauses, writer.layout) == (1, [])
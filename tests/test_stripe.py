@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""多目录条带输出：分割文件按轮询或剩余空间分配到各目录，内容和清单与单目录写入一致"""
+
+import os
+import shutil
+
+import pytest
+
+import generator_core
+
+
+def _quiet(*_args):
+    pass
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    return [str(tmp_path / name) for name in ("a", "b", "c")]
+
+
+@pytest.fixture
+def disk(monkeypatch):
+    """按目录设定可用空间的 shutil.disk_usage"""
+    free = {}
+
+    def disk_usage(path):
+        value = free[os.path.abspath(path)]
+        return shutil._ntuple_diskusage(10 ** 12, 10 ** 12 - value, value)
+
+    monkeypatch.setattr(generator_core.shutil, "disk_usage", disk_usage)
+    return free
+
+
+def _write(tmp_path, dirs, mode, parts=7, **options):
+    output_file = str(tmp_path / "out.txt")
+    manifest = generator_core.PartManifest(generator_core.manifest_file_name(output_file))
+    writer = generator_core.StripedPartWriter(output_file, dirs, mode, manifest=manifest, log=_quiet,
+                                              queue_budget=64, **options)
+    lines = [b"%04d\n" % i for i in range(parts * 10)]
+    with writer:
+        for index in range(parts):
+            # 每个文件分两块写入，第二块进入队列时上一块可能仍在写
+            writer.write(index + 1, b"".join(lines[index * 10:index * 10 + 4]), 4)
+            writer.write(index + 1, b"".join(lines[index * 10 + 4:index * 10 + 10]), 6)
+        writer.finish()
+    records = [record for _part, record in sorted(manifest.load().items())]
+    data = b""
+    for index, record in enumerate(records):
+        with open(record['path'], 'rb') as f:
+            content = f.read()
+        assert (record['part'], record['first'], record['count']) == (index + 1, index * 10, 10)
+        assert record['bytes'] == len(content)
+        data += content
+    assert data == b"".join(lines)
+    return [os.path.basename(os.path.dirname(record['path'])) for record in records], writer
+
+
+def test_round_robin(tmp_path, dirs):
+    placed, writer = _write(tmp_path, dirs, "round-robin")
+    assert placed == ["a", "b", "c", "a", "b", "c", "a"]
+    assert [entry['directory'] for entry in writer.layout] == [dirs[i % 3] for i in range(7)]
+    assert sorted(os.listdir(dirs[0])) == ["out.txt", "out_4.txt", "out_7.txt"]
+    assert sorted(os.listdir(dirs[1])) == ["out_2.txt", "out_5.txt"]
+
+
+def test_round_robin_skips_full_directory(tmp_path, dirs, disk):
+    disk.update({dirs[0]: 10 ** 9, dirs[1]: 100, dirs[2]: 10 ** 9})
+    guard = generator_core.SpaceGuard(min_free=1000, log=_quiet)
+    placed, _writer = _write(tmp_path, dirs, "round-robin", space_guard=guard)
+    assert placed == ["a", "c", "a", "c", "a", "c", "a"]
+
+
+def test_free_space_prefers_largest_directory(tmp_path, dirs, disk):
+    disk.update({dirs[0]: 10 ** 6, dirs[1]: 3 * 10 ** 6, dirs[2]: 2 * 10 ** 6})
+    placed, _writer = _write(tmp_path, dirs, "free-space", parts=3)
+    assert placed == ["b", "b", "b"]
+    disk[dirs[1]] = 10
+    placed, _writer = _write(tmp_path, dirs, "free-space", parts=3)
+    assert placed == ["c", "c", "c"]
+
+
+def test_free_space_rotates_on_equal_space(tmp_path, dirs, disk):
+    disk.update({directory: 10 ** 9 for directory in dirs})
+    placed, _writer = _write(tmp_path, dirs, "free-space", parts=4)
+    assert placed == ["a", "b", "c", "a"]
+
+
+def test_publish_leaves_no_temporary_files(tmp_path, dirs):
+    placed, _writer = _write(tmp_path, dirs, "round-robin", parts=5, publish=True)
+    assert placed == ["a", "b", "c", "a", "b"]
+    for directory in dirs:
+        assert not [name for name in os.listdir(directory) if name.endswith(generator_core.PART_TEMP_SUFFIX)]
+
+
+def test_rejects_bad_arguments(tmp_path):
+    with pytest.raises(ValueError):
+        generator_core.StripedPartWriter(str(tmp_path / "out.txt"), [str(tmp_path)], "random")
+    with pytest.raises(ValueError):
+        generator_core.StripedPartWriter(str(tmp_path / "out.txt"), [])
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""输出校验：截断、损坏的 gzip、缺少的分割文件、校验值、序号区间和抽查出的错误候选"""
+
+import itertools
+import json
+
+import pytest
+
+import generator_cli
+import generator_core
+import generator_verify
+
+MASK = "?l?d?d"
+LINES = [''.join(combo).encode() + b"\n" for combo in itertools.product(
+    "abcdefghijklmnopqrstuvwxyz", "0123456789", "0123456789")]
+PARTS = ["out.txt", "out_2.txt", "out_3.txt", "out_4.txt"]
+
+
+def _quiet(*_args):
+    pass
+
+
+@pytest.fixture
+def settings():
+    return generator_core.prepare_generation({'mask': MASK}, log=_quiet)
+
+
+def _generate(tmp_path, *args, output="out.txt"):
+    assert generator_cli.main(["--mask", MASK, "--batch-size", "50", "--split-size", "700", "--no-space-check",
+                               "-q", *args, "-o", str(tmp_path / output)]) == 0
+    return str(tmp_path / (output + ".manifest.jsonl"))
+
+
+def _verify(sources, settings=None, samples=50):
+    return generator_verify.verify_output(sources, settings, workers=1, samples=samples, seed=7, log=_quiet)
+
+
+def _edit_manifest(path, edit):
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    entries = edit(entries)
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def _has(report, *fragments):
+    return any(all(fragment in problem for fragment in fragments) for problem in report['problems'])
+
+
+def test_clean_output_passes(tmp_path, settings):
+    manifest = _generate(tmp_path)
+    report = _verify([manifest], settings)
+    assert report['problems'] == []
+    assert (report['parts'], report['lines'], report['bytes']) == (4, 2600, 2600 * 4)
+    # 随机位置可能重复，重复的只比对一次
+    assert 40 < report['sampled'] <= 50
+    files = _verify([str(tmp_path / name) for name in reversed(PARTS)], settings)
+    assert files['problems'] == [] and files['lines'] == 2600 and files['sampled'] == report['sampled']
+
+
+def test_truncated_part(tmp_path, settings):
+    manifest = _generate(tmp_path)
+    path = tmp_path / "out_2.txt"
+    path.write_bytes(path.read_bytes()[:-2])
+    report = _verify([manifest], settings)
+    name = str(path)
+    assert _has(report, name, "被截断")
+    assert _has(report, name, "候选数 699，清单记录 700")
+    assert _has(report, name, "大小 2798 字节，清单记录 2800 字节")
+    assert _has(report, name, "校验值不一致")
+    assert _has(report, "候选总数 2599，应为 2600")
+    # 没有清单时只能从文件末尾发现截断
+    files = _verify([str(tmp_path / name) for name in PARTS])
+    assert _has(files, name, "被截断")
+
+
+def test_corrupted_gzip_member(tmp_path, monkeypatch, settings):
+    monkeypatch.setattr(generator_core, "COMPRESSION_BLOCK_SIZE", 1000)
+    manifest = _generate(tmp_path, output="out.txt.gz")
+    path = tmp_path / "out.txt_3.gz"
+    data = bytearray(path.read_bytes())
+    # 破坏中间一个成员的压缩数据
+    middle = len(data) // 2
+    data[middle:middle + 8] = bytes(byte ^ 0xFF for byte in data[middle:middle + 8])
+    path.write_bytes(bytes(data))
+    report = _verify([manifest], settings)
+    assert _has(report, str(path), "gzip 数据不完整或已损坏")
+    assert _has(report, str(path), "校验值不一致")
+
+    path = tmp_path / "out.txt_4.gz"
+    path.write_bytes(path.read_bytes()[:-5])
+    result = generator_verify.scan_part(str(path))
+    assert "gzip 数据不完整或已损坏" in result['error']
+
+
+def test_missing_part_number(tmp_path, settings):
+    manifest = _generate(tmp_path)
+    files = _verify([str(tmp_path / name) for name in ("out.txt", "out_3.txt", "out_4.txt")], settings)
+    assert _has(files, "缺少第 2 个分割文件")
+    assert _has(files, "候选总数 1900，应为 2600")
+    # 缺少分割文件时之后的序号区间无法确定，不抽查
+    assert files['sampled'] == 0
+
+    _edit_manifest(manifest, lambda entries: [entry for entry in entries if entry.get('part') != 2])
+    report = _verify([manifest])
+    assert _has(report, "缺少第 2 个分割文件")
+    assert _has(report, str(tmp_path / "out_3.txt"), "首个候选序号 1400，应为 700")
+    assert _has(report, "候选总数 1900，应为 2600")
+
+
+def test_wrong_checksum(tmp_path, settings):
+    manifest = _generate(tmp_path)
+
+    def edit(entries):
+        entries[3]['checksum'] = "sha256:" + "0" * 64
+        return entries
+
+    _edit_manifest(manifest, edit)
+    report = _verify([manifest], settings)
+    assert report['problems'] == [f"{tmp_path / 'out_3.txt'}: 校验值不一致"]
+
+
+def test_non_contiguous_range(tmp_path, settings):
+    manifest = _generate(tmp_path)
+
+    def edit(entries):
+        entries[3]['first'] += 10
+        return entries
+
+    _edit_manifest(manifest, edit)
+    report = _verify([manifest], settings, samples=0)
+    assert _has(report, str(tmp_path / "out_3.txt"), "首个候选序号 1410，应为 1400", "不相接")
+    # 下一个文件与错位后的区间重叠，同样报告
+    assert _has(report, str(tmp_path / "out_4.txt"), "首个候选序号 2100，应为 2110")
+    assert len(report['problems']) == 2
+
+
+def test_sampling_catches_wrong_candidates(tmp_path, settings):
+    manifest = _generate(tmp_path, "--checksum", "none")
+    path = tmp_path / "out_2.txt"
+    # 行数、字节数不变，只有内容错位：只能靠抽查发现
+    path.write_bytes(b"".join(reversed(LINES[700:1400])))
+    report = _verify([manifest], settings, samples=200)
+    assert report['sampled'] > 150
+    assert _has(report, str(path), "生成器给出")
+    assert _has(report, "个与生成器不一致")
+    assert not _has(report, "校验值") and not _has(report, "候选数")
+    assert len(report['problems']) == generator_verify.VERIFY_REPORT_LIMIT + 1
+
+    files = _verify([str(tmp_path / name) for name in PARTS], settings, samples=200)
+    assert _has(files, str(path), "生成器给出")
+
+
+def test_scan_part_samples_lines(tmp_path):
+    path = tmp_path / "plain.txt"
+    path.write_bytes(b"".join(LINES))
+    result = generator_verify.scan_part(str(path), "sha256", (0, 5, 2599))
+    assert (result['lines'], result['bytes'], result['error']) == (2600, 2600 * 4, None)
+    assert result['samples'] == {0: b"a00", 5: b"a05", 2599: b"z99"}
+    assert result['checksum'].startswith("sha256:")
+    missing = generator_verify.scan_part(str(tmp_path / "missing.txt"))
+    assert missing['bytes'] is None and "无法读取" in missing['error']
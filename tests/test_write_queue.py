@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""按字节数限制的写入队列：达到预算时阻塞生成端并统计等待时间"""
+
+import threading
+import time
+
+import generator_core
+
+
+def _item(size):
+    return (1, size, b"x" * size)
+
+
+def _put_in_thread(work, item):
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (work.put(item), done.set()), daemon=True)
+    thread.start()
+    return thread, done
+
+
+def test_blocks_at_budget_and_reports_stall_time():
+    work = generator_core.ByteBudgetQueue(100)
+    work.put(_item(60))
+    work.put(_item(60))  # 放入前只有 61 字节，未达到预算
+    assert work.stats()['queued_bytes'] == 122
+    assert work.stats()['stall_count'] == 0
+
+    thread, done = _put_in_thread(work, _item(10))
+    assert not done.wait(0.3)  # 已达到预算，生成端等待
+    assert work.get() == _item(60)  # 取走后仍有 61 字节，低于预算
+    assert done.wait(5)
+    thread.join()
+
+    stats = work.stats()
+    assert stats['stall_count'] == 1
+    assert stats['stall_time'] >= 0.25
+    assert stats['queued_bytes'] == 61 + 11
+    assert stats['peak_bytes'] == 122
+    assert (stats['queued_items'], stats['budget']) == (2, 100)
+
+
+def test_oversized_block_fits_into_empty_queue():
+    work = generator_core.ByteBudgetQueue(10)
+    work.put(_item(1000))
+    assert work.qsize() == 1001
+    assert work.full()
+    assert work.get() == _item(1000)
+    assert work.stats()['stall_count'] == 0
+
+
+def test_markers_bypass_budget():
+    work = generator_core.ByteBudgetQueue(10)
+    work.put(_item(50))
+    # 检查点和结束标记在队列已满时也立即放入，写入线程退出时不会卡住
+    started = time.monotonic()
+    work.put((None, "end"))
+    work.put(None)
+    assert time.monotonic() - started < 1
+    assert [work.get() for _ in range(3)] == [_item(50), (None, "end"), None]
+    assert work.stats()['queued_bytes'] == 0
+    assert work.stats()['stall_count'] == 0
+
+
+def test_consumer_drains_while_producer_waits():
+    work = generator_core.ByteBudgetQueue(64)
+    items = [_item(size) for size in range(1, 200, 7)]
+    received = []
+
+    def consume():
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            time.sleep(0.001)
+            received.append(item)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for item in items:
+        work.put(item)
+    work.put(None)
+    consumer.join(10)
+    assert received == items
+    stats = work.stats()
+    # 只有低于预算时才放入，峰值不超过预算加一个数据块
+    assert stats['peak_bytes'] < 64 + 200
+    assert stats['stall_count'] > 0